@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.admin import TabularInline
 from django.utils.html import format_html
-from core.models import Pokemon, Move, Type ,Ability
-from core.tasks import sync_pokemon_task
+from core.models import Pokemon, Move, Type ,Ability, SyncRun
+from core.tasks import start_sync_run
 from core.filters import HasImageFilter
+from core.search import get_search_index
 
 class MoveInline(TabularInline):
     model = Pokemon.moves.through   # Relacionamento ManyToMany
@@ -40,14 +41,33 @@ class PokemonAdmin(admin.ModelAdmin):
     actions = ['sync_selected_pokemons']  # Adiciona a action no admin
 
     def sync_selected_pokemons(self, request, queryset):
-        """Envia os Pokémon selecionados para sincronização assíncrona."""
-        for pokemon in queryset:
-            sync_pokemon_task.delay(pokemon.id)  # Chama a tarefa Celery de forma assíncrona
-        self.message_user(request, "A sincronização foi iniciada. Isso pode levar alguns minutos.")
+        """Envia os Pokémon selecionados para sincronização assíncrona, em lotes."""
+        run = start_sync_run(names=list(queryset.values_list('name', flat=True)))
+        self.message_user(
+            request,
+            f"A sincronização #{run.pk} foi iniciada ({run.total} Pokémon em {run.chunks} tarefas). "
+            "Acompanhe o progresso em Execuções de sincronização.",
+        )
 
     sync_selected_pokemons.short_description = "Atualizar Pokémon selecionados"
 
+    def get_search_results(self, request, queryset, search_term):
+        """Busca pelo índice em memória (nome, ID ou movimento), sem JOIN nem duplicatas."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        ids = get_search_index().pokemon_ids_with_moves(search_term)
+        if search_term.isdigit():
+            ids.add(int(search_term))
+        return queryset.filter(id__in=ids), False
+
     def image_tag(self, obj):
+        thumbnail = obj.thumbnail_url(50)
+        if thumbnail:
+            return format_html(
+                '<img src="{}" srcset="{} 2x" style="width: 50px; height: 50px;" />',
+                thumbnail, obj.thumbnail_url(150),
+            )
         if obj.image:
             return format_html('<img src="{}" style="width: 50px; height: 50px;" />', obj.image.url)
         return "Sem imagem"
@@ -106,11 +126,22 @@ class AbilityAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('name', 'description')
     
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'progress_display', 'completed', 'failed', 'total', 'chunks_done', 'chunks', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'total', 'completed', 'failed', 'chunks', 'chunks_done', 'stats', 'started_at', 'finished_at')
+
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+    progress_display.short_description = "Progresso"
 
+    def has_add_permission(self, request):
+        return False
     
         
 admin.site.register(Pokemon, PokemonAdmin)
 admin.site.register(Move, MoveAdmin)
 admin.site.register(Type, TypeAdmin)
 admin.site.register(Ability, AbilityAdmin)
+admin.site.register(SyncRun, SyncRunAdmin)
 
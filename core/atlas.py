@@ -0,0 +1,142 @@
+"""
+Atlas de sprites: as miniaturas de cada bloco de `ATLAS_BLOCK_SIZE` Pokémon
+consecutivos na ordem da lista montadas em uma única imagem WebP.
+
+Os blocos seguem a posição do Pokémon na lista (ordem de ID, como o retrato
+de core/snapshot.py), não o ID: com IDs faltando, uma página (21 cards
+seguidos, pelo cursor) ainda cai em no máximo dois blocos, então baixa uma ou
+duas imagens em vez de uma por card. O `PokemonWriter` descarta os blocos dos
+Pokémon novos ou com miniaturas novas, uma remoção descarta o bloco dela e os
+seguintes (as posições andam), e a sincronização remonta os que faltam no
+final (`build_missing_atlases`).
+
+Os quadros têm o tamanho em que o card mostra o sprite (`CARD_SPRITE_SIZE`,
+1×), reduzidos da miniatura PNG de 300px: um atlas de 300px por quadro
+baixava quase três vezes os pixels exibidos.
+"""
+import hashlib
+from bisect import bisect_left
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from core.caching import bump_catalogue_version, json_cache
+from core.models import Pokemon, SpriteAtlas
+
+ATLAS_BLOCK_SIZE = 32
+ATLAS_COLUMNS = 8
+ATLAS_DIR = "pokemons/atlas"
+CARD_SPRITE_SIZE = 180  # Área útil de .pokemon-img nos cards: 200px menos 10px de padding de cada lado
+TILE_SIZE = CARD_SPRITE_SIZE  # Quadros em 1×: o tamanho exibido no card
+SOURCE_SIZE = 300  # Miniatura PNG reduzida para cada quadro (core/images.py)
+
+
+def blocks_for(pokemon_ids):
+    """Blocos das posições desses Pokémon na lista (a que ocupavam, se já foram removidos)."""
+    ids = list(Pokemon.objects.order_by("id").values_list("id", flat=True))
+    return {bisect_left(ids, pokemon_id) // ATLAS_BLOCK_SIZE for pokemon_id in pokemon_ids}
+
+
+def build_atlas(block):
+    """Monta (ou remonta) o atlas de um bloco. Devolve o `SpriteAtlas`, ou None se o bloco não tem miniaturas."""
+    start = block * ATLAS_BLOCK_SIZE
+    pokemons = [
+        pokemon for pokemon in Pokemon.objects.order_by("id").only("id", "thumbnails")[start:start + ATLAS_BLOCK_SIZE]
+        if pokemon.thumbnails.get("png", {}).get(str(SOURCE_SIZE))
+    ]
+    old = SpriteAtlas.objects.filter(block=block).first()
+    if not pokemons:
+        if old:
+            delete_atlas(old)
+        return None
+
+    rows = -(-len(pokemons) // ATLAS_COLUMNS)
+    sheet = Image.new("RGBA", (ATLAS_COLUMNS * TILE_SIZE, rows * TILE_SIZE), (0, 0, 0, 0))
+    for index, pokemon in enumerate(pokemons):
+        with default_storage.open(pokemon.thumbnails["png"][str(SOURCE_SIZE)]) as file, Image.open(file) as source:
+            tile = source.convert("RGBA").resize((TILE_SIZE, TILE_SIZE), Image.Resampling.LANCZOS)
+        row, column = divmod(index, ATLAS_COLUMNS)
+        sheet.paste(tile, (column * TILE_SIZE, row * TILE_SIZE))
+
+    buffer = BytesIO()
+    sheet.save(buffer, format="WEBP", quality=80)
+    content = buffer.getvalue()
+    # O hash no nome muda a URL a cada versão do atlas, então ele pode ficar no cache do navegador
+    name = f"{ATLAS_DIR}/{block}-{hashlib.sha256(content).hexdigest()[:12]}.webp"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+
+    atlas, _ = SpriteAtlas.objects.update_or_create(block=block, defaults={
+        "image": name,
+        "columns": ATLAS_COLUMNS,
+        "rows": rows,
+        "tiles": {str(pokemon.id): index for index, pokemon in enumerate(pokemons)},
+    })
+    if old and old.image != name and default_storage.exists(old.image):
+        default_storage.delete(old.image)
+    return atlas
+
+
+def delete_atlas(atlas):
+    if default_storage.exists(atlas.image):
+        default_storage.delete(atlas.image)
+    atlas.delete()
+
+
+def invalidate_atlases(pokemon_ids, following=False):
+    """
+    Descarta os atlas dos blocos desses Pokémon (as cards voltam às miniaturas
+    até a remontagem). Com `following`, também os blocos seguintes: depois de
+    uma remoção, todos os Pokémon adiante mudam de posição.
+    """
+    blocks = blocks_for(pokemon_ids)
+    if not blocks:
+        return
+    atlases = SpriteAtlas.objects.filter(block__gte=min(blocks)) if following else SpriteAtlas.objects.filter(block__in=blocks)
+    for atlas in atlases:
+        delete_atlas(atlas)
+
+
+def build_missing_atlases():
+    """Monta os atlas dos blocos que têm miniaturas e ainda não têm atlas. Devolve quantos foram montados."""
+    with_thumbnails = Pokemon.objects.order_by("id").values_list("thumbnails", flat=True)
+    blocks = {position // ATLAS_BLOCK_SIZE for position, thumbnails in enumerate(with_thumbnails) if thumbnails}
+    built = {atlas.block for atlas in SpriteAtlas.objects.only("block")}
+    missing = sorted(blocks - built)
+    for block in missing:
+        build_atlas(block)
+    if missing:
+        bump_catalogue_version()
+    return len(missing)
+
+
+def load_sprite_map():
+    sprites = {}
+    for atlas in SpriteAtlas.objects.all():
+        url = default_storage.url(atlas.image)
+        for pokemon_id, index in atlas.tiles.items():
+            row, column = divmod(index, atlas.columns)
+            sprites[int(pokemon_id)] = (url, column, row, atlas.columns, atlas.rows)
+    return sprites
+
+
+def sprite_map():
+    """{ID do Pokémon: (url, coluna, linha, colunas, linhas)}, em cache por versão do catálogo."""
+    return json_cache.get_or_set("sprite-map", load_sprite_map)
+
+
+def sprite_for(pokemon_id, size=CARD_SPRITE_SIZE):
+    """Posição do Pokémon no atlas, em pixels para uma imagem de `size` px, ou None sem atlas."""
+    sprite = sprite_map().get(pokemon_id)
+    if sprite is None:
+        return None
+    url, column, row, columns, rows = sprite
+    return {
+        "url": url,
+        "x": -column * size,
+        "y": -row * size,
+        "width": columns * size,
+        "height": rows * size,
+    }
@@ -0,0 +1,137 @@
+"""
+Consulta em lote de Pokémon, movimentos e habilidades com seleção de campos.
+
+`?ids=1,4,7` (ou `?names=pikachu,eevee`) e `?fields=name,hp,moves.name,moves.power`
+trazem só os campos pedidos, com no máximo três consultas qualquer que seja o
+número de Pokémon: os Pokémon (com os nomes dos tipos num join), as ligações
+com movimentos e as com habilidades, as duas últimas só se pedidas.
+"""
+from django.db.models import Q
+
+from core.models import Pokemon
+
+BATCH_LIMIT = 100
+
+# Campo da resposta -> campo de `.values()`
+POKEMON_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "special_attack": "special_attack",
+    "special_defense": "special_defense",
+    "speed": "speed",
+    "base_experience": "base_experience",
+    "height": "height",
+    "weight": "weight",
+    "generation": "generation",
+    "primary_type": "primary_type__name",
+    "secondary_type": "secondary_type__name",
+    "image_url": "summary__image_url",
+    "total_stats": "summary__total_stats",
+}
+RELATED_FIELDS = {
+    "moves": {
+        "id": "move_id",
+        "name": "move__name",
+        "power": "move__power",
+        "accuracy": "move__accuracy",
+        "type": "move__type__name",
+    },
+    "abilities": {
+        "id": "ability_id",
+        "name": "ability__name",
+        "description": "ability__description",
+    },
+}
+DEFAULT_FIELDS = ("name", "hp", "attack", "defense", "speed", "primary_type", "secondary_type")
+DEFAULT_RELATED_FIELD = "name"  # `fields=moves` é o mesmo que `fields=moves.name`
+
+
+class BatchError(ValueError):
+    """Parâmetros inválidos; a mensagem vai para a resposta 400."""
+
+
+def parse_list(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def parse_fields(value):
+    """
+    ("campos do Pokémon", {relação: [campos]}) a partir de `fields`.
+    O `id` do Pokémon sempre vem, para o cliente casar a resposta com o pedido.
+    """
+    fields = ["id"]
+    related = {}
+    for item in parse_list(value) or DEFAULT_FIELDS:
+        relation, _, field = item.partition(".")
+        if relation in RELATED_FIELDS:
+            field = field or DEFAULT_RELATED_FIELD
+            if field not in RELATED_FIELDS[relation]:
+                raise BatchError(f"Campo desconhecido: {item}")
+            related.setdefault(relation, [])
+            if field not in related[relation]:
+                related[relation].append(field)
+        elif item in POKEMON_FIELDS and not field:
+            if item not in fields:
+                fields.append(item)
+        else:
+            raise BatchError(f"Campo desconhecido: {item}")
+    return fields, related
+
+
+def parse_ids(value):
+    ids = parse_list(value)
+    if not all(item.isdigit() for item in ids):
+        raise BatchError("ids deve ser uma lista de números separados por vírgula")
+    return [int(item) for item in ids]
+
+
+def load_batch(ids=(), names=(), fields=None):
+    """
+    Pokémon pedidos, na ordem do pedido e sem repetições, com os campos de
+    `fields`. Devolve (lista de dicionários, pedidos não encontrados).
+    """
+    if not ids and not names:
+        raise BatchError("Informe ids ou names")
+    if len(ids) + len(names) > BATCH_LIMIT:
+        raise BatchError(f"No máximo {BATCH_LIMIT} Pokémon por consulta")
+    pokemon_fields, related = parse_fields(fields)
+
+    lookup = Q(id__in=ids)
+    for name in names:
+        lookup |= Q(name__iexact=name)
+    columns = {POKEMON_FIELDS[field] for field in pokemon_fields}
+    if names:
+        columns.add("name")  # Para casar os pedidos por nome, mesmo que não venha na resposta
+    by_id = {row["id"]: row for row in Pokemon.objects.filter(lookup).values(*columns)}
+    by_name = {row["name"].lower(): row for row in by_id.values()} if names else {}
+
+    order = []
+    missing = []
+    for key, row in [(pokemon_id, by_id.get(pokemon_id)) for pokemon_id in ids] + [
+        (name, by_name.get(name.lower())) for name in names
+    ]:
+        if row is None:
+            missing.append(key)
+        elif row["id"] not in order:
+            order.append(row["id"])
+    if not order:
+        return [], missing
+
+    pokemons = {
+        pokemon_id: {field: by_id[pokemon_id][POKEMON_FIELDS[field]] for field in pokemon_fields}
+        for pokemon_id in order
+    }
+    for relation, relation_fields in related.items():
+        for pokemon in pokemons.values():
+            pokemon[relation] = []
+        through = getattr(Pokemon, relation).through
+        columns = RELATED_FIELDS[relation]
+        links = through.objects.filter(pokemon_id__in=order).order_by("id").values_list(
+            "pokemon_id", *(columns[field] for field in relation_fields)
+        )
+        for pokemon_id, *values in links:
+            pokemons[pokemon_id][relation].append(dict(zip(relation_fields, values)))
+    return [pokemons[pokemon_id] for pokemon_id in order], missing
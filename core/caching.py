@@ -0,0 +1,188 @@
+"""
+Cache em dois níveis para fragmentos, páginas e respostas JSON do catálogo.
+
+O primeiro nível é um LRU na memória do processo; o segundo, o cache do
+Django (`POKEDEX_CACHE_ALIAS`: arquivos em disco ou Redis), visto por todos
+os processos. As chaves levam a versão do catálogo, que muda a cada
+alteração de Pokémon, movimentos, habilidades ou tipos (veja
+`core/signals.py` e `core/sync.py`), inclusive quando a mudança vem do
+`sync_pokemons` ou do Celery: nada é apagado, as entradas antigas só deixam
+de ser lidas e saem pelo LRU ou pelo timeout.
+
+A versão fica numa linha do banco (`CatalogueVersion`), não no cache: o
+`incr` do cache em arquivos é um get seguido de set, e duas tarefas do
+Celery podiam virar um incremento só; além disso o cache pode descartar a
+chave. Cada processo relê a linha no máximo uma vez por
+`VERSION_CHECK_INTERVAL`, o que custa uma consulta por segundo.
+"""
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.models import CatalogueVersion
+
+VERSION_CHECK_INTERVAL = 1.0  # Segundos entre leituras da versão no banco
+
+_version = {"value": None, "modified": None, "checked_at": 0.0}
+_caches = {}
+
+
+def shared_cache():
+    return caches[getattr(settings, "POKEDEX_CACHE_ALIAS", "default")]
+
+
+def _read_version():
+    """
+    (versão, timestamp da última mudança). Sem a linha (banco novo), começa
+    do relógio, em microssegundos: um ETag emitido antes nunca coincide com
+    uma versão nova.
+    """
+    row = CatalogueVersion.objects.filter(pk=1).values_list("value", "modified_at").first()
+    if row is None:
+        now = time.time()
+        entry, _ = CatalogueVersion.objects.get_or_create(
+            pk=1, defaults={"value": int(now * 1_000_000), "modified_at": now}
+        )
+        row = (entry.value, entry.modified_at)
+    return row
+
+
+def _refresh():
+    now = time.monotonic()
+    if _version["value"] is None or now - _version["checked_at"] >= VERSION_CHECK_INTERVAL:
+        _version["value"], _version["modified"] = _read_version()
+        _version["checked_at"] = now
+
+
+def catalogue_version():
+    """Versão atual do catálogo, relida do banco no máximo uma vez por intervalo."""
+    _refresh()
+    return _version["value"]
+
+
+def catalogue_last_modified():
+    """Momento da última mudança no catálogo (UTC)."""
+    _refresh()
+    return datetime.fromtimestamp(_version["modified"], tz=timezone.utc)
+
+
+def bump_catalogue_version():
+    """Invalida tudo o que foi guardado para a versão atual, neste e nos demais processos."""
+    # UPDATE ... SET value = value + 1: incrementos simultâneos de processos diferentes não se perdem
+    versions = CatalogueVersion.objects.filter(pk=1)
+    if not versions.update(value=F("value") + 1, modified_at=time.time()):
+        _read_version()  # Primeira mudança num banco novo: cria a linha
+        versions.update(value=F("value") + 1, modified_at=time.time())
+    version, modified = _read_version()
+    _version.update(value=version, modified=modified, checked_at=time.monotonic())
+    for tiered in _caches.values():
+        tiered.clear_local()
+
+
+def catalogue_etag(request, *args, **kwargs):
+    """ETag da versão do catálogo, distinto por URL e por `Accept` (a API navegável do DRF)."""
+    variant = zlib.crc32(f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode())
+    return f"{catalogue_version()}-{variant:08x}"
+
+
+def catalogue_modified(request, *args, **kwargs):
+    return catalogue_last_modified()
+
+
+def catalogue_conditional(view):
+    """
+    ETag e Last-Modified a partir da versão do catálogo, com 304 quando o
+    cliente já tem a versão atual. `no-cache` faz navegadores e CDN
+    revalidarem a cada visita, o que custa só um 304.
+    """
+    conditional_view = condition(etag_func=catalogue_etag, last_modified_func=catalogue_modified)(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    return wrapped
+
+
+class TieredCache:
+    """
+    Um espaço de chaves (`name`) com LRU local de até `maxsize` entradas na
+    frente do cache compartilhado. `stats` conta acertos em cada nível e falhas.
+    """
+
+    def __init__(self, name, maxsize=1024, timeout=60 * 60 * 24):
+        self.name = name
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        _caches[name] = self
+
+    def make_key(self, key, version):
+        return f"core:{self.name}:v{version}:{key}"
+
+    def get_or_set(self, key, producer):
+        """Valor de `key` na versão atual; chama `producer()` só se nenhum nível o tiver."""
+        full_key = self.make_key(key, catalogue_version())
+        with self.lock:
+            if full_key in self.local:
+                self.local.move_to_end(full_key)
+                self.stats["local_hits"] += 1
+                return self.local[full_key]
+
+        value = shared_cache().get(full_key)
+        if value is not None:
+            self.stats["shared_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            value = producer()
+            shared_cache().set(full_key, value, timeout=self.timeout)
+        self.remember(full_key, value)
+        return value
+
+    def remember(self, full_key, value):
+        with self.lock:
+            self.local[full_key] = value
+            self.local.move_to_end(full_key)
+            while len(self.local) > self.maxsize:
+                self.local.popitem(last=False)
+
+    def clear_local(self):
+        with self.lock:
+            self.local.clear()
+
+    def summary(self):
+        lookups = sum(self.stats.values())
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        return {
+            "local_hits": self.stats["local_hits"],
+            "shared_hits": self.stats["shared_hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "local_size": len(self.local),
+        }
+
+
+card_cache = TieredCache("card", maxsize=2048)  # HTML dos cards da lista
+detail_cache = TieredCache("detail", maxsize=256)  # Conteúdo da página de detalhe
+json_cache = TieredCache("json", maxsize=512)  # Respostas JSON (movimentos, matriz de dano)
+
+
+def cache_stats():
+    """Métricas de acerto de cada espaço de chaves, deste processo."""
+    return {
+        "version": catalogue_version(),
+        "caches": {name: tiered.summary() for name, tiered in _caches.items()},
+    }
@@ -0,0 +1,246 @@
+"""
+Catálogo binário de layout fixo, lido com `mmap` por todos os processos.
+
+O `sync_pokemons` (e a tarefa que encerra a sincronização no Celery) grava
+ao final um arquivo com os atributos dos Pokémon, a matriz de efetividade,
+a tabela de movimentos e as listas Pokémon → movimentos. Os processos do
+gunicorn e do Celery mapeiam o mesmo arquivo: as seções viram arrays NumPy
+sobre o `mmap`, sem cópia, e ficam no page cache do sistema, compartilhado
+por todos; um processo novo já começa com os dados carregados.
+
+Layout (little-endian, cada seção alinhada em 8 bytes):
+
+    cabeçalho   HEADER_DTYPE (magic, formato, contagens e offsets das seções)
+    pokemons    POKEMON_DTYPE × n, em ordem de ID
+    tipos       TYPE_DTYPE × n, na ordem da matriz
+    matriz      float32 × n², atacante × defensor
+    movimentos  MOVE_DTYPE × n, em ordem de ID
+    arestas     uint32 × n, índices na tabela de movimentos
+    textos      nomes em UTF-8, referenciados por (offset, tamanho)
+
+Inteiros ausentes no banco (atributos, poder, tipo) são gravados como -1.
+Qualquer mudança no catálogo fora da sincronização apaga o arquivo
+(core/signals.py) e os leitores voltam ao banco até a próxima exportação.
+
+Por enquanto o único leitor é `/api/damage-matrix/` (core/views.py). O
+retrato de core/snapshot.py continua vindo do banco: os cards precisam de
+campos que o arquivo não tem (estilo, srcset, cores), e o retrato vale por
+uma versão inteira do catálogo, então não pode misturar as linhas do banco
+com um mapeamento que ainda seja o do arquivo anterior (veja `CHECK_INTERVAL`).
+"""
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from core.models import Move, Pokemon
+from core.type_chart import TypeChart
+
+MAGIC = b"PKDX"
+FORMAT_VERSION = 1
+MISSING = -1
+ALIGNMENT = 8
+CHECK_INTERVAL = 1.0  # Segundos entre verificações de arquivo novo
+
+STAT_FIELDS = ("hp", "attack", "defense", "special_attack", "special_defense", "speed")
+
+SECTIONS = ("pokemon", "type", "matrix", "move", "edge", "string")
+
+HEADER_DTYPE = np.dtype(
+    [("magic", "S4"), ("format", "<u2"), ("reserved", "<u2"), ("exported_at", "<f8")]
+    + [(f"{section}_count", "<u4") for section in SECTIONS]
+    + [(f"{section}_offset", "<u8") for section in SECTIONS]
+)
+POKEMON_DTYPE = np.dtype(
+    [("id", "<u4")]
+    + [(field, "<i2") for field in STAT_FIELDS]
+    + [
+        ("primary_type", "<i2"), ("secondary_type", "<i2"),  # Índices na tabela de tipos
+        ("name_offset", "<u4"), ("name_length", "<u2"),
+        ("moves_start", "<u4"), ("moves_count", "<u2"),  # Fatia da seção de arestas
+    ]
+)
+TYPE_DTYPE = np.dtype([("id", "<u4"), ("name_offset", "<u4"), ("name_length", "<u2")])
+MOVE_DTYPE = np.dtype([
+    ("id", "<u4"), ("power", "<i2"), ("accuracy", "<i2"), ("type", "<i2"),
+    ("name_offset", "<u4"), ("name_length", "<u2"),
+])
+
+
+def catalogue_path():
+    return settings.POKEDEX_CATALOGUE_FILE
+
+
+def _value(value):
+    return MISSING if value is None else value
+
+
+def export_catalogue(path=None):
+    """Grava o catálogo atual do banco em `path`, trocando o arquivo de uma vez. Devolve as contagens."""
+    path = path or catalogue_path()
+    strings = bytearray()
+
+    def text(value):
+        data = value.encode()
+        strings.extend(data)
+        return len(strings) - len(data), len(data)
+
+    chart = TypeChart.load()
+    types = np.zeros(chart.size, dtype=TYPE_DTYPE)
+    for index, (type_id, name) in enumerate(zip(chart.ids, chart.names)):
+        types[index] = (type_id, *text(name))
+    matrix = np.asarray(chart.values, dtype="<f4")
+
+    move_rows = list(Move.objects.order_by("id").values_list("id", "name", "power", "accuracy", "type_id"))
+    move_index = {row[0]: index for index, row in enumerate(move_rows)}
+    moves = np.zeros(len(move_rows), dtype=MOVE_DTYPE)
+    for index, (move_id, name, power, accuracy, type_id) in enumerate(move_rows):
+        moves[index] = (
+            move_id, _value(power), _value(accuracy), chart.index_by_id.get(type_id, MISSING), *text(name)
+        )
+
+    adjacency = {}
+    for pokemon_id, move_id in Pokemon.moves.through.objects.order_by("id").values_list("pokemon_id", "move_id"):
+        adjacency.setdefault(pokemon_id, []).append(move_index[move_id])
+
+    pokemon_rows = list(Pokemon.objects.order_by("id").values_list(
+        "id", "name", *STAT_FIELDS, "primary_type_id", "secondary_type_id"
+    ))
+    pokemons = np.zeros(len(pokemon_rows), dtype=POKEMON_DTYPE)
+    edges = []
+    for index, (pokemon_id, name, *stats, primary, secondary) in enumerate(pokemon_rows):
+        pokemon_moves = adjacency.get(pokemon_id, [])
+        pokemons[index] = (
+            pokemon_id, *(_value(stat) for stat in stats),
+            chart.index_by_id.get(primary, MISSING), chart.index_by_id.get(secondary, MISSING),
+            *text(name), len(edges), len(pokemon_moves),
+        )
+        edges.extend(pokemon_moves)
+
+    sections = {
+        "pokemon": pokemons,
+        "type": types,
+        "matrix": matrix,
+        "move": moves,
+        "edge": np.asarray(edges, dtype="<u4"),
+        "string": np.frombuffer(bytes(strings), dtype="u1"),
+    }
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["format"] = FORMAT_VERSION
+    header["exported_at"] = time.time()
+    offset = HEADER_DTYPE.itemsize
+    for name, array in sections.items():
+        offset += -offset % ALIGNMENT
+        header[f"{name}_count"] = len(array)
+        header[f"{name}_offset"] = offset
+        offset += array.nbytes
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Arquivo temporário no mesmo diretório + os.replace: quem já mapeou o arquivo antigo continua lendo ele
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".catalogue-", delete=False) as file:
+        file.write(header.tobytes())
+        for name, array in sections.items():
+            file.write(b"\0" * (int(header[f"{name}_offset"][0]) - file.tell()))
+            file.write(array.tobytes())
+    os.chmod(file.name, 0o644)  # O temporário nasce 0600; os workers podem rodar com outro usuário
+    os.replace(file.name, path)
+    _reset()
+    return {name: len(array) for name, array in sections.items() if name in ("pokemon", "type", "move", "edge")}
+
+
+class CatalogueFile:
+    """Seções do catálogo como arrays NumPy sobre o `mmap` do arquivo (somente leitura)."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(self.buffer, HEADER_DTYPE, count=1)[0]
+        if header["magic"] != MAGIC or header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} não é um catálogo no formato {FORMAT_VERSION}")
+        self.exported_at = float(header["exported_at"])
+
+        def section(name, dtype):
+            return np.frombuffer(
+                self.buffer, dtype, count=int(header[f"{name}_count"]), offset=int(header[f"{name}_offset"])
+            )
+
+        self.pokemons = section("pokemon", POKEMON_DTYPE)
+        self.types = section("type", TYPE_DTYPE)
+        self.matrix = section("matrix", "<f4").reshape(len(self.types), len(self.types))
+        self.moves = section("move", MOVE_DTYPE)
+        self.edges = section("edge", "<u4")
+        self.strings = section("string", "u1")
+        self._names = None
+
+    def text(self, record):
+        start = int(record["name_offset"])
+        return self.strings[start:start + int(record["name_length"])].tobytes().decode()
+
+    def names(self, records):
+        return [self.text(record) for record in records]
+
+    def pokemon_index(self, query):
+        """Posição do Pokémon pelo ID ou pelo nome (sem diferenciar maiúsculas), ou None."""
+        if query.isdigit():
+            index = int(np.searchsorted(self.pokemons["id"], int(query)))
+            found = index < len(self.pokemons) and self.pokemons["id"][index] == int(query)
+            return index if found else None
+        if self._names is None:
+            # Único dado copiado do mmap, e só no primeiro acesso por nome
+            self._names = {name.lower(): index for index, name in enumerate(self.names(self.pokemons))}
+        return self._names.get(query.lower())
+
+    def moves_of(self, index):
+        """Movimentos do Pokémon na posição `index` (um array de MOVE_DTYPE)."""
+        pokemon = self.pokemons[index]
+        start = int(pokemon["moves_start"])
+        return self.moves[self.edges[start:start + int(pokemon["moves_count"])]]
+
+
+_state = {"file": None, "key": None, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def _reset():
+    with _lock:
+        _state.update(file=None, key=None, checked_at=0.0)
+
+
+def get_catalogue_file():
+    """
+    O catálogo mapeado deste processo, remapeado quando o arquivo é trocado;
+    None se ainda não foi exportado (ou foi apagado por uma mudança no catálogo).
+    """
+    now = time.monotonic()
+    if now - _state["checked_at"] < CHECK_INTERVAL:
+        return _state["file"]
+    with _lock:
+        try:
+            stat = os.stat(catalogue_path())
+        except FileNotFoundError:
+            _state.update(file=None, key=None, checked_at=now)
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != _state["key"]:
+            try:
+                catalogue = CatalogueFile(catalogue_path())
+            except ValueError:  # Formato antigo: até a próxima exportação, os leitores usam o banco
+                catalogue = None
+            _state.update(file=catalogue, key=key)
+        _state["checked_at"] = now
+        return _state["file"]
+
+
+def discard_catalogue_file():
+    """O banco mudou fora da sincronização: o arquivo deixa de valer até a próxima exportação."""
+    try:
+        os.remove(catalogue_path())
+    except FileNotFoundError:
+        pass
+    _reset()
@@ -0,0 +1,105 @@
+"""
+Cálculo de dano em lote com NumPy.
+
+Usa a mesma fórmula de `PokemonBattleView.calculate_damage`, mas calcula de
+uma vez a tabela movimento × defensor para toda a Pokédex.
+"""
+import numpy as np
+
+from core.models import Pokemon
+from core.type_chart import get_type_chart
+
+DEFAULT_POWER = 50
+
+
+def type_indexes(chart, type_ids):
+    """Índices na matriz de efetividade; tipo ausente vira a coluna neutra `chart.size`."""
+    return np.array(
+        [chart.index_by_id.get(type_id, chart.size) for type_id in type_ids],
+        dtype=np.intp,
+    )
+
+
+def effectiveness_matrix(chart):
+    """Matriz (N+1)×(N+1) com uma linha/coluna extra de 1.0 para "sem tipo"."""
+    matrix = np.ones((chart.size + 1, chart.size + 1))
+    matrix[:chart.size, :chart.size] = np.frombuffer(chart.values, dtype=np.float64).reshape(
+        chart.size, chart.size
+    )
+    return matrix
+
+
+def load_defenders(queryset=None):
+    """Colunas da Pokédex necessárias para o cálculo, em uma única consulta."""
+    queryset = queryset if queryset is not None else Pokemon.objects.all()
+    rows = list(queryset.order_by("id").values_list(
+        "id", "name", "defense", "primary_type_id", "secondary_type_id"
+    ))
+    ids, names, defense, primary, secondary = zip(*rows) if rows else ((), (), (), (), ())
+    return {
+        "ids": list(ids),
+        "names": list(names),
+        "defense": np.array([value or 0 for value in defense], dtype=np.float64),
+        "primary": primary,
+        "secondary": secondary,
+    }
+
+
+def damage_table(attack, moves, defenders):
+    """
+    Dano de cada movimento (linhas) contra cada defensor (colunas).
+
+    `moves` é uma lista de (power, type_id). Movimentos sem tipo causam 0 de
+    dano; defensores sem defesa cadastrada ficam com -1.
+    """
+    chart = get_type_chart()
+    return indexed_damage_table(
+        attack,
+        np.array([power or DEFAULT_POWER for power, _ in moves], dtype=np.float64),
+        type_indexes(chart, [type_id for _, type_id in moves]),
+        type_indexes(chart, defenders["primary"]),
+        type_indexes(chart, defenders["secondary"]),
+        defenders["defense"],
+        effectiveness_matrix(chart),
+    )
+
+
+def indexed_damage_table(attack, power, move_types, primary, secondary, defense, matrix):
+    """
+    O mesmo cálculo com os tipos já como índices em `matrix`, em que o último
+    índice é "sem tipo". Usado também com o catálogo binário (core/catalogue_file.py).
+    """
+    no_type = len(matrix) - 1
+    multiplier = matrix[move_types[:, None], primary[None, :]] * matrix[move_types[:, None], secondary[None, :]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base = power[:, None] * ((attack or 0) / defense[None, :]) / 50 + 2
+    damage = np.maximum(1, np.floor(base * multiplier))
+
+    damage[:, defense <= 0] = -1
+    damage[move_types == no_type, :] = 0
+    return damage.astype(np.int64)
+
+
+def catalogue_damage_table(catalogue, attacker_index, moves):
+    """Tabela de dano do Pokémon na posição `attacker_index` do catálogo binário contra todos os outros."""
+    size = len(catalogue.types)
+    matrix = np.ones((size + 1, size + 1))
+    matrix[:size, :size] = catalogue.matrix
+
+    def indexes(values):
+        values = values.astype(np.intp)
+        return np.where(values < 0, size, values)
+
+    pokemons = catalogue.pokemons
+    power = moves["power"].astype(np.float64)
+    power[power <= 0] = DEFAULT_POWER  # Ausente (-1) ou 0, como o `power or DEFAULT_POWER` acima
+    attack = int(pokemons["attack"][attacker_index])
+    return indexed_damage_table(
+        max(attack, 0),
+        power,
+        indexes(moves["type"]),
+        indexes(pokemons["primary_type"]),
+        indexes(pokemons["secondary_type"]),
+        np.maximum(pokemons["defense"], 0).astype(np.float64),
+        matrix,
+    )
@@ -0,0 +1,68 @@
+"""
+Exportação do catálogo inteiro numa requisição, em NDJSON ou CSV.
+
+As linhas saem aos blocos de `EXPORT_CHUNK_SIZE` Pokémon: `.values()` lidos
+com `.iterator()` (sem guardar o queryset) e, por bloco, uma consulta para
+os movimentos e outra para as habilidades. Cada bloco vira um pedaço da
+resposta, então a memória usada não cresce com o catálogo; com gzip (veja
+`catalogue_export` em core/views.py) a compressão também é feita bloco a bloco.
+"""
+import csv
+from io import StringIO
+from itertools import islice
+
+from core.batch import POKEMON_FIELDS
+from core.models import Pokemon
+from core.serialization import dumps
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FIELDS = (*POKEMON_FIELDS, "moves", "abilities")
+RELATED_NAMES = {"moves": "move__name", "abilities": "ability__name"}
+CSV_SEPARATOR = "|"  # Entre os nomes de movimentos e habilidades numa célula
+
+
+def export_chunks(chunk_size=EXPORT_CHUNK_SIZE):
+    """Listas de até `chunk_size` Pokémon (em ordem de ID) com os nomes dos movimentos e habilidades."""
+    rows = Pokemon.objects.order_by("id").values(*POKEMON_FIELDS.values()).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        pokemons = {
+            row["id"]: {field: row[column] for field, column in POKEMON_FIELDS.items()}
+            for row in chunk
+        }
+        for relation, column in RELATED_NAMES.items():
+            for pokemon in pokemons.values():
+                pokemon[relation] = []
+            links = getattr(Pokemon, relation).through.objects.filter(
+                pokemon_id__in=pokemons
+            ).order_by("id").values_list("pokemon_id", column)
+            for pokemon_id, name in links:
+                pokemons[pokemon_id][relation].append(name)
+        yield list(pokemons.values())
+
+
+def export_ndjson(chunk_size=EXPORT_CHUNK_SIZE):
+    """Um objeto JSON por linha; um pedaço de bytes por bloco."""
+    for chunk in export_chunks(chunk_size):
+        yield b"".join(dumps(pokemon) + b"\n" for pokemon in chunk)
+
+
+def export_csv(chunk_size=EXPORT_CHUNK_SIZE):
+    """Cabeçalho e uma linha por Pokémon; movimentos e habilidades separados por `CSV_SEPARATOR`."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(EXPORT_FIELDS)
+    yield flush()
+    for chunk in export_chunks(chunk_size):
+        for pokemon in chunk:
+            writer.writerow([
+                CSV_SEPARATOR.join(pokemon[field]) if field in RELATED_NAMES else pokemon[field]
+                for field in EXPORT_FIELDS
+            ])
+        yield flush()
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class CachedResponse:
+    """Entrada do cache de respostas HTTP."""
+
+    def __init__(self, url, body, content_type, etag, last_modified, fetched_at):
+        self.url = url
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self):
+        """Cabeçalhos para revalidar a entrada com o servidor."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self):
+        """Reconstrói um `requests.Response` com o conteúdo guardado."""
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = 200
+        response._content = self.body
+        response.headers = CaseInsensitiveDict()
+        if self.content_type:
+            response.headers["Content-Type"] = self.content_type
+        if self.etag:
+            response.headers["ETag"] = self.etag
+        if self.last_modified:
+            response.headers["Last-Modified"] = self.last_modified
+        return response
+
+
+class ResponseCache:
+    """
+    Cache persistente de respostas HTTP, em um arquivo SQLite indexado pela URL.
+
+    As entradas ficam válidas por `ttl` segundos; depois disso são revalidadas
+    com If-None-Match/If-Modified-Since. Quando o total ultrapassa `max_size`
+    bytes, as entradas acessadas há mais tempo são descartadas (LRU).
+    """
+
+    EVICT_EVERY = 200  # Verifica o tamanho do cache a cada N gravações
+
+    def __init__(self, directory, ttl, max_size):
+        os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.conn = sqlite3.connect(
+            os.path.join(directory, "responses.sqlite3"),
+            check_same_thread=False,
+            timeout=30,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, content_type, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+        return CachedResponse(url, *row)
+
+    def store(self, url, response):
+        """Guarda uma resposta 200 recebida do servidor."""
+        now = time.time()
+        body = response.content
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    body,
+                    response.headers.get("Content-Type"),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    len(body),
+                    now,
+                    now,
+                ),
+            )
+            self.conn.commit()
+            self.writes += 1
+            if self.writes % self.EVICT_EVERY == 0:
+                self._evict()
+
+    def revalidated(self, url):
+        """Marca uma entrada como válida novamente (o servidor respondeu 304)."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url)
+            )
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size:
+            return
+        stale = []
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_size:
+                break
+            stale.append((url,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", stale)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
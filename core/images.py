@@ -0,0 +1,118 @@
+"""
+Miniaturas dos Pokémon em tamanhos fixos, em WebP e PNG.
+
+O Pillow não lê SVG, então a fonte é a arte oficial da PokéAPI (PNG
+475×475), que existe inclusive para as gerações sem imagem dream_world.
+As miniaturas vão para `pokemons/thumbs/<nome>-<hash>-<tamanho>.<formato>`
+no storage padrão, com o hash dos bytes da arte, como em core/storage.py:
+uma arte nova gera arquivos novos (e URLs novas, sem cache antigo no
+navegador), e a mesma arte dá os mesmos caminhos sem precisar gerar nada.
+Os caminhos ficam em `Pokemon.thumbnails`; as que nenhum Pokémon usa mais
+são removidas por `cleanup_media`.
+"""
+import hashlib
+import posixpath
+import time
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+THUMBNAIL_SIZES = (50, 150, 300)
+THUMBNAIL_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80},
+    "png": {"format": "PNG", "optimize": True},
+}
+THUMBNAIL_DIR = "pokemons/thumbs"
+THUMBNAIL_DIGEST_LENGTH = 16  # Caracteres do SHA-256 da arte no nome dos arquivos
+
+
+def artwork_url(data):
+    """URL da arte oficial (PNG) no JSON da PokéAPI."""
+    return data["sprites"]["other"].get("official-artwork", {}).get("front_default")
+
+
+def square(image):
+    """Recorta a borda transparente e centraliza a imagem em um quadrado."""
+    box = image.getbbox()
+    if box:
+        image = image.crop(box)
+    side = max(image.size)
+    canvas = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+    canvas.paste(image, ((side - image.width) // 2, (side - image.height) // 2))
+    return canvas
+
+
+def render_thumbnails(source):
+    """{(tamanho, formato): bytes} a partir dos bytes de uma imagem raster."""
+    with Image.open(BytesIO(source)) as image:
+        base = square(image.convert("RGBA"))
+    rendered = {}
+    for size in THUMBNAIL_SIZES:
+        thumbnail = base.resize((size, size), Image.Resampling.LANCZOS)
+        for extension, options in THUMBNAIL_FORMATS.items():
+            buffer = BytesIO()
+            thumbnail.save(buffer, **options)
+            rendered[size, extension] = buffer.getvalue()
+    return rendered
+
+
+def thumbnail_paths(name, source):
+    """{formato: {tamanho: caminho}} das miniaturas geradas a partir dos bytes `source`."""
+    digest = hashlib.sha256(source).hexdigest()[:THUMBNAIL_DIGEST_LENGTH]
+    return {
+        extension: {str(size): f"{THUMBNAIL_DIR}/{name}-{digest}-{size}.{extension}" for size in THUMBNAIL_SIZES}
+        for extension in THUMBNAIL_FORMATS
+    }
+
+
+def save_thumbnails(name, source):
+    """
+    Gera e grava as miniaturas de um Pokémon; as de outra arte ficam para `cleanup_media`.
+    Devolve o dicionário para `Pokemon.thumbnails` ({formato: {tamanho: caminho}}),
+    ou None se a imagem não puder ser lida.
+    """
+    paths = thumbnail_paths(name, source)
+    if all(default_storage.exists(path) for sizes in paths.values() for path in sizes.values()):
+        return paths  # Mesma arte: os arquivos já existem
+    try:
+        rendered = render_thumbnails(source)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+    for (size, extension), content in rendered.items():
+        path = paths[extension][str(size)]
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(content))
+    return paths
+
+
+def orphan_thumbnails(referenced, grace_period):
+    """
+    Miniaturas fora de `referenced` modificadas há mais de `grace_period`
+    segundos (as recentes podem ser de uma gravação ainda não confirmada).
+    """
+    if not default_storage.exists(THUMBNAIL_DIR):
+        return []
+    cutoff = time.time() - grace_period
+    _, files = default_storage.listdir(THUMBNAIL_DIR)
+    return [
+        path for path in (posixpath.join(THUMBNAIL_DIR, name) for name in files)
+        if path not in referenced and default_storage.get_modified_time(path).timestamp() < cutoff
+    ]
+
+
+def thumbnail_url(thumbnails, size=150, extension="webp"):
+    """URL de uma miniatura de `Pokemon.thumbnails`, ou None se ela não existir."""
+    path = (thumbnails or {}).get(extension, {}).get(str(size))
+    return default_storage.url(path) if path else None
+
+
+def thumbnail_srcset(thumbnails, extension="webp"):
+    """Valor de `srcset` com todas as miniaturas do formato ("url 50w, url 150w, ...")."""
+    paths = (thumbnails or {}).get(extension, {})
+    return ", ".join(
+        f"{default_storage.url(path)} {size}w"
+        for size, path in sorted(paths.items(), key=lambda item: int(item[0]))
+    )
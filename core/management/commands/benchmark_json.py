@@ -0,0 +1,90 @@
+import json
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+
+from core import serialization
+from core.models import Pokemon
+from core.serialization import FastJsonResponse, Fragment, dumps
+from core.snapshot import get_snapshot
+from core.views import card_fragment, pokemon_card_data
+
+SIZES = (21, 100, 1025)
+
+
+def orm_page(size):
+    """O feed JSON como era antes dos fragmentos: Pokémon do ORM e dicionários no JsonResponse."""
+    # Como no ListView original, sem select_related: os tipos de cada card saem em consultas próprias
+    pokemons = Pokemon.objects.order_by("id")[:size]
+    return JsonResponse({
+        "pokemons": [
+            {
+                "id": pokemon.id,
+                "name": pokemon.name,
+                "hp": pokemon.hp,
+                "image_url": pokemon.image.url if pokemon.image else pokemon.image_url,
+                "primary_type": pokemon.primary_type.name if pokemon.primary_type else None,
+                "secondary_type": pokemon.secondary_type.name if pokemon.secondary_type else None,
+                "attack": pokemon.attack,
+                "defense": pokemon.defense,
+                "speed": pokemon.speed,
+                "card_style": pokemon.card_style,
+            }
+            for pokemon in pokemons
+        ],
+        "has_next": False,
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o feed JSON da lista sobre o catálogo do banco: o caminho anterior "
+        "(ORM + JsonResponse) x fragmentos do retrato, codificados na hora ou já guardados"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Respostas montadas por medição")
+
+    def handle(self, *args, **options):
+        total = Pokemon.objects.count()
+        if not total:
+            raise CommandError("Catálogo vazio: rode sync_pokemons antes")
+        sizes = [size for size in SIZES if size <= total] or [total]
+
+        repeat = options["repeat"]
+        encoder = "orjson" if serialization.orjson is not None else "json (biblioteca padrão)"
+        self.stdout.write(f"Codificador: {encoder}; {repeat} respostas por medição, tempo por resposta")
+        self.stdout.write(f"{'itens':>6} {'anterior':>10} {'frio':>10} {'pré-cod.':>10} {'ganho':>7}")
+
+        snapshot = get_snapshot()
+        for size in sizes:
+            pokemons = snapshot.pokemons[:size]
+
+            def cold():
+                return FastJsonResponse({
+                    "pokemons": [Fragment(dumps(pokemon_card_data(pokemon))) for pokemon in pokemons],
+                    "has_next": False,
+                    "next_cursor": None,
+                })
+
+            def warm():
+                return FastJsonResponse({
+                    "pokemons": [card_fragment(snapshot, pokemon) for pokemon in pokemons],
+                    "has_next": False,
+                    "next_cursor": None,
+                })
+
+            # Os dois caminhos novos produzem o mesmo documento, com os mesmos Pokémon do anterior
+            assert json.loads(cold().content) == json.loads(warm().content)
+            previous = json.loads(orm_page(size).content)["pokemons"]
+            assert [pokemon["id"] for pokemon in previous] == [pokemon.id for pokemon in pokemons]
+
+            timings = [
+                min(timeit.repeat(path, number=repeat, repeat=3)) / repeat
+                for path in (lambda: orm_page(size), cold, warm)
+            ]
+            self.stdout.write(
+                f"{size:>6} " + " ".join(f"{seconds * 1000:>8.3f}ms" for seconds in timings)
+                + f" {timings[0] / timings[2]:>6.1f}x"
+            )
@@ -0,0 +1,55 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.images import orphan_thumbnails
+from core.models import Pokemon
+from core.storage import ORPHAN_GRACE_PERIOD
+
+
+class Command(BaseCommand):
+    help = "Remove as imagens e miniaturas de Pokémon que nenhum registro referencia mais"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Só lista os arquivos que seriam removidos",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=ORPHAN_GRACE_PERIOD,
+            help="Ignora arquivos modificados há menos destes segundos (gravações ainda em andamento)",
+        )
+
+    def handle(self, *args, **options):
+        field = Pokemon._meta.get_field("image")
+        storage = field.storage
+        referenced = set(
+            Pokemon.objects.exclude(image="").exclude(image__isnull=True).values_list("image", flat=True)
+        )
+        orphans = [
+            (storage, name)
+            for name in storage.orphans(field.upload_to.rstrip("/"), referenced, options["grace_period"])
+        ]
+        # As miniaturas levam o hash da arte no nome: as de uma arte antiga ficam órfãs
+        thumbnails = {
+            path
+            for formats in Pokemon.objects.exclude(thumbnails={}).values_list("thumbnails", flat=True)
+            for sizes in formats.values()
+            for path in sizes.values()
+        }
+        orphans += [(default_storage, name) for name in orphan_thumbnails(thumbnails, options["grace_period"])]
+
+        freed = 0
+        for file_storage, name in orphans:
+            freed += file_storage.size(name)
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                file_storage.delete(name)
+
+        action = "seriam removidos" if options["dry_run"] else "removidos"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(orphans)} arquivos órfãos {action} ({freed / 1024:.1f} KB)"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.catalogue_file import catalogue_path, export_catalogue
+
+
+class Command(BaseCommand):
+    help = "Grava o catálogo binário lido com mmap pelos processos (o sync_pokemons já faz isso ao final)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            help="Arquivo de destino (padrão: POKEDEX_CATALOGUE_FILE)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"] or catalogue_path()
+        counts = export_catalogue(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Catálogo gravado em {path}: {counts['pokemon']} Pokémon, {counts['type']} tipos, "
+            f"{counts['move']} movimentos e {counts['edge']} ligações Pokémon × movimento"
+        ))
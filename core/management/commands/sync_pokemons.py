@@ -1,9 +1,64 @@
-import requests
-from django.core.management.base import BaseCommand
+from argparse import ArgumentTypeError
+
+from django.core.management.base import BaseCommand, CommandError
 from django.core.files.base import ContentFile
-from core.models import Pokemon, Move, Type, Ability
+from django.db import connection
+from django.db.models import Q
+from core.atlas import build_missing_atlases, invalidate_atlases
+from core.caching import bump_catalogue_version
+from core.catalogue_file import export_catalogue
+from core.images import artwork_url, save_thumbnails, thumbnail_paths
+from core.models import Pokemon, Type
+from core.pokeapi import PokeAPIClient, DEFAULT_CONCURRENCY, pokeapi_url
+from core.summaries import refresh_summaries
+from core.sync import (
+    GENERATION_RANGES,
+    MAX_POKEMON_ID,
+    Checkpoint,
+    EntityRegistry,
+    FingerprintStore,
+    PokemonWriter,
+    image_name,
+)
+
+
+FINGERPRINT_LABELS = {
+    "type": "Tipos",
+    "pokemon": "Pokémon",
+    "move": "Movimentos",
+    "ability": "Habilidades",
+}
+
+
+def parse_ids(value):
+    """Converte "1-151" ou "1,4,7-9" na lista de IDs correspondente."""
+    ids = []
+    try:
+        for part in value.split(","):
+            if "-" in part:
+                first, last = (int(bound) for bound in part.split("-", 1))
+                if first > last:
+                    raise ArgumentTypeError(f"Intervalo invertido: {part.strip()!r} (use por exemplo 3-5)")
+                ids.extend(range(first, last + 1))
+            elif part.strip():
+                ids.append(int(part))
+    except ValueError:
+        raise ArgumentTypeError(f"Lista de IDs inválida: {value!r} (use por exemplo 1-151 ou 1,4,7-9)")
+    if not ids:
+        raise ArgumentTypeError(f"Nenhum ID em {value!r} (use por exemplo 1-151 ou 1,4,7-9)")
+    return ids
+
+
+class QueryCounter:
+    """Conta as consultas feitas ao banco (usado com `connection.execute_wrapper`)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
 
-POKEAPI_BASE = "https://pokeapi.co/api/v2/pokemon/"
 
 GENERATION_MAP = {
     "generation-i": 1,
@@ -14,6 +69,7 @@ GENERATION_MAP = {
     "generation-vi": 6,
     "generation-vii": 7,
     "generation-viii": 8,
+    "generation-ix": 9,
 }
 
 TYPE_COLORS = {
@@ -38,230 +94,500 @@ TYPE_COLORS = {
 }
 
 
-
 class Command(BaseCommand):
     help = "Sincroniza pokémons da PokéAPI para o banco local"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Cliente HTTP, registro, hashes e checkpoint são criados em prepare(); quem chama fecha o cliente
+        self.client = None
+        self.registry = None
+        self.fingerprints = None  # Veja --incremental
+        self.checkpoint = None
+        self.writer = PokemonWriter()
+        self.prefetched = {}  # Respostas já baixadas para o lote atual
+        self.thumbnails = {}  # nome -> `Pokemon.thumbnails` atual dos Pokémon do lote
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help="Número máximo de requisições simultâneas à PokéAPI (1 = serial)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Quantidade de Pokémon buscados em paralelo antes de gravar no banco",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Ignora o cache em disco das respostas da PokéAPI",
+        )
+        parser.add_argument(
+            "--ids",
+            type=parse_ids,
+            help="IDs a sincronizar, por exemplo 1-151 ou 1,4,7-9",
+        )
+        parser.add_argument(
+            "--generation",
+            type=int,
+            action="append",
+            choices=sorted(GENERATION_RANGES),
+            help="Sincroniza apenas os Pokémon da geração indicada (pode repetir)",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Pula os IDs já concluídos no checkpoint e os que falharam e ainda estão em espera",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Sincroniza apenas os IDs que falharam e cuja espera (backoff) já terminou",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Distribui a sincronização em tarefas Celery (lotes de --batch-size)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Ignora os recursos cujo conteúdo não mudou desde a última sincronização",
+        )
+
+    def prepare(self, concurrency=DEFAULT_CONCURRENCY, use_cache=True, incremental=False):
+        """Cria o cliente HTTP, o registro, os hashes e o checkpoint de uma execução."""
+        if self.client is not None:
+            self.client.close()
+        self.client = PokeAPIClient(concurrency=concurrency, use_cache=use_cache)
+        self.fingerprints = FingerprintStore(skip_unchanged=incremental)
+        self.registry = EntityRegistry(self.client, warn=self.warn, fingerprints=self.fingerprints)
+        self.checkpoint = Checkpoint()
+
     def handle(self, *args, **options):
-        self.sync_types()
-        self.sync_pokemons()
-            
+        self.prepare(
+            concurrency=options["concurrency"],
+            use_cache=not options["no_cache"],
+            incremental=options["incremental"],
+        )
+        queries = QueryCounter()
+        try:
+            ids = self.select_ids(options)
+            if options["celery"]:
+                return self.start_celery_run(ids, options)
+            if not ids:
+                self.stdout.write(self.style.SUCCESS("Nada a sincronizar."))
+                return
+            self.sync_types()
+            self.registry.load_types()
+            with connection.execute_wrapper(queries):
+                synced = self.sync_pokemons(batch_size=options["batch_size"], ids=ids)
+        finally:
+            self.client.close()
+
+        atlases = build_missing_atlases()
+        if atlases:
+            self.stdout.write(f"Atlas de sprites montados: {atlases}")
+        counts = export_catalogue()
+        self.stdout.write(
+            f"Catálogo binário exportado: {counts['pokemon']} Pokémon, {counts['move']} movimentos"
+        )
+
+        self.stdout.write(
+            f"Consultas ao banco: {queries.count} para {synced} Pokémon "
+            f"({queries.count / max(synced, 1):.1f} por Pokémon)"
+        )
+        for kind, label in FINGERPRINT_LABELS.items():
+            counts = self.fingerprints.counts[kind]
+            self.stdout.write(
+                f"{label}: {counts['changed']} alterados, {counts['unchanged']} inalterados, "
+                f"{counts['failed']} com falha"
+            )
+        failed = self.checkpoint.failed_ids() & set(ids)
+        self.stdout.write(f"Checkpoint: {len(ids) - len(failed)} IDs concluídos, {len(failed)} com falha")
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"IDs com falha: {', '.join(map(str, sorted(failed)))} (use --retry-failed)"
+            ))
+
+        stats = self.client.stats
+        self.stdout.write(
+            f"Requisições: {stats['network']} pela rede, {stats['revalidated']} revalidadas (304), "
+            f"{stats['cached']} servidas do cache, {stats['errors']} com erro"
+        )
+
+    def start_celery_run(self, ids, options):
+        """Divide a sincronização em tarefas Celery em vez de rodar neste processo."""
+        from core.tasks import start_sync_run
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS("Nada a sincronizar."))
+            return
+        full = len(ids) == MAX_POKEMON_ID
+        run = start_sync_run(
+            ids=ids,
+            chunk_size=options["batch_size"],
+            incremental=options["incremental"],
+            resolve_all=full,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Sincronização #{run.pk} enviada ao Celery ({run.total} Pokémon). "
+            "Acompanhe o progresso no admin (Execuções de sincronização)."
+        ))
+
+    def select_ids(self, options):
+        """IDs a sincronizar, de acordo com --ids, --generation, --resume e --retry-failed."""
+        # O catálogo inteiro só quando nada foi pedido; uma seleção vazia é um erro
+        if options["ids"] is None and not options["generation"]:
+            ids = range(1, MAX_POKEMON_ID + 1)
+        else:
+            ids = list(options["ids"] or [])
+            for generation in options["generation"] or []:
+                first, last = GENERATION_RANGES[generation]
+                ids.extend(range(first, last + 1))
+            if not ids:
+                raise CommandError("Nenhum ID selecionado (veja --ids e --generation)")
+        ids = sorted(set(ids))
+
+        if options["retry_failed"]:
+            due = self.checkpoint.failed_ids(due_only=True)
+            ids = [pid for pid in ids if pid in due]
+        elif options["resume"]:
+            ids = self.checkpoint.pending(ids)
+        else:
+            self.checkpoint.restart(ids)
+
+        self.stdout.write(f"{len(ids)} Pokémon selecionados para sincronização")
+        return ids
+
+    def fetch(self, url):
+        """Retorna a resposta de uma URL, usando o que já foi pré-carregado."""
+        if url in self.prefetched:
+            return self.prefetched[url]
+        return self.client.get(url)
+
+    def fetch_json(self, url):
+        """Retorna o JSON de uma URL, ou None se a requisição falhar."""
+        response = self.fetch(url)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    def warn(self, message):
+        self.stdout.write(self.style.WARNING(message))
+
+    def unchanged(self, kind, url, data, force=False):
+        """Diz se o recurso pode ser ignorado por não ter mudado (modo incremental)."""
+        if self.fingerprints is None:
+            return False
+        return self.fingerprints.unchanged(kind, url, data, force=force)
+
+    def failed(self, kind):
+        if self.fingerprints is not None:
+            self.fingerprints.failed(kind)
+
+    def save_fingerprints(self):
+        if self.fingerprints is not None:
+            self.fingerprints.save()
+
     def sync_types(self):
         """Sincroniza os tipos de Pokémon com as cores do CSS."""
         self.stdout.write("Sincronizando tipos...")
 
         # Passo 1: Criar todos os tipos
-        response = requests.get("https://pokeapi.co/api/v2/type")
-        if response.status_code != 200:
+        types_json = self.client.get_json(pokeapi_url("type"))
+        if types_json is None:
+            self.failed("type")
             self.stdout.write(self.style.ERROR("Erro ao buscar tipos da API"))
             return
 
-        types_data = response.json()["results"]
-        for type_data in types_data:
-            type_name = type_data["name"]
-            Type.objects.update_or_create(
-                name=type_name,
-                defaults={"color": TYPE_COLORS.get(type_name, "#FFFFFF")},
+        types_data = types_json["results"]
+        old_colors = dict(Type.objects.values_list("name", "color"))
+        Type.objects.bulk_create(
+            [
+                Type(name=type_data["name"], color=TYPE_COLORS.get(type_data["name"], "#FFFFFF"))
+                for type_data in types_data
+            ],
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["color"],
+        )
+        types = {t.name: t for t in Type.objects.all()}
+        # Os resumos dos cards guardam as cores: regrava os dos Pokémon de tipos que mudaram de cor
+        recolored = [t.pk for name, t in types.items() if name in old_colors and old_colors[name] != t.color]
+        if recolored:
+            refresh_summaries(
+                Pokemon.objects.filter(Q(primary_type__in=recolored) | Q(secondary_type__in=recolored)).values("id")
             )
+        # bulk_create não dispara sinais: sem tipo novo ou cor nova, nada em cache mudou.
+        # As relações abaixo usam set(), cujos sinais só saem quando há diferença.
+        if recolored or types.keys() - old_colors.keys():
+            bump_catalogue_version()
 
         # Passo 2: Configurar as relações de efetividade
+        details = self.client.get_json_many(type_data["url"] for type_data in types_data)
         for type_data in types_data:
             type_name = type_data["name"]
-            type_url = type_data["url"]
 
             # Obtém os detalhes do tipo
-            type_response = requests.get(type_url)
-            if type_response.status_code != 200:
+            type_details = details.get(type_data["url"])
+            if type_details is None:
+                self.failed("type")
                 self.stdout.write(self.style.ERROR(f"Erro ao buscar detalhes do tipo {type_name}"))
                 continue
 
-            type_details = type_response.json()
-            type_obj = Type.objects.get(name=type_name)
-
-            # Limpa as relações existentes
-            type_obj.strong_against.clear()
-            type_obj.weak_against.clear()
-            type_obj.no_effect_against.clear()
-
-            # Configura as relações de efetividade
-            for strong in type_details["damage_relations"]["double_damage_to"]:
-                strong_type = Type.objects.filter(name=strong["name"]).first()
-                if strong_type:
-                    type_obj.strong_against.add(strong_type)
-
-            for weak in type_details["damage_relations"]["double_damage_from"]:
-                weak_type = Type.objects.filter(name=weak["name"]).first()
-                if weak_type:
-                    type_obj.weak_against.add(weak_type)
-
-            for no_effect in type_details["damage_relations"]["no_damage_to"]:
-                no_effect_type = Type.objects.filter(name=no_effect["name"]).first()
-                if no_effect_type:
-                    type_obj.no_effect_against.add(no_effect_type)
-
-        self.stdout.write(self.style.SUCCESS("Tipos sincronizados com sucesso!"))
-
-    def sync_abilities(self, pokemon, abilities_data):
-        """Sincroniza as habilidades de um Pokémon."""
-        pokemon.abilities.clear()  # Limpa as habilidades existentes
-
-        for ability_entry in abilities_data:
-            ability_name = ability_entry["ability"]["name"]
-            ability_url = ability_entry["ability"]["url"]
-
-            # Faz a requisição para obter detalhes da habilidade
-            ability_response = requests.get(ability_url)
-            if ability_response.status_code != 200:
-                print(f"Erro ao buscar habilidade {ability_name}")
+            if self.unchanged("type", type_data["url"], type_details):
                 continue
 
-            ability_json = ability_response.json()
-            description = None
-
-            # Obtém a descrição da habilidade em inglês
-            for entry in ability_json.get("effect_entries", []):
-                if entry["language"]["name"] == "en":
-                    description = entry.get("effect")
-                    break
-
-            # Cria ou atualiza a habilidade no banco de dados
-            ability, _ = Ability.objects.update_or_create(
-                name=ability_name,
-                defaults={"description": description},
+            # Configura as relações de efetividade (set() grava só a diferença)
+            relations = type_details["damage_relations"]
+            type_obj = types[type_name]
+            type_obj.strong_against.set(
+                [types[t["name"]] for t in relations["double_damage_to"] if t["name"] in types]
+            )
+            type_obj.weak_against.set(
+                [types[t["name"]] for t in relations["double_damage_from"] if t["name"] in types]
+            )
+            type_obj.no_effect_against.set(
+                [types[t["name"]] for t in relations["no_damage_to"] if t["name"] in types]
             )
 
-            # Adiciona a habilidade ao Pokémon
-            pokemon.abilities.add(ability)
-    
-    def sync_pokemons(self):
-        """Sincroniza os Pokémon da PokéAPI."""
-        for i in range(1, 1026):  # Pokémons de 1 a 251
-            url = f"{POKEAPI_BASE}{i}/"
-            response = requests.get(url)
-
-            if response.status_code != 200:
-                self.stdout.write(self.style.ERROR(f"Erro ao buscar Pokémon {i}"))
-                continue
+        self.save_fingerprints()
+        self.stdout.write(self.style.SUCCESS("Tipos sincronizados com sucesso!"))
 
-            data = response.json()
-            self.sync_pokemon(data)
+    def sync_pokemons(self, batch_size=50, ids=None):
+        """Sincroniza os Pokémon da PokéAPI e retorna quantos foram gravados."""
+        synced = 0
+        if ids is None:
+            ids = list(range(1, MAX_POKEMON_ID + 1))
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            urls = [pokeapi_url(f"pokemon/{i}/") for i in batch]
+            results = self.client.get_json_many(urls)
+
+            fetched_ids = []
+            pokemons_data = []
+            for pokemon_id, url in zip(batch, urls):
+                if results[url] is None:
+                    self.failed("pokemon")
+                    self.checkpoint.mark_failed([pokemon_id], "Erro ao buscar Pokémon na PokéAPI")
+                    self.stdout.write(self.style.ERROR(f"Erro ao buscar Pokémon {pokemon_id}"))
+                    continue
+                fetched_ids.append(pokemon_id)
+                pokemons_data.append(results[url])
+
+            try:
+                synced += len(self.sync_batch(pokemons_data))
+            except Exception as error:
+                # O lote inteiro é desfeito; os IDs ficam para --retry-failed
+                self.writer.clear()
+                if self.fingerprints is not None:
+                    self.fingerprints.clear()
+                self.checkpoint.mark_failed(fetched_ids, repr(error))
+                self.stdout.write(self.style.ERROR(
+                    f"Erro ao gravar o lote {fetched_ids[0]}-{fetched_ids[-1]}: {error!r}"
+                ))
+                continue
+            self.checkpoint.mark_done(fetched_ids)
+        return synced
 
     def sync_pokemon(self, data):
         """Sincroniza um único Pokémon."""
+        self.sync_batch([data])
+
+    def sync_batch(self, pokemons_data):
+        """Sincroniza um lote de Pokémon, gravando tudo de uma vez no banco."""
+        names = [data["name"] for data in pokemons_data]
+        # nome -> imagem e miniaturas dos Pokémon que já estão no banco
+        rows = Pokemon.objects.filter(name__in=names).values_list("name", "image", "thumbnails")
+        existing = {name: image for name, image, _ in rows}
+        self.thumbnails = {name: thumbnails for name, _, thumbnails in rows}
+        pending = [data for data in pokemons_data if self.needs_sync(data, existing)]
+        # Os que não mudaram ainda podem ter uma imagem ou arte nova na PokéAPI
+        pending_names = {data["name"] for data in pending}
+        self.refresh_images([data for data in pokemons_data if data["name"] not in pending_names], existing)
+        pokemons_data = pending
+        if not pokemons_data:
+            return []
+
+        # Movimentos e habilidades novos do lote são buscados e gravados de uma vez
+        self.registry.resolve(pokemons_data)
+
+        # Baixa em paralelo o restante do lote; a gravação no banco segue serial
+        self.prefetched = self.client.get_many(self.child_urls(pokemons_data, existing))
+        try:
+            # O Pillow libera o GIL ao redimensionar e codificar: as miniaturas também saem em paralelo
+            thumbnails = self.client.map(self.get_thumbnails, pokemons_data)
+            for data, pokemon_thumbnails in zip(pokemons_data, thumbnails):
+                self.writer.add(
+                    self.build_pokemon(data),
+                    self.registry.moves_for(data),
+                    self.registry.abilities_for(data),
+                    image=self.get_image(data),
+                    thumbnails=pokemon_thumbnails,
+                )
+        finally:
+            self.prefetched = {}
+
+        written = self.writer.flush()
+        self.save_fingerprints()
+        for item in written:
+            pokemon = item.pokemon
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Criado' if item.created else 'Atualizado'}: {pokemon.name} "
+                f"(HP: {pokemon.hp}, "
+                f"ATK: {pokemon.attack}, "
+                f"DEF: {pokemon.defense}, "
+                f"SP.ATK: {pokemon.special_attack}, "
+                f"SP.DEF: {pokemon.special_defense}, "
+                f"SPD: {pokemon.speed}) "
+                f"Tipos: {pokemon.primary_type.name}"
+                + (f"/{pokemon.secondary_type.name}" if pokemon.secondary_type else "")
+                + f" - {len(item.moves)} movimentos"
+            ))
+        return written
+
+    def needs_sync(self, data, existing):
+        """Diz se o Pokémon precisa ser gravado (sempre, fora do modo incremental)."""
         name = data["name"]
         image_url = data["sprites"]["other"]["dream_world"]["front_default"]
+        incomplete = (
+            name not in existing
+            or bool(image_url and not existing[name])
+            or bool(artwork_url(data) and not self.thumbnails.get(name))
+        )
+        # Mesma URL da busca por ID em sync_pokemons(), qualquer que seja a URL usada para baixar
+        url = pokeapi_url(f"pokemon/{data['id']}/")
+        return not self.unchanged("pokemon", url, data, force=incomplete)
+
+    def child_urls(self, pokemons_data, existing):
+        """Lista as URLs de espécie, de imagem e da arte oficial (para as miniaturas) de um lote."""
+        urls = []
+        for data in pokemons_data:
+            urls.append(data["species"]["url"])
+            image_url = data["sprites"]["other"]["dream_world"]["front_default"]
+            if image_url:
+                urls.append(image_url)  # GET condicional: sem mudança, custa um 304 (ou nada, se fresco no cache)
+            if artwork_url(data):
+                urls.append(artwork_url(data))  # Idem; a mesma arte não gera as miniaturas de novo
+        return urls
+
+    def build_pokemon(self, data):
+        """Monta (sem salvar) o Pokémon a partir do JSON da PokéAPI."""
         stats = {item["stat"]["name"]: item["base_stat"] for item in data.get("stats", [])}
 
         # Obtém os tipos
         primary_type_name = data['types'][0]['type']['name']
         secondary_type_name = data['types'][1]['type']['name'] if len(data['types']) > 1 else None
 
-        primary_type = Type.objects.get(name=primary_type_name)
-        secondary_type = Type.objects.get(name=secondary_type_name) if secondary_type_name else None
+        primary_type = self.registry.get_type(primary_type_name)
+        secondary_type = self.registry.get_type(secondary_type_name) if secondary_type_name else None
 
         # Obtém a geração
         generation, generation_number = self.get_generation(data)
 
-        # Cria ou atualiza o Pokémon
-        pokemon, created = Pokemon.objects.update_or_create(
-            name=name,
-            defaults={
-                "base_experience": data["base_experience"],
-                "height": data["height"],
-                "weight": data["weight"],
-                "image_url": image_url,
-                "hp": stats.get("hp"),
-                "attack": stats.get("attack"),
-                "defense": stats.get("defense"),
-                "special_attack": stats.get("special-attack"),
-                "special_defense": stats.get("special-defense"),
-                "speed": stats.get("speed"),
-                "primary_type": primary_type,
-                "secondary_type": secondary_type,
-                "generation": generation,
-                "generation_number": generation_number,
-            },
+        return Pokemon(
+            name=data["name"],
+            base_experience=data["base_experience"],
+            height=data["height"],
+            weight=data["weight"],
+            image_url=data["sprites"]["other"]["dream_world"]["front_default"],
+            artwork_url=artwork_url(data),
+            hp=stats.get("hp"),
+            attack=stats.get("attack"),
+            defense=stats.get("defense"),
+            special_attack=stats.get("special-attack"),
+            special_defense=stats.get("special-defense"),
+            speed=stats.get("speed"),
+            primary_type=primary_type,
+            secondary_type=secondary_type,
+            generation=generation,
+            generation_number=generation_number,
         )
-        # Baixa a imagem do Pokémon
-        if image_url and not pokemon.image:
-            image_response = requests.get(image_url)
-            if image_response.status_code == 200:
-                # Atualiza a imagem, mesmo que já exista
-                pokemon.image.save(f"{name}.svg", ContentFile(image_response.content))
-            else:
-                self.stdout.write(self.style.ERROR(f"Erro ao baixar imagem de {name}"))
-        
-        # Sincroniza os movimentos
-        self.sync_moves(pokemon, data["moves"])
-
-        # Sincroniza as habilidades
-        self.sync_abilities(pokemon, data["abilities"])
 
-        self.stdout.write(self.style.SUCCESS(
-            f"{'Criado' if created else 'Atualizado'}: {name} "
-            f"(HP: {pokemon.hp}, "
-            f"ATK: {pokemon.attack}, "
-            f"DEF: {pokemon.defense}, "
-            f"SP.ATK: {pokemon.special_attack}, "
-            f"SP.DEF: {pokemon.special_defense}, "
-            f"SPD: {pokemon.speed}) "
-            f"Tipos: {pokemon.primary_type.name}"
-            + (f"/{pokemon.secondary_type.name}" if pokemon.secondary_type else "")
-            + f" - {pokemon.moves.count()} movimentos"
-        ))
+    def refresh_images(self, pokemons_data, existing):
+        """Troca só a imagem e as miniaturas dos Pokémon cujo SVG ou arte oficial mudou na PokéAPI."""
+        urls = {}
+        for data in pokemons_data:
+            image_url = data["sprites"]["other"]["dream_world"]["front_default"]
+            if image_url:
+                urls[data["name"], "image"] = image_url
+            if artwork_url(data):
+                urls[data["name"], "thumbnails"] = artwork_url(data)
+        if not urls:
+            return
+
+        responses = self.client.get_many(urls.values())
+        images, thumbnails = {}, {}
+        for (name, field), url in urls.items():
+            response = responses.get(url)
+            if response is None or response.status_code != 200:
+                continue
+            if field == "image":
+                content = ContentFile(response.content, name=f"{name}.svg")
+                if image_name(content) != existing.get(name):
+                    images[name] = content
+            elif thumbnail_paths(name, response.content) != self.thumbnails.get(name):
+                thumbnails[name] = save_thumbnails(name, response.content)
+        thumbnails = {name: paths for name, paths in thumbnails.items() if paths}
+        if not images and not thumbnails:
+            return
+
+        pokemons = list(Pokemon.objects.filter(name__in=[*images, *thumbnails]).only("id", "name", "image", "thumbnails"))
+        for pokemon in pokemons:
+            if pokemon.name in images:
+                pokemon.image.save(images[pokemon.name].name, images[pokemon.name], save=False)
+                self.stdout.write(self.style.SUCCESS(f"Imagem atualizada: {pokemon.name}"))
+            if pokemon.name in thumbnails:
+                pokemon.thumbnails = thumbnails[pokemon.name]
+                self.stdout.write(self.style.SUCCESS(f"Miniaturas atualizadas: {pokemon.name}"))
+        Pokemon.objects.bulk_update(pokemons, ["image", "thumbnails"])
+        refresh_summaries([pokemon.pk for pokemon in pokemons])
+        invalidate_atlases([pokemon.pk for pokemon in pokemons if pokemon.name in thumbnails])
+        bump_catalogue_version()
+
+    def get_image(self, data):
+        """Retorna a imagem baixada do Pokémon (o writer só a grava se o conteúdo mudou)."""
+        name = data["name"]
+        image_url = data["sprites"]["other"]["dream_world"]["front_default"]
+        if not image_url or image_url not in self.prefetched:
+            return None
+
+        image_response = self.prefetched[image_url]
+        if image_response is None or image_response.status_code != 200:
+            self.stdout.write(self.style.ERROR(f"Erro ao baixar imagem de {name}"))
+            return None
+        return ContentFile(image_response.content, name=f"{name}.svg")
+
+    def get_thumbnails(self, data):
+        """Gera as miniaturas a partir da arte oficial baixada; None se faltar a arte ou ela não mudou."""
+        url = artwork_url(data)
+        if not url or url not in self.prefetched:
+            return None
+
+        response = self.prefetched[url]
+        if response is None or response.status_code != 200:
+            self.stdout.write(self.style.ERROR(f"Erro ao baixar a arte oficial de {data['name']}"))
+            return None
+        if thumbnail_paths(data["name"], response.content) == self.thumbnails.get(data["name"]):
+            return None  # Mesma arte: as miniaturas gravadas continuam valendo
+        thumbnails = save_thumbnails(data["name"], response.content)
+        if thumbnails is None:
+            self.stdout.write(self.style.ERROR(f"Arte oficial inválida para {data['name']}"))
+        return thumbnails
 
     def get_generation(self, data):
         """Obtém a geração do Pokémon."""
         species_url = data["species"]["url"]
-        species_response = requests.get(species_url)
+        species_data = self.fetch_json(species_url)
 
-        if species_response.status_code == 200:
-            species_data = species_response.json()
+        if species_data is not None:
             generation = species_data["generation"]["name"]
             generation_number = GENERATION_MAP.get(generation, None)
             return generation, generation_number
 
         return None, None
-
-    def sync_moves(self, pokemon, moves_data):
-        """Sincroniza os movimentos de um Pokémon."""
-        pokemon.moves.clear()
-
-        for move_entry in moves_data[:20]:  # Limita a 10 movimentos
-            move_data = move_entry["move"]
-            move_url = move_data["url"]
-
-            move_response = requests.get(move_url)
-            if move_response.status_code != 200:
-                continue
-
-            move_json = move_response.json()
-            move_name = move_json["name"]
-            power = move_json.get("power")
-            accuracy = move_json.get("accuracy")
-            type_name = move_json["type"]["name"]
-            
-            # Busca a instância do tipo correspondente
-            move_type = Type.objects.filter(name=type_name).first()
-            if not move_type:
-                self.stdout.write(self.style.WARNING(f"Tipo '{type_name}' não encontrado para o movimento '{move_name}'"))
-                continue
-
-            effect_entries = move_json.get("effect_entries", [])
-            effect = None
-            for entry in effect_entries:
-                if entry["language"]["name"] == "en":
-                    effect = entry.get("effect")
-                    break
-
-            move, _ = Move.objects.update_or_create(
-                name=move_name,
-                defaults={
-                    "power": power,
-                    "accuracy": accuracy,
-                    "type": move_type,
-                    "effect": effect,
-                },
-            )
-
-            pokemon.moves.add(move)        
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_type_no_effect_against_type_strong_against_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=255, unique=True)),
+                ('digest', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
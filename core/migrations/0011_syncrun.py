@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_synccheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Em andamento'), ('done', 'Concluída')], default='running', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('chunks', models.PositiveIntegerField(default=0)),
+                ('chunks_done', models.PositiveIntegerField(default=0)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'execução de sincronização',
+                'verbose_name_plural': 'execuções de sincronização',
+            },
+        ),
+    ]
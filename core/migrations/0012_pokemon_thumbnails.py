@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_syncrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pokemon',
+            name='artwork_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pokemon',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 11:46
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_pokemon_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pokemon',
+            name='image',
+            field=models.FileField(blank=True, null=True, storage=core.storage.pokemon_image_storage, upload_to='pokemons/'),
+        ),
+    ]
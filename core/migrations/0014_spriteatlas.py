@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_pokemon_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpriteAtlas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block', models.PositiveIntegerField(unique=True)),
+                ('image', models.CharField(max_length=255)),
+                ('columns', models.PositiveSmallIntegerField()),
+                ('rows', models.PositiveSmallIntegerField()),
+                ('tiles', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'atlas de sprites',
+                'verbose_name_plural': 'atlas de sprites',
+            },
+        ),
+    ]
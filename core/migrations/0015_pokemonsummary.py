@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_summaries(apps, schema_editor):
+    from core.summaries import write_summaries
+
+    write_summaries(apps.get_model('core', 'Pokemon'), apps.get_model('core', 'PokemonSummary'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_spriteatlas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PokemonSummary',
+            fields=[
+                ('pokemon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.pokemon')),
+                ('name', models.CharField(max_length=100)),
+                ('hp', models.IntegerField(null=True)),
+                ('attack', models.IntegerField(null=True)),
+                ('defense', models.IntegerField(null=True)),
+                ('speed', models.IntegerField(null=True)),
+                ('total_stats', models.IntegerField(null=True)),
+                ('primary_type_name', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('primary_type_color', models.CharField(blank=True, max_length=7)),
+                ('secondary_type_name', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('secondary_type_color', models.CharField(blank=True, max_length=7)),
+                ('card_style', models.CharField(max_length=255)),
+                ('image_url', models.CharField(blank=True, max_length=255)),
+                ('srcset', models.TextField(blank=True)),
+                ('png_srcset', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'resumo de Pokémon',
+                'verbose_name_plural': 'resumos de Pokémon',
+            },
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_pokemonsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncrun',
+            name='status',
+            field=models.CharField(choices=[('running', 'Em andamento'), ('done', 'Concluída'), ('failed', 'Com falhas')], default='running', max_length=10),
+        ),
+    ]
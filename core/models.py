@@ -1,5 +1,18 @@
 from django.db import models
 
+from core.images import thumbnail_srcset, thumbnail_url
+from core.storage import pokemon_image_storage
+
+DEFAULT_CARD_COLOR = "#E6E6E6"
+
+
+def card_background(primary_color=None, secondary_color=None):
+    """Estilo de fundo dos cards: degradê entre as cores dos dois tipos sobre a textura."""
+    primary_color = primary_color or DEFAULT_CARD_COLOR
+    secondary_color = secondary_color or primary_color
+    return f"background: linear-gradient(135deg, {primary_color}, {secondary_color}), url('../static/pokedex/img/texture.jpg'); width: 18rem"
+
+
 class Move(models.Model):
     name = models.CharField(max_length=100, unique=True)
     power = models.IntegerField(null=True, blank=True)
@@ -24,20 +37,9 @@ class Type(models.Model):
         """
         Retorna os multiplicadores de dano para o tipo atual.
         """
-        multipliers = {}
-        all_types = Type.objects.all()
-
-        for t in all_types:
-            if t in self.strong_against.all():
-                multipliers[t.name] = 2.0  # Dano dobrado
-            elif t in self.weak_against.all():
-                multipliers[t.name] = 0.5  # Dano reduzido pela metade
-            elif t in self.no_effect_against.all():
-                multipliers[t.name] = 0.0  # Sem efeito
-            else:
-                multipliers[t.name] = 1.0  # Dano normal
-
-        return multipliers
+        from core.type_chart import get_type_chart
+
+        return get_type_chart().multipliers_for(self.name)
     
 class Ability(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -51,7 +53,9 @@ class Ability(models.Model):
 class Pokemon(models.Model):
     name = models.CharField(max_length=100, unique=True)
     image_url = models.URLField(blank=True, null=True)
-    image = models.FileField(upload_to="pokemons/", blank=True, null=True)
+    image = models.FileField(upload_to="pokemons/", storage=pokemon_image_storage, blank=True, null=True)
+    artwork_url = models.URLField(blank=True, null=True)  # Arte oficial (PNG), fonte das miniaturas
+    thumbnails = models.JSONField(default=dict, blank=True)  # {formato: {tamanho: caminho}}, veja core/images.py
     base_experience = models.IntegerField()
     height = models.IntegerField()
     weight = models.IntegerField()
@@ -83,10 +87,161 @@ class Pokemon(models.Model):
     @property
     def card_style(self):
         """Gera o estilo de fundo do card com base nos tipos do Pokémon."""
-        primary_color = self.primary_type.color if self.primary_type else "#E6E6E6"
-        secondary_color = self.secondary_type.color if self.secondary_type else primary_color
-        return f"background: linear-gradient(135deg, {primary_color}, {secondary_color}), url('../static/pokedex/img/texture.jpg'); width: 18rem"
+        return card_background(
+            self.primary_type.color if self.primary_type else None,
+            self.secondary_type.color if self.secondary_type else None,
+        )
+
+    def thumbnail_url(self, size=150, extension="webp"):
+        return thumbnail_url(self.thumbnails, size, extension)
+
+    def thumbnail_srcset(self, extension="webp"):
+        return thumbnail_srcset(self.thumbnails, extension)
+
+    @property
+    def card_image_url(self):
+        """Imagem do card: miniatura PNG de 300px, senão o SVG baixado, senão a URL da PokéAPI."""
+        return self.thumbnail_url(300, "png") or (self.image.url if self.image else self.image_url)
 
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class PokemonSummary(models.Model):
+    """
+    Cópia desnormalizada do que os cards mostram (lista, carrossel, feed JSON e
+    comparação): nomes e cores dos tipos, estilo, URLs das imagens e total de
+    atributos já calculados, sem joins. Mantida por core/summaries.py.
+    """
+    pokemon = models.OneToOneField(Pokemon, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    name = models.CharField(max_length=100)
+    hp = models.IntegerField(null=True)
+    attack = models.IntegerField(null=True)
+    defense = models.IntegerField(null=True)
+    speed = models.IntegerField(null=True)
+    total_stats = models.IntegerField(null=True)  # Vazio se faltar algum atributo
+    primary_type_name = models.CharField(max_length=50, blank=True, db_index=True)
+    primary_type_color = models.CharField(max_length=7, blank=True)
+    secondary_type_name = models.CharField(max_length=50, blank=True, db_index=True)
+    secondary_type_color = models.CharField(max_length=7, blank=True)
+    card_style = models.CharField(max_length=255)
+    image_url = models.CharField(max_length=255, blank=True)  # Mesma escolha de Pokemon.card_image_url
+    srcset = models.TextField(blank=True)
+    png_srcset = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'resumo de Pokémon'
+        verbose_name_plural = 'resumos de Pokémon'
+
+    # Mesma interface do Pokemon nos templates e na tag pokemon_picture
+    @property
+    def id(self):
+        return self.pokemon_id
+
+    @property
+    def card_image_url(self):
+        return self.image_url
+
+    def thumbnail_srcset(self, extension="webp"):
+        return self.png_srcset if extension == "png" else self.srcset
+
+    def __str__(self):
+        return self.name
+
+
+class ResourceFingerprint(models.Model):
+    """Hash do conteúdo de um recurso da PokéAPI na última sincronização."""
+    url = models.URLField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url
+
+
+class SyncCheckpoint(models.Model):
+    """Situação de cada ID da PokéAPI na sincronização (permite retomar o sync_pokemons)."""
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    )
+
+    pokemon_id = models.PositiveIntegerField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)  # Falhas consecutivas
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.pokemon_id} ({self.status})"
+
+
+class SyncRun(models.Model):
+    """Execução da sincronização distribuída em tarefas Celery."""
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'  # Algum lote ou ID falhou; os lotes com erro ficam em stats['failed_chunks']
+    STATUS_CHOICES = (
+        (STATUS_RUNNING, 'Em andamento'),
+        (STATUS_DONE, 'Concluída'),
+        (STATUS_FAILED, 'Com falhas'),
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    chunks_done = models.PositiveIntegerField(default=0)
+    stats = models.JSONField(default=dict, blank=True)  # Totais agregados ao final
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'execução de sincronização'
+        verbose_name_plural = 'execuções de sincronização'
+
+    @property
+    def progress(self):
+        """Percentual de IDs já processados (concluídos ou com falha)."""
+        if not self.total:
+            return 100
+        return round(100 * (self.completed + self.failed) / self.total)
+
+    def __str__(self):
+        return f"Sincronização #{self.pk} ({self.progress}%)"
+
+
+class CatalogueVersion(models.Model):
+    """
+    Versão do catálogo (core/caching.py), numa linha só. Fica no banco e não
+    no cache: o incremento com F() é atômico entre processos e nada a descarta.
+    """
+    value = models.BigIntegerField()
+    modified_at = models.FloatField()  # time.time() da última mudança
+
+    def __str__(self):
+        return f"Versão {self.value}"
+
+
+class SpriteAtlas(models.Model):
+    """
+    Imagem única com as miniaturas de um bloco de Pokémon consecutivos na lista,
+    para a lista e o carrossel baixarem uma imagem por página. Veja core/atlas.py.
+    """
+    block = models.PositiveIntegerField(unique=True)  # Posições (em ordem de ID) de block * tamanho até (block + 1) * tamanho - 1
+    image = models.CharField(max_length=255)  # Caminho no storage padrão
+    columns = models.PositiveSmallIntegerField()
+    rows = models.PositiveSmallIntegerField()
+    tiles = models.JSONField(default=dict)  # {ID do Pokémon: posição no atlas}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'atlas de sprites'
+        verbose_name_plural = 'atlas de sprites'
+
+    def __str__(self):
+        return f"Atlas {self.block} ({len(self.tiles)} Pokémon)"
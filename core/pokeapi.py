@@ -0,0 +1,116 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.http_cache import ResponseCache
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 30
+
+# Novas tentativas, com espera exponencial, para falhas de rede e erros temporários
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+    raise_on_status=False,
+)
+
+
+def pokeapi_url(path):
+    """Monta a URL de um recurso da PokéAPI (ou do servidor configurado)."""
+    return f"{settings.POKEAPI_BASE_URL}{path}"
+
+
+class PokeAPIClient:
+    """
+    Cliente HTTP da PokéAPI.
+
+    Todas as requisições passam por uma única `requests.Session`, com um pool
+    de conexões keep-alive do tamanho da concorrência configurada, e pelo
+    cache de respostas em disco (quando `POKEAPI_CACHE_DIR` está definido).
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, use_cache=True):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache = None
+        if use_cache and settings.POKEAPI_CACHE_DIR:
+            self.cache = ResponseCache(
+                settings.POKEAPI_CACHE_DIR,
+                ttl=settings.POKEAPI_CACHE_TTL,
+                max_size=settings.POKEAPI_CACHE_MAX_SIZE,
+            )
+        self.stats = Counter()  # network / cached / revalidated / errors
+        self.stats_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.concurrency,
+            pool_maxsize=self.concurrency,
+            max_retries=RETRY,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def get(self, url):
+        """Faz um GET e retorna a resposta (ou None em caso de erro de rede)."""
+        entry = self.cache.get(url) if self.cache else None
+        if entry is not None and entry.is_fresh(self.cache.ttl):
+            self.count("cached")
+            return entry.to_response()
+
+        headers = entry.conditional_headers() if entry is not None else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self.count("errors")
+            return None
+
+        if response.status_code == 304 and entry is not None:
+            self.count("revalidated")
+            self.cache.revalidated(url)
+            return entry.to_response()
+
+        self.count("network")
+        if response.status_code == 200 and self.cache:
+            self.cache.store(url, response)
+        return response
+
+    def get_json(self, url):
+        """Retorna o JSON de uma URL, ou None se a requisição falhar."""
+        response = self.get(url)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    def map(self, func, items):
+        """Aplica `func` aos itens em paralelo, preservando a ordem."""
+        items = list(items)
+        if self.concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(func, items))
+
+    def get_many(self, urls):
+        """Busca várias URLs em paralelo. Retorna {url: resposta}."""
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, self.map(self.get, urls)))
+
+    def get_json_many(self, urls):
+        """Busca o JSON de várias URLs em paralelo. Retorna {url: json ou None}."""
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, self.map(self.get_json, urls)))
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
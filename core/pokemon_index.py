@@ -0,0 +1,70 @@
+"""
+Índice compacto de nomes e IDs dos Pokémon para os campos de seleção.
+
+O índice fica no cache do Django sob uma chave versionada; a versão muda
+quando Pokémon são criados, renomeados ou removidos (veja `core/signals.py`
+e `PokemonWriter.flush`). Os navegadores guardam o índice pela versão e só o
+baixam de novo quando ela muda; por isso ela nunca volta a um valor já
+usado, nem depois de o cache ser reiniciado.
+"""
+import time
+
+from django.core.cache import cache
+
+from core.models import Pokemon
+
+VERSION_KEY = "core:pokemon_index:version"
+INDEX_KEY = "core:pokemon_index:{version}"
+SEARCH_LIMIT = 10
+
+
+def _clock():
+    return time.time_ns() // 1000
+
+
+def get_index_version():
+    """
+    Versão atual do índice, em microssegundos do relógio. Sem nada no cache
+    (primeira execução ou cache reiniciado), começa da hora atual: uma URL
+    `?v=` guardada antes do reinício nunca coincide com um índice novo.
+    """
+    seed = _clock()
+    cache.add(VERSION_KEY, seed, timeout=None)
+    return cache.get(VERSION_KEY, seed)
+
+
+def get_pokemon_index():
+    """(versão, [[id, nome], ...]) em ordem de ID, com uma consulta quando não está no cache."""
+    version = get_index_version()
+    key = INDEX_KEY.format(version=version)
+    index = cache.get(key)
+    if index is None:
+        index = [list(row) for row in Pokemon.objects.order_by("id").values_list("id", "name")]
+        cache.set(key, index, timeout=None)
+    return version, index
+
+
+def search_pokemon_index(query, limit=SEARCH_LIMIT):
+    """Sugestões de busca: ID exato, depois nomes que começam com o termo, depois os que o contêm."""
+    query = query.strip().lower()
+    if not query:
+        return []
+    _, index = get_pokemon_index()
+    if query.isdigit():
+        return [entry for entry in index if entry[0] == int(query)]
+
+    prefix, contains = [], []
+    for entry in index:
+        name = entry[1].lower()
+        if name.startswith(query):
+            prefix.append(entry)
+        elif query in name:
+            contains.append(entry)
+        if len(prefix) >= limit:
+            break
+    return (prefix + contains)[:limit]
+
+
+def invalidate_pokemon_index():
+    # Sempre maior que a versão atual e que a hora: vale também depois de o cache ser reiniciado
+    cache.set(VERSION_KEY, max(_clock(), get_index_version() + 1), timeout=None)
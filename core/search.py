@@ -0,0 +1,237 @@
+"""
+Busca em memória por trigramas para Pokémon, movimentos e habilidades.
+
+O índice cobre os nomes dos três modelos, o efeito dos movimentos e a
+descrição das habilidades. É montado uma vez por processo (três consultas e
+uma para a relação Pokémon × movimento) e invalidado pelos sinais dos
+modelos e pela sincronização. Os demais processos remontam o deles quando
+a versão do catálogo muda (core/caching.py), inclusive depois de um
+`sync_pokemons` ou de uma tarefa do Celery.
+
+A ordem dos resultados é: nome igual ao termo, nome que começa com o termo,
+nome que contém o termo, texto (efeito/descrição) com todas as palavras do
+termo como prefixo e, por fim, nomes parecidos (similaridade de trigramas).
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from core.caching import catalogue_version
+from core.models import Ability, Move, Pokemon
+
+KIND_POKEMON = "pokemon"
+KIND_MOVE = "move"
+KIND_ABILITY = "ability"
+KINDS = (KIND_POKEMON, KIND_MOVE, KIND_ABILITY)
+
+SEARCH_LIMIT = 20
+FUZZY_THRESHOLD = 0.3  # Similaridade mínima (Jaccard de trigramas) para nomes parecidos
+
+SCORE_EXACT = 4.0
+SCORE_PREFIX = 3.0
+SCORE_CONTAINS = 2.0
+SCORE_TEXT = 1.0  # Acima do fuzzy, que vai de FUZZY_THRESHOLD a 1.0 (exclusivo)
+
+_separators = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """Minúsculas, sem acentos e com qualquer separador virando um espaço."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return _separators.sub(" ", text.lower()).strip()
+
+
+def substring_grams(text):
+    """Trigramas contíguos do texto: quem contém o termo tem todos os trigramas dele."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_grams(text):
+    """Trigramas de cada palavra com espaços nas pontas, como no pg_trgm."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchResult(NamedTuple):
+    kind: str
+    id: int
+    name: str
+    score: float
+
+
+class SearchIndex:
+    """Documentos (tipo, ID, nome, texto) e seus índices invertidos."""
+
+    def __init__(self, documents, pokemon_by_move, version=None):
+        self.kinds = [kind for kind, _, _, _ in documents]
+        self.ids = [doc_id for _, doc_id, _, _ in documents]
+        self.names = [name for _, _, name, _ in documents]
+        self.keys = [normalize(name) for name in self.names]
+        self.pokemon_by_move = pokemon_by_move
+        self.version = version
+
+        self.substrings = defaultdict(set)  # trigrama -> documentos cujo nome o contém
+        self.similar = defaultdict(set)  # trigrama de palavra -> documentos
+        self.gram_counts = []
+        for doc, key in enumerate(self.keys):
+            for gram in substring_grams(key):
+                self.substrings[gram].add(doc)
+            grams = word_grams(key)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.similar[gram].add(doc)
+
+        # Palavras do texto (e do nome) em ordem, para achar prefixos com bisect
+        words = defaultdict(set)
+        for doc, (key, (_, _, _, text)) in enumerate(zip(self.keys, documents)):
+            for word in set(key.split()) | set(normalize(text).split()):
+                words[word].add(doc)
+        self.vocabulary = sorted(words)
+        self.docs_by_word = [words[word] for word in self.vocabulary]
+
+    @classmethod
+    def load(cls, version=None):
+        documents = [
+            (KIND_POKEMON, pokemon_id, name, "")
+            for pokemon_id, name in Pokemon.objects.values_list("id", "name")
+        ]
+        documents += [
+            (KIND_MOVE, move_id, name, effect or "")
+            for move_id, name, effect in Move.objects.values_list("id", "name", "effect")
+        ]
+        documents += [
+            (KIND_ABILITY, ability_id, name, description or "")
+            for ability_id, name, description in Ability.objects.values_list("id", "name", "description")
+        ]
+        pokemon_by_move = defaultdict(set)
+        for pokemon_id, move_id in Pokemon.moves.through.objects.values_list("pokemon_id", "move_id"):
+            pokemon_by_move[move_id].add(pokemon_id)
+        return cls(documents, pokemon_by_move, version)
+
+    def _name_matches(self, term):
+        """Documentos cujo nome contém `term` (já normalizado)."""
+        grams = substring_grams(term)
+        if not grams:
+            # Termos de uma ou duas letras: varrer os nomes é mais barato que indexá-los
+            return [doc for doc, key in enumerate(self.keys) if term in key]
+        candidates = set.intersection(*(self.substrings.get(gram, set()) for gram in grams))
+        return [doc for doc in candidates if term in self.keys[doc]]
+
+    def _text_matches(self, term):
+        """Documentos com todas as palavras do termo como prefixo de alguma palavra."""
+        result = None
+        for token in term.split():
+            docs = set()
+            start = bisect_left(self.vocabulary, token)
+            for position in range(start, len(self.vocabulary)):
+                if not self.vocabulary[position].startswith(token):
+                    break
+                docs |= self.docs_by_word[position]
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result or set()
+
+    def _similar_names(self, term):
+        """{documento: similaridade} dos nomes parecidos com o termo."""
+        grams = word_grams(term)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self.similar.get(gram, ()))
+        scores = {}
+        for doc, shared in overlap.items():
+            similarity = shared / (len(grams) + self.gram_counts[doc] - shared)
+            if similarity >= FUZZY_THRESHOLD:
+                scores[doc] = similarity
+        return scores
+
+    def scores(self, query, kinds=None, fuzzy=True):
+        """{documento: pontuação} de todos os resultados, sem ordenar."""
+        term = normalize(query)
+        if not term:
+            return {}
+        scores = {}
+        for doc in self._name_matches(term):
+            key = self.keys[doc]
+            if key == term:
+                scores[doc] = SCORE_EXACT
+            elif key.startswith(term):
+                scores[doc] = SCORE_PREFIX + len(term) / len(key)
+            else:
+                scores[doc] = SCORE_CONTAINS + len(term) / len(key)
+        for doc in self._text_matches(term):
+            scores.setdefault(doc, SCORE_TEXT)
+        if fuzzy and len(term) >= 3:
+            for doc, similarity in self._similar_names(term).items():
+                scores.setdefault(doc, similarity)
+        if kinds:
+            scores = {doc: score for doc, score in scores.items() if self.kinds[doc] in kinds}
+        return scores
+
+    def search(self, query, kinds=None, limit=SEARCH_LIMIT, fuzzy=True):
+        """Resultados em ordem de pontuação (e de nome, no empate)."""
+        scores = self.scores(query, kinds, fuzzy)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.keys[item[0]]))
+        return [
+            SearchResult(self.kinds[doc], self.ids[doc], self.names[doc], round(score, 3))
+            for doc, score in ranked[:limit]
+        ]
+
+    def pokemon_ids(self, query):
+        """
+        IDs dos Pokémon cujo nome contém o termo; sem nenhum, os de nome parecido.
+        Usado pela busca da lista, que mantém a ordem por ID.
+        """
+        term = normalize(query)
+        if not term:
+            return set()
+        found = {self.ids[doc] for doc in self._name_matches(term) if self.kinds[doc] == KIND_POKEMON}
+        if not found and len(term) >= 3:
+            found = {
+                self.ids[doc] for doc in self._similar_names(term)
+                if self.kinds[doc] == KIND_POKEMON
+            }
+        return found
+
+    def pokemon_ids_with_moves(self, query):
+        """IDs dos Pokémon com o termo no nome ou em algum de seus movimentos (busca do admin)."""
+        term = normalize(query)
+        found = set()
+        for doc in self._name_matches(term) if term else ():
+            if self.kinds[doc] == KIND_POKEMON:
+                found.add(self.ids[doc])
+            elif self.kinds[doc] == KIND_MOVE:
+                found |= self.pokemon_by_move.get(self.ids[doc], set())
+        return found
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_search_index():
+    """Retorna o índice da versão atual do catálogo, remontando-o quando ela muda."""
+    global _index
+    version = catalogue_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = SearchIndex.load(version)
+        return _index
+
+
+def invalidate_search_index():
+    """
+    Descarta o índice deste processo. Quem chama também troca a versão do
+    catálogo (`core/signals.py`, `core/sync.py`), o que avisa os demais.
+    """
+    global _index
+    _index = None
@@ -0,0 +1,48 @@
+"""
+Serialização JSON rápida para o feed da lista e a API.
+
+As respostas são montadas a partir de linhas simples (`.values()` ou os
+registros do retrato em core/snapshot.py) e de fragmentos já codificados:
+o JSON de cada card é gerado uma vez por versão do catálogo e depois só
+concatenado. O codificador é o `orjson` (em requirements.txt); num ambiente
+sem ele, o `json` da biblioteca padrão em modo compacto produz o mesmo
+conteúdo, só mais devagar.
+"""
+import json
+
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # Ambiente sem as dependências de requirements.txt
+    orjson = None
+
+
+class Fragment(bytes):
+    """JSON já codificado, copiado como está por `encode`."""
+
+
+def dumps(value):
+    """`value` em JSON compacto (UTF-8, bytes)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode(value):
+    """Como `dumps`, mas aceita `Fragment` em qualquer ponto de listas e dicionários."""
+    if isinstance(value, Fragment):
+        return bytes(value)
+    if isinstance(value, dict):
+        return b"{" + b",".join(dumps(str(key)) + b":" + encode(item) for key, item in value.items()) + b"}"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b",".join(encode(item) for item in value) + b"]"
+    return dumps(value)
+
+
+class FastJsonResponse(HttpResponse):
+    """`JsonResponse` sobre `encode`: aceita fragmentos e qualquer valor no topo (listas inclusive)."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=encode(data), **kwargs)
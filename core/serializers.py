@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Type
+from .type_chart import get_type_chart
 
 class TypeSerializer(serializers.ModelSerializer):
     damage_multipliers = serializers.SerializerMethodField()
@@ -12,5 +13,4 @@ class TypeSerializer(serializers.ModelSerializer):
         """
         Retorna os multiplicadores de dano para o tipo atual.
         """
-        def get_damage_multipliers(self, obj):
-            return obj.damage_multipliers()
\ No newline at end of file
+        return get_type_chart().multipliers_for(instance.name)
\ No newline at end of file
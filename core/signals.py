@@ -0,0 +1,102 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.atlas import invalidate_atlases
+from core.caching import bump_catalogue_version
+from core.catalogue_file import discard_catalogue_file
+from core.models import Ability, Move, Pokemon, PokemonSummary, Type
+from core.pokemon_index import invalidate_pokemon_index
+from core.search import invalidate_search_index
+from core.summaries import refresh_summaries
+from core.type_chart import invalidate_type_chart
+
+
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(m2m_changed, sender=Type.strong_against.through)
+@receiver(m2m_changed, sender=Type.weak_against.through)
+@receiver(m2m_changed, sender=Type.no_effect_against.through)
+def type_changed(sender, **kwargs):
+    """Tipos ou relações de efetividade mudaram: a tabela precisa ser recarregada."""
+    if kwargs.get("action", "post_").startswith("post_"):
+        invalidate_type_chart()
+
+
+@receiver(post_save, sender=Pokemon)
+@receiver(post_delete, sender=Pokemon)
+def pokemon_changed(sender, update_fields=None, **kwargs):
+    """Índice de nomes desatualizado quando um Pokémon é criado, renomeado ou removido."""
+    if update_fields is None or "name" in update_fields:
+        invalidate_pokemon_index()
+        invalidate_search_index()
+
+
+@receiver(post_save, sender=Move)
+@receiver(post_delete, sender=Move)
+@receiver(post_save, sender=Ability)
+@receiver(post_delete, sender=Ability)
+@receiver(m2m_changed, sender=Pokemon.moves.through)
+def search_document_changed(sender, **kwargs):
+    """Nomes, efeitos, descrições ou movimentos de um Pokémon mudaram: o índice de busca precisa ser remontado."""
+    if kwargs.get("action", "post_").startswith("post_"):
+        invalidate_search_index()
+
+
+@receiver(post_save, sender=Pokemon)
+def pokemon_saved(sender, instance, **kwargs):
+    """Mantém o resumo do card (core/summaries.py); ao remover o Pokémon, ele sai em cascata."""
+    refresh_summaries([instance.pk])
+
+
+@receiver(post_save, sender=Type)
+def type_saved(sender, instance, created, **kwargs):
+    """Nome ou cor do tipo aparecem nos resumos dos Pokémon desse tipo."""
+    if not created:
+        refresh_summaries(
+            Pokemon.objects.filter(Q(primary_type=instance) | Q(secondary_type=instance)).values("id")
+        )
+
+
+@receiver(post_delete, sender=Type)
+def type_deleted(sender, instance, **kwargs):
+    """Os Pokémon já ficaram sem o tipo (SET_NULL); os resumos ainda têm o nome dele."""
+    refresh_summaries(
+        PokemonSummary.objects.filter(
+            Q(primary_type_name=instance.name) | Q(secondary_type_name=instance.name)
+        ).values("pokemon_id")
+    )
+
+
+@receiver(post_save, sender=Pokemon)
+@receiver(post_delete, sender=Pokemon)
+@receiver(post_save, sender=Move)
+@receiver(post_delete, sender=Move)
+@receiver(post_save, sender=Ability)
+@receiver(post_delete, sender=Ability)
+@receiver(post_save, sender=Type)
+@receiver(post_delete, sender=Type)
+@receiver(m2m_changed, sender=Pokemon.moves.through)
+@receiver(m2m_changed, sender=Pokemon.abilities.through)
+@receiver(m2m_changed, sender=Type.strong_against.through)
+@receiver(m2m_changed, sender=Type.weak_against.through)
+@receiver(m2m_changed, sender=Type.no_effect_against.through)
+def catalogue_changed(sender, **kwargs):
+    """
+    Qualquer mudança no catálogo invalida os fragmentos e respostas em cache, o
+    retrato em memória e o catálogo binário (core/caching.py, core/snapshot.py,
+    core/catalogue_file.py). Vem depois dos receptores acima: a versão nova só
+    é vista com os resumos já regravados.
+    """
+    if kwargs.get("action", "post_").startswith("post_"):
+        bump_catalogue_version()
+        discard_catalogue_file()
+
+
+@receiver(post_delete, sender=Pokemon)
+def pokemon_deleted(sender, instance, **kwargs):
+    """
+    O atlas do bloco ainda mostraria o Pokémon removido, e os seguintes mudam de
+    posição na lista; serão remontados na próxima sincronização.
+    """
+    invalidate_atlases([instance.pk], following=True)
@@ -0,0 +1,139 @@
+"""
+Retrato em memória do catálogo, para as páginas de leitura não irem ao banco.
+
+O catálogo (cerca de 1025 Pokémon, 18 tipos e alguns milhares de movimentos)
+só muda numa sincronização ou no admin. Cada processo carrega um `Snapshot`
+imutável com quatro consultas e o usa até a versão do catálogo mudar
+(core/caching.py); o retrato novo é montado por inteiro e só então trocado,
+então uma requisição nunca vê metade de cada versão.
+
+Os registros têm `__slots__` e a mesma interface do `PokemonSummary` nos
+templates (veja core/summaries.py), mais o que a batalha usa: os IDs dos
+tipos e dos movimentos. Não lê o catálogo binário (veja core/catalogue_file.py).
+"""
+import threading
+from bisect import bisect_right
+
+from core.caching import catalogue_version
+from core.models import Move, Pokemon, PokemonSummary, Type
+from core.summaries import SUMMARY_FIELDS
+
+
+class PokemonRecord:
+    __slots__ = ("id", *SUMMARY_FIELDS, "primary_type_id", "secondary_type_id", "move_ids")
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def card_image_url(self):
+        return self.image_url
+
+    def thumbnail_srcset(self, extension="webp"):
+        return self.png_srcset if extension == "png" else self.srcset
+
+    def __str__(self):
+        return self.name
+
+
+class MoveRecord:
+    __slots__ = ("id", "name", "power", "accuracy", "type_id")
+
+    def __init__(self, id, name, power, accuracy, type_id):
+        self.id = id
+        self.name = name
+        self.power = power
+        self.accuracy = accuracy
+        self.type_id = type_id
+
+    def __str__(self):
+        return self.name
+
+
+class Snapshot:
+    """Pokémon (em ordem de ID) e movimentos, com índices por ID, nome e tipo."""
+
+    def __init__(self, pokemons, moves, type_names, version=None):
+        self.pokemons = tuple(pokemons)
+        self.ids = [pokemon.id for pokemon in self.pokemons]
+        self.by_id = {pokemon.id: pokemon for pokemon in self.pokemons}
+        self.by_name = {pokemon.name.lower(): pokemon for pokemon in self.pokemons}
+        self.by_type = {name: [] for name in type_names}
+        for pokemon in self.pokemons:
+            for name in {pokemon.primary_type_name, pokemon.secondary_type_name} - {""}:
+                self.by_type.setdefault(name, []).append(pokemon)
+        self.moves = tuple(sorted(moves, key=lambda move: move.id))
+        self.moves_by_id = {move.id: move for move in self.moves}
+        self.card_json = {}  # ID -> JSON do card no feed, preenchido sob demanda (core/views.py)
+        self.version = version
+
+    @classmethod
+    def load(cls, version=None):
+        move_ids = {}
+        for pokemon_id, move_id in Pokemon.moves.through.objects.order_by("id").values_list("pokemon_id", "move_id"):
+            move_ids.setdefault(pokemon_id, []).append(move_id)
+        rows = PokemonSummary.objects.order_by("pk").values(
+            "pokemon_id", *SUMMARY_FIELDS, "pokemon__primary_type_id", "pokemon__secondary_type_id"
+        )
+        pokemons = []
+        for row in rows:
+            pokemon_id = row.pop("pokemon_id")
+            pokemons.append(PokemonRecord(
+                id=pokemon_id,
+                primary_type_id=row.pop("pokemon__primary_type_id"),
+                secondary_type_id=row.pop("pokemon__secondary_type_id"),
+                move_ids=tuple(move_ids.get(pokemon_id, ())),
+                **row,
+            ))
+        moves = [MoveRecord(*row) for row in Move.objects.values_list("id", "name", "power", "accuracy", "type_id")]
+        return cls(pokemons, moves, Type.objects.values_list("name", flat=True), version)
+
+    def find(self, query):
+        """Pokémon pelo ID ou pelo primeiro (em ordem de ID) cujo nome contém `query`."""
+        if not query:
+            return None
+        if query.isdigit():
+            return self.by_id.get(int(query))
+        query = query.lower()
+        return next((pokemon for pokemon in self.pokemons if query in pokemon.name.lower()), None)
+
+    def of_type(self, type_name):
+        """Pokémon com o tipo como primário ou secundário; None se o tipo não existe."""
+        return self.by_type.get(type_name)
+
+    def moves_of(self, pokemon):
+        return [self.moves_by_id[move_id] for move_id in pokemon.move_ids if move_id in self.moves_by_id]
+
+    def find_move(self, query):
+        """Primeiro movimento (em ordem de ID) cujo nome contém `query`."""
+        if not query:
+            return None
+        query = query.lower()
+        return next((move for move in self.moves if query in move.name.lower()), None)
+
+
+def after(pokemons, cursor):
+    """Os Pokémon de `pokemons` (em ordem de ID) com ID maior que `cursor`."""
+    return pokemons[bisect_right(pokemons, cursor, key=lambda pokemon: pokemon.id):]
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Retrato da versão atual do catálogo, remontado quando ela muda."""
+    global _snapshot
+    version = catalogue_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = Snapshot.load(version)
+        return _snapshot
@@ -0,0 +1,78 @@
+"""
+Armazenamento endereçado por conteúdo para as imagens dos Pokémon.
+
+O nome do arquivo é o SHA-256 dos bytes (`pokemons/ab/abcdef….svg`): a
+mesma imagem é gravada uma única vez, mesmo que vários Pokémon a usem, e
+comparar o nome atual com o hash dos bytes baixados diz se ela mudou sem
+ler o arquivo gravado. Arquivos que nenhum Pokémon referencia mais são
+removidos por `cleanup_media`.
+"""
+import hashlib
+import os
+import posixpath
+import time
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+ORPHAN_GRACE_PERIOD = 60 * 60  # Segundos; arquivos recentes podem ser de uma gravação ainda não confirmada
+
+
+def content_digest(content):
+    """SHA-256 do conteúdo de um `File`, que volta ao início para ser gravado depois."""
+    sha = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """`FileSystemStorage` que grava cada conteúdo uma vez, sob o próprio hash."""
+
+    def __init__(self, **kwargs):
+        # Mesmo nome = mesmos bytes: sobrescrever (numa corrida entre processos) é inofensivo
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def content_name(self, name, content):
+        """Nome final de `content` enviado como `name` (o diretório e a extensão são mantidos)."""
+        digest = content_digest(content)
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], f"{digest}{extension}")
+
+    def save(self, name, content, max_length=None):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def orphans(self, directory, referenced, grace_period=ORPHAN_GRACE_PERIOD):
+        """
+        Arquivos de `directory` (e dos subdiretórios de hash) fora de `referenced`,
+        ignorando os modificados há menos de `grace_period` segundos.
+        """
+        if not self.exists(directory):
+            return []
+        cutoff = time.time() - grace_period
+        subdirectories, files = self.listdir(directory)
+        candidates = [posixpath.join(directory, name) for name in files]
+        for subdirectory in subdirectories:
+            if len(subdirectory) != 2:  # Só os diretórios de hash; `thumbs/` tem outro dono
+                continue
+            _, hashed = self.listdir(posixpath.join(directory, subdirectory))
+            candidates += [posixpath.join(directory, subdirectory, name) for name in hashed]
+        return [
+            name for name in candidates
+            if name not in referenced and os.path.getmtime(self.path(name)) < cutoff
+        ]
+
+
+def pokemon_image_storage():
+    """Storage de `Pokemon.image` (um callable, para não ir com caminhos absolutos para as migrações)."""
+    return _pokemon_image_storage
+
+
+_pokemon_image_storage = ContentAddressedStorage()
@@ -0,0 +1,78 @@
+"""
+Tabela desnormalizada dos cards (`PokemonSummary`).
+
+As páginas de leitura (lista, carrossel, feed JSON e comparação) leem uma
+linha pronta por Pokémon em vez de juntar `Pokemon` com `Type` e calcular o
+estilo, as URLs e o total de atributos a cada card. As linhas são regravadas
+pelo `PokemonWriter` na mesma transação dos Pokémon, pelos sinais de
+`Pokemon` e `Type` (core/signals.py) e pelo `sync_types` quando as cores dos
+tipos mudam.
+"""
+from core.images import thumbnail_srcset, thumbnail_url
+from core.models import Pokemon, PokemonSummary, card_background
+from core.storage import pokemon_image_storage
+
+STAT_FIELDS = ("hp", "attack", "defense", "special_attack", "special_defense", "speed")
+
+SOURCE_FIELDS = (
+    "id", "name", *STAT_FIELDS, "image", "image_url", "thumbnails",
+    "primary_type__name", "primary_type__color",
+    "secondary_type__name", "secondary_type__color",
+)
+
+SUMMARY_FIELDS = [
+    "name", "hp", "attack", "defense", "speed", "total_stats",
+    "primary_type_name", "primary_type_color", "secondary_type_name", "secondary_type_color",
+    "card_style", "image_url", "srcset", "png_srcset",
+]
+
+
+def summary_values(row):
+    """Campos do resumo a partir de uma linha de `Pokemon.objects.values(*SOURCE_FIELDS)`."""
+    stats = [row[field] for field in STAT_FIELDS]
+    thumbnails = row["thumbnails"] or {}
+    # Mesma ordem de Pokemon.card_image_url: miniatura PNG de 300px, SVG baixado, URL da PokéAPI
+    image_url = thumbnail_url(thumbnails, 300, "png") or (
+        pokemon_image_storage().url(row["image"]) if row["image"] else row["image_url"]
+    )
+    return {
+        "name": row["name"],
+        "hp": row["hp"],
+        "attack": row["attack"],
+        "defense": row["defense"],
+        "speed": row["speed"],
+        "total_stats": None if None in stats else sum(stats),
+        "primary_type_name": row["primary_type__name"] or "",
+        "primary_type_color": row["primary_type__color"] or "",
+        "secondary_type_name": row["secondary_type__name"] or "",
+        "secondary_type_color": row["secondary_type__color"] or "",
+        "card_style": card_background(row["primary_type__color"], row["secondary_type__color"]),
+        "image_url": image_url or "",
+        "srcset": thumbnail_srcset(thumbnails, "webp"),
+        "png_srcset": thumbnail_srcset(thumbnails, "png"),
+    }
+
+
+def write_summaries(pokemon_model, summary_model, pokemon_ids=None):
+    """
+    Regrava os resumos de `pokemon_ids` (um iterável ou uma subconsulta de IDs;
+    None para todos) com uma consulta e um upsert. Recebe os modelos para ser
+    usada também pela migração que cria a tabela. Devolve quantos gravou.
+    """
+    rows = pokemon_model.objects.values(*SOURCE_FIELDS)
+    if pokemon_ids is not None:
+        rows = rows.filter(id__in=pokemon_ids)
+    summaries = [summary_model(pokemon_id=row["id"], **summary_values(row)) for row in rows]
+    if summaries:
+        summary_model.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["pokemon"],
+            update_fields=SUMMARY_FIELDS,
+            batch_size=500,
+        )
+    return len(summaries)
+
+
+def refresh_summaries(pokemon_ids=None):
+    return write_summaries(Pokemon, PokemonSummary, pokemon_ids)
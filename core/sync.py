@@ -0,0 +1,488 @@
+"""
+Peças reutilizáveis da sincronização com a PokéAPI.
+
+Usadas pelo comando `sync_pokemons` e pelas tarefas Celery.
+"""
+import hashlib
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Ability, Move, Pokemon, ResourceFingerprint, SyncCheckpoint, Type
+from core.atlas import invalidate_atlases
+from core.caching import bump_catalogue_version
+from core.catalogue_file import discard_catalogue_file
+from core.pokemon_index import invalidate_pokemon_index
+from core.search import invalidate_search_index
+from core.summaries import refresh_summaries
+
+MAX_POKEMON_ID = 1025
+MAX_MOVES_PER_POKEMON = 20
+
+# IDs da Pokédex nacional de cada geração
+GENERATION_RANGES = {
+    1: (1, 151),
+    2: (152, 251),
+    3: (252, 386),
+    4: (387, 493),
+    5: (494, 649),
+    6: (650, 721),
+    7: (722, 809),
+    8: (810, 905),
+    9: (906, 1025),
+}
+
+# Espera antes de tentar de novo um ID que falhou: dobra a cada falha seguida
+RETRY_BACKOFF_BASE = timedelta(minutes=1)
+RETRY_BACKOFF_MAX = timedelta(days=1)
+
+# Campos atualizados quando o Pokémon já existe (a imagem é tratada à parte)
+POKEMON_UPDATE_FIELDS = [
+    "base_experience",
+    "height",
+    "weight",
+    "image_url",
+    "artwork_url",
+    "hp",
+    "attack",
+    "defense",
+    "special_attack",
+    "special_defense",
+    "speed",
+    "primary_type",
+    "secondary_type",
+    "generation",
+    "generation_number",
+]
+
+
+def english_effect(json_data):
+    """Retorna o texto de efeito em inglês de um movimento/habilidade."""
+    for entry in json_data.get("effect_entries", []):
+        if entry["language"]["name"] == "en":
+            return entry.get("effect")
+    return None
+
+
+def move_urls(pokemon_data):
+    return [entry["move"]["url"] for entry in pokemon_data["moves"][:MAX_MOVES_PER_POKEMON]]
+
+
+def ability_urls(pokemon_data):
+    return [entry["ability"]["url"] for entry in pokemon_data["abilities"]]
+
+
+def content_digest(data):
+    """Hash estável do JSON de um recurso."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Hashes do conteúdo de cada recurso da PokéAPI (Pokémon, movimento,
+    habilidade e tipo) vistos na última sincronização.
+
+    A espécie fica de fora: ela só é baixada para os Pokémon que já vão ser
+    gravados, então o hash dela nunca pouparia trabalho.
+
+    Os hashes são sempre registrados; com `skip_unchanged=True` (modo
+    incremental) `unchanged()` indica quais recursos podem ser ignorados.
+    Os hashes novos só são gravados em `save()`, depois que os dados
+    correspondentes foram gravados no banco.
+    """
+
+    def __init__(self, skip_unchanged=False):
+        self.skip_unchanged = skip_unchanged
+        self.known = dict(ResourceFingerprint.objects.values_list("url", "digest"))
+        self.pending = {}
+        self.counts = defaultdict(Counter)  # tipo -> changed / unchanged / failed
+
+    def unchanged(self, kind, url, data, force=False):
+        """
+        Registra o hash do recurso e diz se ele pode ser ignorado.
+        Com `force=True` o recurso é tratado como alterado de qualquer forma.
+        """
+        digest = content_digest(data)
+        if self.known.get(url) == digest and not force:
+            self.counts[kind]["unchanged"] += 1
+            return self.skip_unchanged
+        self.counts[kind]["changed"] += 1
+        self.pending[url] = digest
+        return False
+
+    def failed(self, kind):
+        self.counts[kind]["failed"] += 1
+
+    def clear(self):
+        """Descarta os hashes ainda não gravados (o lote correspondente falhou)."""
+        self.pending = {}
+
+    def save(self):
+        if not self.pending:
+            return
+        ResourceFingerprint.objects.bulk_create(
+            [ResourceFingerprint(url=url, digest=digest) for url, digest in self.pending.items()],
+            update_conflicts=True,
+            unique_fields=["url"],
+            update_fields=["digest", "updated_at"],
+        )
+        self.known.update(self.pending)
+        self.pending = {}
+
+
+class EntityRegistry:
+    """
+    Registro, válido por uma execução da sincronização, dos movimentos e
+    habilidades já resolvidos.
+
+    Cada URL distinta é buscada uma única vez e gravada em um único
+    `bulk_create` por lote; os Pokémon são ligados às instâncias em memória.
+    """
+
+    def __init__(self, client, warn=None, fingerprints=None, trust_database=False):
+        self.client = client
+        self.warn = warn or (lambda message: None)
+        self.fingerprints = fingerprints
+        # Usa direto o que já está no banco (já resolvido por outra tarefa da mesma execução)
+        self.trust_database = trust_database
+        self.moves = {}  # url -> Move (ou None, se a busca falhou)
+        self.abilities = {}  # url -> Ability (ou None, se a busca falhou)
+        self.types = {}
+
+    def get_type(self, name):
+        if name not in self.types:
+            self.types[name] = Type.objects.filter(name=name).first()
+        return self.types[name]
+
+    def load_types(self):
+        self.types = {t.name: t for t in Type.objects.all()}
+
+    def resolve(self, pokemons_data):
+        """Busca e grava os movimentos e habilidades ainda desconhecidos."""
+        move_names = {
+            entry["move"]["url"]: entry["move"]["name"]
+            for data in pokemons_data
+            for entry in data["moves"][:MAX_MOVES_PER_POKEMON]
+        }
+        ability_names = {
+            entry["ability"]["url"]: entry["ability"]["name"]
+            for data in pokemons_data
+            for entry in data["abilities"]
+        }
+        if self.trust_database:
+            self._load_existing(Move, self.moves, move_names)
+            self._load_existing(Ability, self.abilities, ability_names)
+        self.resolve_urls(move_names, ability_names)
+
+    def resolve_urls(self, move_names, ability_names):
+        """Resolve movimentos e habilidades dados como {url: nome}."""
+        new_moves = {url for url in move_names if url not in self.moves}
+        new_abilities = {url: name for url, name in ability_names.items() if url not in self.abilities}
+        if not new_moves and not new_abilities:
+            return
+
+        fetched = self.client.get_json_many(sorted(new_moves) + sorted(new_abilities))
+        self._resolve_moves(new_moves, fetched)
+        self._resolve_abilities(new_abilities, fetched)
+
+    def _load_existing(self, model, resolved, names_by_url):
+        missing = {url: name for url, name in names_by_url.items() if url not in resolved}
+        if not missing:
+            return
+        saved = model.objects.in_bulk(set(missing.values()), field_name="name")
+        resolved.update((url, saved[name]) for url, name in missing.items() if name in saved)
+
+    def _unchanged(self, kind, url, data):
+        return self.fingerprints is not None and self.fingerprints.unchanged(kind, url, data)
+
+    def _failed(self, kind):
+        if self.fingerprints is not None:
+            self.fingerprints.failed(kind)
+
+    def _resolve_moves(self, urls, fetched):
+        moves = {}
+        unchanged = set()
+        for url in urls:
+            self.moves[url] = None
+            move_json = fetched.get(url)
+            if move_json is None:
+                self._failed("move")
+                continue
+
+            type_name = move_json["type"]["name"]
+            move_type = self.get_type(type_name)
+            if not move_type:
+                self.warn(f"Tipo '{type_name}' não encontrado para o movimento '{move_json['name']}'")
+                continue
+
+            moves[url] = Move(
+                name=move_json["name"],
+                power=move_json.get("power"),
+                accuracy=move_json.get("accuracy"),
+                type=move_type,
+                effect=english_effect(move_json),
+            )
+            if self._unchanged("move", url, move_json):
+                unchanged.add(url)
+
+        if moves:
+            self.moves.update(
+                self._upsert(Move, moves, unchanged, ["power", "accuracy", "type", "effect"])
+            )
+
+    def _resolve_abilities(self, names_by_url, fetched):
+        abilities = {}
+        unchanged = set()
+        for url, name in names_by_url.items():
+            self.abilities[url] = None
+            ability_json = fetched.get(url)
+            if ability_json is None:
+                self._failed("ability")
+                self.warn(f"Erro ao buscar habilidade {name}")
+                continue
+
+            abilities[url] = Ability(
+                name=name,
+                description=english_effect(ability_json),
+            )
+            if self._unchanged("ability", url, ability_json):
+                unchanged.add(url)
+
+        if abilities:
+            self.abilities.update(self._upsert(Ability, abilities, unchanged, ["description"]))
+
+    def _upsert(self, model, objects_by_url, unchanged, update_fields):
+        """
+        Insere ou atualiza os objetos por nome e devolve {url: instância salva}.
+        Os de URL em `unchanged` só são gravados se ainda não existirem.
+        """
+        names = [obj.name for obj in objects_by_url.values()]
+        saved = model.objects.in_bulk(names, field_name="name") if unchanged else {}
+        to_write = [
+            obj for url, obj in objects_by_url.items()
+            if url not in unchanged or obj.name not in saved
+        ]
+        if to_write:
+            model.objects.bulk_create(
+                to_write,
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=update_fields,
+            )
+            saved.update(model.objects.in_bulk([obj.name for obj in to_write], field_name="name"))
+            transaction.on_commit(invalidate_search_index)
+            transaction.on_commit(bump_catalogue_version)
+            transaction.on_commit(discard_catalogue_file)
+        return {url: saved[obj.name] for url, obj in objects_by_url.items()}
+
+    def moves_for(self, pokemon_data):
+        """Instâncias de Move de um Pokémon, na ordem da PokéAPI e sem repetições."""
+        found = (self.moves.get(url) for url in move_urls(pokemon_data))
+        return list(dict.fromkeys(move for move in found if move is not None))
+
+    def abilities_for(self, pokemon_data):
+        found = (self.abilities.get(url) for url in ability_urls(pokemon_data))
+        return list(dict.fromkeys(ability for ability in found if ability is not None))
+
+
+class PendingPokemon:
+    """Pokémon já processado, aguardando gravação pelo `PokemonWriter`."""
+
+    def __init__(self, pokemon, moves, abilities, image=None, thumbnails=None):
+        self.pokemon = pokemon
+        self.moves = moves
+        self.abilities = abilities
+        self.image = image  # ContentFile da imagem a gravar, se houver
+        self.thumbnails = thumbnails  # Miniaturas recém-geradas (core/images.py), se houver
+        self.created = False
+
+
+class PokemonWriter:
+    """
+    Grava Pokémon em lote.
+
+    Cada `flush` roda em uma única transação: um `bulk_create` com
+    `update_conflicts` para os Pokémon, nas tabelas intermediárias de
+    movimentos e habilidades apenas as linhas que entram e as que saem, e
+    os resumos dos cards (`PokemonSummary`) do lote.
+    """
+
+    def __init__(self):
+        self.pending = []
+
+    def add(self, pokemon, moves, abilities, image=None, thumbnails=None):
+        self.pending.append(PendingPokemon(pokemon, moves, abilities, image, thumbnails))
+
+    def clear(self):
+        self.pending = []
+
+    def flush(self):
+        """Grava os Pokémon pendentes e devolve a lista de `PendingPokemon` gravados."""
+        batch, self.pending = self.pending, []
+        if not batch:
+            return []
+
+        names = [item.pokemon.name for item in batch]
+        with transaction.atomic():
+            existing = set(Pokemon.objects.filter(name__in=names).values_list("name", flat=True))
+            Pokemon.objects.bulk_create(
+                [item.pokemon for item in batch],
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=POKEMON_UPDATE_FIELDS,
+            )
+            saved = Pokemon.objects.in_bulk(names, field_name="name")
+
+            with_new_files = []
+            for item in batch:
+                current = saved[item.pokemon.name]
+                item.pokemon.pk = current.pk
+                item.pokemon.image = current.image
+                item.pokemon.thumbnails = item.thumbnails or current.thumbnails
+                item.created = item.pokemon.name not in existing
+                new_image = item.image is not None and image_name(item.image) != current.image.name
+                if new_image:
+                    item.pokemon.image.save(item.image.name, item.image, save=False)
+                if new_image or item.thumbnails:
+                    with_new_files.append(item.pokemon)
+            if with_new_files:
+                Pokemon.objects.bulk_update(with_new_files, ["image", "thumbnails"])
+
+            write_relation(
+                Pokemon.moves.through, "move_id",
+                {item.pokemon.pk: [move.pk for move in item.moves] for item in batch},
+            )
+            write_relation(
+                Pokemon.abilities.through, "ability_id",
+                {item.pokemon.pk: [ability.pk for ability in item.abilities] for item in batch},
+            )
+            refresh_summaries([item.pokemon.pk for item in batch])
+            # bulk_create não dispara sinais: Pokémon novos mudam o índice de nomes,
+            # e nomes ou movimentos gravados mudam o índice de busca
+            if any(item.created for item in batch):
+                transaction.on_commit(invalidate_pokemon_index)
+            transaction.on_commit(invalidate_search_index)
+            transaction.on_commit(bump_catalogue_version)
+            # O catálogo binário volta a valer quando a sincronização terminar e o exportar
+            transaction.on_commit(discard_catalogue_file)
+            # Pokémon novos ou com miniaturas novas mudam o atlas do bloco deles
+            stale = [item.pokemon.pk for item in batch if item.created or item.thumbnails]
+            if stale:
+                transaction.on_commit(lambda: invalidate_atlases(stale))
+        return batch
+
+
+def image_name(content):
+    """Nome que `content` terá em `Pokemon.image` (endereçado por conteúdo, veja core/storage.py)."""
+    field = Pokemon._meta.get_field("image")
+    return field.storage.content_name(field.generate_filename(None, content.name), content)
+
+
+def write_relation(through, field, wanted):
+    """
+    Deixa a tabela intermediária `through` igual a `wanted` ({pokemon_id: [ids]}),
+    inserindo e apagando somente a diferença. As linhas novas entram na ordem
+    de `wanted` (a da PokéAPI), sem repetições.
+    """
+    current = defaultdict(dict)
+    rows = through.objects.filter(pokemon_id__in=wanted).values_list("id", "pokemon_id", field)
+    for row_id, pokemon_id, related_id in rows:
+        current[pokemon_id][related_id] = row_id
+
+    to_delete = []
+    to_create = []
+    for pokemon_id, related_ids in wanted.items():
+        existing = current[pokemon_id]
+        related_ids = dict.fromkeys(related_ids)  # Sem repetições e, ao contrário de um set, na ordem dada
+        to_delete.extend(row_id for related_id, row_id in existing.items() if related_id not in related_ids)
+        to_create.extend(
+            through(pokemon_id=pokemon_id, **{field: related_id})
+            for related_id in related_ids
+            if related_id not in existing
+        )
+
+    if to_delete:
+        through.objects.filter(id__in=to_delete).delete()
+    if to_create:
+        through.objects.bulk_create(to_create)
+
+
+def retry_delay(attempts):
+    """Backoff exponencial para a `attempts`-ésima falha seguida de um ID."""
+    return min(RETRY_BACKOFF_BASE * 2 ** max(attempts - 1, 0), RETRY_BACKOFF_MAX)
+
+
+class Checkpoint:
+    """
+    Checkpoint persistente da sincronização, na tabela `SyncCheckpoint`:
+    IDs concluídos e IDs que falharam, com a próxima tentativa agendada.
+    """
+
+    def __init__(self):
+        self.entries = {entry.pokemon_id: entry for entry in SyncCheckpoint.objects.all()}
+
+    def done_ids(self):
+        return {pid for pid, entry in self.entries.items() if entry.status == SyncCheckpoint.STATUS_DONE}
+
+    def failed_ids(self, due_only=False):
+        """IDs que falharam; com `due_only`, só os cujo backoff já passou."""
+        now = timezone.now()
+        return {
+            pid for pid, entry in self.entries.items()
+            if entry.status == SyncCheckpoint.STATUS_FAILED
+            and (not due_only or entry.next_attempt_at is None or entry.next_attempt_at <= now)
+        }
+
+    def pending(self, ids):
+        """IDs de `ids` que ainda não foram concluídos e não estão em backoff."""
+        skip = self.done_ids() | (self.failed_ids() - self.failed_ids(due_only=True))
+        return [pid for pid in ids if pid not in skip]
+
+    def restart(self, ids):
+        """
+        Começa uma execução nova sobre `ids`: os concluídos de execuções
+        anteriores voltam a ser pendentes, para um `--resume` desta execução
+        não pular o que ela ainda não alcançou. As falhas (e o backoff) ficam.
+        """
+        done = self.done_ids().intersection(ids)
+        if not done:
+            return
+        SyncCheckpoint.objects.filter(status=SyncCheckpoint.STATUS_DONE, pokemon_id__in=done).delete()
+        for pid in done:
+            del self.entries[pid]
+
+    def mark_done(self, ids):
+        self._save([
+            SyncCheckpoint(pokemon_id=pid, status=SyncCheckpoint.STATUS_DONE, attempts=0)
+            for pid in ids
+        ])
+
+    def mark_failed(self, ids, error):
+        now = timezone.now()
+        entries = []
+        for pid in ids:
+            previous = self.entries.get(pid)
+            attempts = previous.attempts + 1 if previous and previous.status == SyncCheckpoint.STATUS_FAILED else 1
+            entries.append(SyncCheckpoint(
+                pokemon_id=pid,
+                status=SyncCheckpoint.STATUS_FAILED,
+                attempts=attempts,
+                last_error=str(error),
+                next_attempt_at=now + retry_delay(attempts),
+            ))
+        self._save(entries)
+
+    def _save(self, entries):
+        if not entries:
+            return
+        SyncCheckpoint.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["pokemon_id"],
+            update_fields=["status", "attempts", "last_error", "next_attempt_at", "updated_at"],
+        )
+        self.entries.update((entry.pokemon_id, entry) for entry in entries)
@@ -1,20 +1,214 @@
-from celery import shared_task
+from io import StringIO
+
+from celery import chain, chord, group, shared_task
+from core.atlas import build_missing_atlases
+from core.catalogue_file import export_catalogue
 from core.management.commands.sync_pokemons import Command as SyncCommand
-import requests
-from core.models import Pokemon
+from core.models import Pokemon, SyncRun
+from core.pokeapi import pokeapi_url
 from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+CHUNK_SIZE = 50  # Pokémon por tarefa
+RESOLVE_CHUNK_SIZE = 100  # Movimentos/habilidades por tarefa
+
 
 @shared_task
 def sync_pokemon_task(pokemon_id):
     """Sincroniza um único Pokémon pelo ID."""
     pokemon = Pokemon.objects.get(id=pokemon_id)
-    url = f"https://pokeapi.co/api/v2/pokemon/{pokemon.name.lower()}/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        sync_command = SyncCommand()
-        sync_command.sync_pokemon(data)
-        connection.close()
+    command = new_command()
+    try:
+        data = command.fetch_json(pokeapi_url(f"pokemon/{pokemon.name.lower()}/"))
+        if data is None:
+            return f"Erro ao atualizar o Pokémon {pokemon.name}."
+        command.sync_pokemon(data)
         return f"Pokémon {pokemon.name} atualizado com sucesso!"
-    
-    return f"Erro ao atualizar o Pokémon {pokemon.name}."
\ No newline at end of file
+    finally:
+        command.client.close()
+        connection.close()
+
+
+def chunked(items, size):
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def start_sync_run(ids=None, names=None, chunk_size=CHUNK_SIZE, incremental=False, resolve_all=False):
+    """
+    Dispara a sincronização distribuída e retorna o `SyncRun` que acompanha o progresso.
+
+    `ids` são IDs da PokéAPI; `names`, nomes de Pokémon já cadastrados (usado
+    pelo admin). Com `resolve_all`, todos os movimentos e habilidades da
+    PokéAPI são resolvidos antes, em tarefas próprias, e as tarefas de
+    Pokémon só ligam os registros já gravados.
+    """
+    chunks = chunked(names if names is not None else ids, chunk_size)
+    run = SyncRun.objects.create(total=sum(len(chunk) for chunk in chunks), chunks=len(chunks))
+    if names is not None:
+        header = [sync_named_chunk_task.si(run.pk, chunk) for chunk in chunks]
+    else:
+        header = [
+            sync_chunk_task.si(run.pk, chunk, incremental=incremental, trust_database=resolve_all)
+            for chunk in chunks
+        ]
+
+    steps = [sync_types_task.si()]
+    if resolve_all:
+        steps.append(group(
+            resolve_all_task.si("move", incremental=incremental),
+            resolve_all_task.si("ability", incremental=incremental),
+        ))
+    steps.append(chord(header, finish_sync_run_task.s(run.pk)))
+    chain(*steps).apply_async()
+    return run
+
+
+def new_command(incremental=False, trust_database=False):
+    command = SyncCommand(stdout=StringIO())
+    command.prepare(incremental=incremental)
+    command.registry.trust_database = trust_database
+    command.registry.load_types()
+    return command
+
+
+def chunk_stats(command, requested, synced, failed):
+    """Estatísticas de uma tarefa, agregadas depois por `finish_sync_run_task`."""
+    return {
+        "requested": requested,
+        "synced": synced,
+        "failed": failed,
+        "requests": dict(command.client.stats),
+        "resources": {kind: dict(counts) for kind, counts in command.fingerprints.counts.items()},
+    }
+
+
+def chunk_failed(command, run_id, chunk, error):
+    """
+    A tarefa do lote quebrou: todos os seus IDs contam como falha e o erro
+    vai no resultado, para o chord terminar mesmo assim e
+    `finish_sync_run_task` registrar o lote.
+    """
+    record_progress(run_id, len(chunk), len(chunk))
+    stats = chunk_stats(command, len(chunk), 0, len(chunk))
+    stats["error"] = {"first": chunk[0], "last": chunk[-1], "message": repr(error)}
+    return stats
+
+
+def record_progress(run_id, processed, failed):
+    SyncRun.objects.filter(pk=run_id).update(
+        completed=F("completed") + processed - failed,
+        failed=F("failed") + failed,
+        chunks_done=F("chunks_done") + 1,
+    )
+
+
+@shared_task
+def sync_types_task():
+    """Sincroniza os tipos (primeiro passo da sincronização distribuída)."""
+    command = SyncCommand(stdout=StringIO())
+    command.prepare()
+    try:
+        command.sync_types()
+    finally:
+        command.client.close()
+        connection.close()
+
+
+@shared_task(bind=True)
+def resolve_all_task(self, kind, incremental=False):
+    """Lista todos os movimentos ou habilidades da PokéAPI e divide a resolução em tarefas."""
+    command = SyncCommand(stdout=StringIO())
+    command.prepare()
+    try:
+        listing = command.client.get_json(pokeapi_url(f"{kind}/?limit=100000"))
+    finally:
+        command.client.close()
+    if listing is None:
+        return 0
+
+    names = {entry["url"]: entry["name"] for entry in listing["results"]}
+    tasks = [
+        resolve_chunk_task.si(kind, dict(chunk), incremental=incremental)
+        for chunk in chunked(names.items(), RESOLVE_CHUNK_SIZE)
+    ]
+    raise self.replace(group(tasks))
+
+
+@shared_task
+def resolve_chunk_task(kind, names_by_url, incremental=False):
+    """Busca e grava um lote de movimentos ou habilidades ({url: nome})."""
+    command = new_command(incremental=incremental)
+    try:
+        if kind == "move":
+            command.registry.resolve_urls(names_by_url, {})
+        else:
+            command.registry.resolve_urls({}, names_by_url)
+        command.save_fingerprints()
+    finally:
+        command.client.close()
+        connection.close()
+    return len(names_by_url)
+
+
+@shared_task
+def sync_chunk_task(run_id, ids, incremental=False, trust_database=False):
+    """Sincroniza um lote de Pokémon pelos IDs da PokéAPI."""
+    command = new_command(incremental=incremental, trust_database=trust_database)
+    try:
+        synced = command.sync_pokemons(batch_size=len(ids), ids=ids)
+        failed = len(command.checkpoint.failed_ids() & set(ids))
+        record_progress(run_id, len(ids), failed)
+        return chunk_stats(command, len(ids), synced, failed)
+    except Exception as error:
+        return chunk_failed(command, run_id, ids, error)
+    finally:
+        command.client.close()
+        connection.close()
+
+
+@shared_task
+def sync_named_chunk_task(run_id, names):
+    """Sincroniza um lote de Pokémon já cadastrados, buscando-os pelo nome."""
+    command = new_command()
+    try:
+        urls = [pokeapi_url(f"pokemon/{name.lower()}/") for name in names]
+        results = command.client.get_json_many(urls)
+        pokemons_data = [data for data in results.values() if data is not None]
+        synced = len(command.sync_batch(pokemons_data))
+        failed = len(names) - len(pokemons_data)
+        record_progress(run_id, len(names), failed)
+        return chunk_stats(command, len(names), synced, failed)
+    except Exception as error:
+        return chunk_failed(command, run_id, names, error)
+    finally:
+        command.client.close()
+        connection.close()
+
+
+@shared_task
+def finish_sync_run_task(results, run_id):
+    """Soma as estatísticas de todos os lotes e encerra a execução, com falhas se algum lote ou ID falhou."""
+    totals = {"requested": 0, "synced": 0, "failed": 0, "requests": {}, "resources": {}, "failed_chunks": []}
+    for result in results:
+        if "error" in result:
+            totals["failed_chunks"].append(result["error"])
+        for key in ("requested", "synced", "failed"):
+            totals[key] += result[key]
+        for key, value in result["requests"].items():
+            totals["requests"][key] = totals["requests"].get(key, 0) + value
+        for kind, counts in result["resources"].items():
+            kind_totals = totals["resources"].setdefault(kind, {})
+            for key, value in counts.items():
+                kind_totals[key] = kind_totals.get(key, 0) + value
+
+    totals["atlases"] = build_missing_atlases()
+    totals["catalogue"] = export_catalogue()
+    SyncRun.objects.filter(pk=run_id).update(
+        status=SyncRun.STATUS_FAILED if totals["failed_chunks"] or totals["failed"] else SyncRun.STATUS_DONE,
+        stats=totals,
+        finished_at=timezone.now(),
+    )
+    connection.close()
+    return totals
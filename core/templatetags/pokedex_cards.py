@@ -0,0 +1,36 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.atlas import sprite_for
+from core.caching import card_cache
+
+register = template.Library()
+
+
+@register.simple_tag
+def pokemon_card(pokemon):
+    """Card da lista, renderizado uma vez por versão do catálogo."""
+    html = card_cache.get_or_set(
+        pokemon.pk, lambda: render_to_string('pokedex/_card.html', {'pokemon': pokemon})
+    )
+    return mark_safe(html)
+
+
+@register.inclusion_tag('pokedex/_picture.html')
+def pokemon_picture(pokemon, width=200, css_class='pokemon-img mx-auto d-block mt-3', fallback='', atlas=False):
+    """
+    Imagem do Pokémon com as miniaturas em `srcset` (WebP, com PNG de reserva),
+    para o navegador escolher a menor que cubra `width` pixels na tela.
+    Com `atlas`, usa o recorte do atlas de sprites do bloco, se houver.
+    """
+    return {
+        'pokemon': pokemon,
+        'sprite': sprite_for(pokemon.pk) if atlas else None,
+        'webp_srcset': pokemon.thumbnail_srcset('webp'),
+        'png_srcset': pokemon.thumbnail_srcset('png'),
+        'src': pokemon.card_image_url or fallback,
+        'sizes': f'{width}px',
+        'width': width,
+        'css_class': css_class,
+    }
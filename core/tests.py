@@ -1,3 +1,1386 @@
-from django.test import TestCase
+import csv
+import hashlib
+import threading
+from argparse import ArgumentTypeError
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import json
+import re
+import shutil
+import time
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import requests
+from PIL import Image
+
+from core.atlas import ATLAS_BLOCK_SIZE, ATLAS_COLUMNS, CARD_SPRITE_SIZE, build_atlas, build_missing_atlases, sprite_map
+from core import caching, catalogue_file
+from core.caching import bump_catalogue_version, cache_stats, catalogue_version
+from core.catalogue_file import discard_catalogue_file, export_catalogue, get_catalogue_file
+from core.export import export_ndjson
+from core.images import THUMBNAIL_SIZES, render_thumbnails, save_thumbnails, thumbnail_paths
+from core.management.commands.sync_pokemons import Command as SyncCommand, parse_ids
+from core.http_cache import ResponseCache
+from core.pokeapi import PokeAPIClient
+from core.models import (
+    Ability, CatalogueVersion, Move, Pokemon, PokemonSummary, ResourceFingerprint, SpriteAtlas, SyncCheckpoint, SyncRun,
+    Type,
+)
+from core.pokemon_index import VERSION_KEY as POKEMON_INDEX_VERSION_KEY
+from core.pokemon_index import get_index_version, invalidate_pokemon_index
+from core import serialization, tasks
+from core.search import get_search_index, invalidate_search_index
+from core.serializers import TypeSerializer
+from core.snapshot import get_snapshot
+from core.sync import (
+    MAX_POKEMON_ID,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    Checkpoint,
+    EntityRegistry,
+    FingerprintStore,
+    PokemonWriter,
+    image_name,
+    retry_delay,
+    write_relation,
+)
+from core.type_chart import get_type_chart
+from core.views import PokemonBattleView, damage_matrix_payload
+
+
+# Cache do Django só dos testes: sem isso eles leriam e gravariam o `.cache/django` do
+# desenvolvedor (o mesmo do runserver) e a versão do catálogo passaria de um teste a outro
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pokedex-tests'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CatalogueTestCase(TestCase):
+    """`TestCase` com o cache compartilhado e os caches deste processo vazios a cada teste."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for tiered in caching._caches.values():
+            tiered.clear_local()
+        # O rollback de cada teste devolveria a versão a um valor já usado, e o retrato, a tabela
+        # de tipos e o índice de busca deste processo, montados por versão, passariam ao teste seguinte
+        CatalogueVersion.objects.update_or_create(
+            pk=1, defaults={'value': time.time_ns() // 1000, 'modified_at': time.time()}
+        )
+        # A versão é relida do banco uma vez por segundo; essa consulta fica fora dos orçamentos das páginas
+        for patcher in (
+            mock.patch.dict(caching._version, {'value': None, 'modified': None, 'checked_at': 0.0}),
+            mock.patch.object(caching, 'VERSION_CHECK_INTERVAL', 60),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class QueryBudgetTests(CatalogueTestCase):
+    """
+    Cada página tem um número fixo de consultas ao banco, que não pode
+    crescer com a quantidade de Pokémon exibidos.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        fire = Type.objects.create(name='fire', color='#F08030')
+        water = Type.objects.create(name='water', color='#6890F0')
+        fire.strong_against.add(Type.objects.create(name='grass', color='#78C850'))
+        water.strong_against.add(fire)
+        ember = Move.objects.create(name='ember', power=40, accuracy=100, type=fire)
+        bubble = Move.objects.create(name='bubble', power=40, accuracy=100, type=water)
+
+        for i in range(1, 31):
+            pokemon = Pokemon.objects.create(
+                name=f'pokemon{i}',
+                base_experience=50,
+                height=10,
+                weight=100,
+                image=f'pokemons/pokemon{i}.svg',
+                hp=40 + i,
+                attack=50 + i,
+                defense=45 + i,
+                special_attack=50,
+                special_defense=50,
+                speed=60,
+                primary_type=fire if i % 2 else water,
+                secondary_type=water if i % 3 == 0 else None,
+            )
+            pokemon.moves.add(ember, bubble)
+
+    def setUp(self):
+        super().setUp()
+        # A tabela de efetividade e o índice de busca são carregados uma vez por processo,
+        # fora do orçamento das páginas
+        # O rollback entre os testes não dispara sinais: fragmentos de outro teste não valem mais
+        bump_catalogue_version()
+        get_type_chart()
+        invalidate_search_index()
+        get_search_index()
+        # O mapa dos atlas de sprites e o retrato do catálogo também ficam em memória por versão
+        sprite_map()
+        get_snapshot()
+
+    def assertQueryBudget(self, budget, url, **params):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_page(self):
+        self.assertQueryBudget(0, reverse('buscar_pokemons'))
+
+    def test_detail_page_cached(self):
+        pokemon = Pokemon.objects.get(name='pokemon3')
+        url = reverse('detalhe_pokemon', args=[pokemon.pk])
+        # Pokémon + habilidades + movimentos; depois, só o cache
+        first = self.assertQueryBudget(3, url)
+        self.assertContains(first, 'ember')
+        cached = self.assertQueryBudget(0, url)
+        self.assertEqual(cached.content, first.content)
+
+        pokemon.moves.remove(Move.objects.get(name='ember'))
+        self.assertNotContains(self.client.get(url), 'ember')
+
+    def test_list_cards_cached(self):
+        self.client.get(reverse('buscar_pokemons'))
+        before = cache_stats()['caches']['card']
+        self.client.get(reverse('buscar_pokemons'))
+        after = cache_stats()['caches']['card']
+        self.assertEqual(after['misses'], before['misses'])
+        self.assertEqual(after['local_hits'] - before['local_hits'], 21)
+
+    def test_pokemon_moves_cached(self):
+        url = reverse('pokemon-moves', args=['Pokemon3'])
+        response = self.assertQueryBudget(0, url)
+        self.assertEqual([move['name'] for move in response.json()], ['ember', 'bubble'])
+        self.assertEqual(self.client.get(reverse('pokemon-moves', args=['missingno'])).status_code, 404)
+
+    def test_conditional_responses(self):
+        pokemon = Pokemon.objects.get(name='pokemon3')
+        urls = [
+            reverse('buscar_pokemons'),
+            reverse('buscar_pokemons') + '?format=json&page=2',
+            reverse('detalhe_pokemon', args=[pokemon.pk]),
+            reverse('type-list'),
+            reverse('pokemon-moves', args=['pokemon3']),
+        ]
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+            etags[url] = response['ETag']
+            with self.assertNumQueries(0):
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304)
+            since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(since.status_code, 304)
+        self.assertEqual(len(set(etags.values())), len(urls))
+
+        # Uma edição (admin ou sincronização) muda a versão do catálogo
+        pokemon.hp = 1
+        pokemon.save()
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_json(self):
+        response = self.assertQueryBudget(0, reverse('buscar_pokemons'), page=2, format='json')
+        self.assertEqual(len(response.json()['pokemons']), 9)
+
+    def test_list_filtered_by_type(self):
+        response = self.assertQueryBudget(0, reverse('buscar_pokemons'), type='water', format='json')
+        # 15 com tipo primário water + 5 com water como tipo secundário
+        self.assertEqual(len(response.json()['pokemons']), 20)
+
+    def test_list_search(self):
+        self.assertQueryBudget(0, reverse('buscar_pokemons'), query='pokemon1')
+
+    def test_compare(self):
+        response = self.assertQueryBudget(
+            0, reverse('comparar_pokemons'), pokemon1='pokemon3', pokemon2='4'
+        )
+        self.assertEqual(response.context['pokemon1'].name, 'pokemon3')
+
+    def test_battle(self):
+        response = self.assertQueryBudget(
+            0,
+            reverse('pokemon-battle'),
+            pokemon1='pokemon3', pokemon2='pokemon4', move1='ember', move2='bubble',
+        )
+        self.assertIsNotNone(response.context['damage_to_pokemon2'])
+
+    def test_cursor_feed(self):
+        page = self.client.get(reverse('buscar_pokemons'))
+        ids = list(Pokemon.objects.order_by('id').values_list('id', flat=True))
+        cursor = page.context['next_cursor']
+        self.assertEqual(cursor, ids[20])
+
+        response = self.assertQueryBudget(0, reverse('buscar_pokemons'), cursor=cursor, format='json')
+        data = response.json()
+        self.assertEqual([pokemon['id'] for pokemon in data['pokemons']], ids[21:])
+        self.assertFalse(data['has_next'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_snapshot_follows_catalogue(self):
+        snapshot = get_snapshot()
+        pokemon = Pokemon.objects.create(
+            name='novo', base_experience=1, height=1, weight=1, primary_type=Type.objects.get(name='water'),
+        )
+        self.assertIsNot(get_snapshot(), snapshot)
+        response = self.client.get(reverse('buscar_pokemons'), {'type': 'water', 'format': 'json'})
+        self.assertIn(pokemon.pk, [card['id'] for card in response.json()['pokemons']])
+        self.assertEqual(self.client.get(reverse('buscar_pokemons'), {'type': 'nenhum'}).status_code, 404)
+
+    def test_pokemon_batch(self):
+        ids = list(Pokemon.objects.order_by('-id').values_list('id', flat=True)[:3])
+        response = self.assertQueryBudget(
+            2, reverse('pokemon-batch'), ids=','.join(map(str, ids + [999])), fields='name,hp,moves.name,moves.power'
+        )
+        data = response.json()
+        self.assertEqual([pokemon['id'] for pokemon in data['pokemons']], ids)
+        self.assertEqual(data['missing'], [999])
+        self.assertEqual(set(data['pokemons'][0]), {'id', 'name', 'hp', 'moves'})
+        self.assertEqual(data['pokemons'][0]['moves'], [{'name': 'ember', 'power': 40}, {'name': 'bubble', 'power': 40}])
+
+        # Pokémon, movimentos e habilidades: três consultas para qualquer quantidade
+        names = ','.join(f'POKEMON{i}' for i in range(1, 31))
+        data = self.assertQueryBudget(
+            3, reverse('pokemon-batch'), names=names, fields='primary_type,moves.type,abilities'
+        ).json()
+        self.assertEqual(len(data['pokemons']), 30)
+        self.assertEqual(data['pokemons'][1]['primary_type'], 'water')
+        self.assertEqual(data['pokemons'][1]['abilities'], [])
+
+    def test_pokemon_batch_invalid(self):
+        url = reverse('pokemon-batch')
+        for params in ({}, {'ids': '1,a'}, {'ids': '1', 'fields': 'moves.pp'}, {'ids': '1', 'fields': 'hp.x'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_catalogue_export(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('export-ndjson'))
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        pokemons = [json.loads(line) for line in lines]
+        self.assertEqual([pokemon['name'] for pokemon in pokemons], [f'pokemon{i}' for i in range(1, 31)])
+        self.assertEqual(pokemons[2]['secondary_type'], 'water')
+        self.assertEqual(pokemons[2]['moves'], ['ember', 'bubble'])
+        self.assertEqual(pokemons[2]['abilities'], [])
+
+        # Movimentos e habilidades: duas consultas por bloco, não por Pokémon
+        with self.assertNumQueries(1 + 3 * 2):
+            self.assertEqual(b''.join(export_ndjson(chunk_size=10)).splitlines(), lines)
+
+        response = self.client.get(reverse('export-csv'), headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = list(csv.DictReader(gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[2]['moves'], 'ember|bubble')
+        self.assertEqual(rows[0]['secondary_type'], '')
+
+    def test_type_list_fast_path(self):
+        data = self.assertQueryBudget(1, reverse('type-list')).json()
+        self.assertEqual(data, TypeSerializer(Type.objects.order_by('id'), many=True).data)
+        self.assertEqual(data[0]['damage_multipliers'], {'fire': 1.0, 'water': 1.0, 'grass': 2.0})
+        self.assertQueryBudget(0, reverse('type-list'))
+
+    def test_json_without_orjson(self):
+        expected = self.client.get(reverse('buscar_pokemons'), {'format': 'json'}).json()
+        original, serialization.orjson = serialization.orjson, None
+        self.addCleanup(setattr, serialization, 'orjson', original)
+        bump_catalogue_version()
+        self.assertEqual(self.client.get(reverse('buscar_pokemons'), {'format': 'json'}).json(), expected)
+
+    def test_benchmark_json(self):
+        output = StringIO()
+        call_command('benchmark_json', repeat=1, stdout=output)
+        rows = output.getvalue().splitlines()[2:]
+        # Só os tamanhos que cabem no catálogo (30 Pokémon)
+        self.assertEqual([row.split()[0] for row in rows], ['21'])
+        Pokemon.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'Catálogo vazio'):
+            call_command('benchmark_json', stdout=StringIO())
+
+    def test_cursor_feed_invalid(self):
+        response = self.client.get(reverse('buscar_pokemons'), {'cursor': 'abc', 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_carousel(self):
+        response = self.assertQueryBudget(0, reverse('carrossel_pokemons'))
+        self.assertEqual(len(response.context['pokemons']), 10)
+
+        data = self.assertQueryBudget(
+            0, reverse('carrossel_pokemons'), cursor=response.context['next_cursor'], format='json'
+        ).json()
+        self.assertEqual(len(data['pokemons']), 10)
+        self.assertTrue(data['has_next'])
+
+        # carrossel.js repete os filtros da página no feed
+        filtered = self.client.get(reverse('carrossel_pokemons'), {'type': 'water'})
+        self.assertContains(filtered, 'pokedex/js/picture.js')
+        data = self.assertQueryBudget(
+            0, reverse('carrossel_pokemons'), type='water', cursor=filtered.context['next_cursor'], format='json'
+        ).json()
+        self.assertEqual(len(data['pokemons']), 10)
+        self.assertTrue(all('water' in (pokemon['primary_type'], pokemon['secondary_type']) for pokemon in data['pokemons']))
+
+    def test_pokemon_index(self):
+        invalidate_pokemon_index()
+        response = self.assertQueryBudget(1, reverse('pokemon-index'))
+        self.assertEqual(len(response.json()['pokemons']), 30)
+        # Já no cache: nenhuma consulta, e o navegador recebe 304 pelo ETag
+        cached = self.assertQueryBudget(0, reverse('pokemon-index'))
+        self.assertEqual(cached.json(), response.json())
+        not_modified = self.client.get(reverse('pokemon-index'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_pokemon_index_invalidated_on_create(self):
+        version = self.client.get(reverse('pokemon-index')).json()['version']
+        Pokemon.objects.create(name='novo', base_experience=1, height=1, weight=1)
+        data = self.client.get(reverse('pokemon-index')).json()
+        self.assertNotEqual(data['version'], version)
+        self.assertIn('novo', [name for _, name in data['pokemons']])
+
+    def test_pokemon_index_version_survives_cache_restart(self):
+        version = get_index_version()
+        invalidate_pokemon_index()
+        bumped = get_index_version()
+        self.assertGreater(bumped, version)
+        # Cache reiniciado: a versão recomeça do relógio, nunca de um valor já servido como imutável
+        cache.delete(POKEMON_INDEX_VERSION_KEY)
+        self.assertGreater(get_index_version(), bumped)
+
+    def test_pokemon_search(self):
+        results = self.client.get(reverse('pokemon-search'), {'q': 'pokemon2'}).json()['results']
+        # Prefixo exato primeiro, limitado a 10 sugestões
+        self.assertEqual(results[0]['name'], 'pokemon2')
+        self.assertEqual(len(results), 10)
+        results = self.client.get(reverse('pokemon-search'), {'q': 'mon30'}).json()['results']
+        self.assertEqual([result['name'] for result in results], ['pokemon30'])
+
+
+class SearchIndexTests(CatalogueTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fire = Type.objects.create(name='fire', color='#F08030')
+        cls.ember = Move.objects.create(name='ember', type=fire, effect='May burn the target.')
+        Move.objects.create(name='flamethrower', type=fire, effect='Has a chance to burn the target.')
+        Ability.objects.create(name='blaze', description='Powers up Fire-type moves in a pinch.')
+        for name in ('charmander', 'charmeleon', 'charizard', 'flabébé', 'mr-mime'):
+            pokemon = Pokemon.objects.create(name=name, base_experience=1, height=1, weight=1)
+            if name.startswith('char'):
+                pokemon.moves.add(cls.ember)
+
+    def setUp(self):
+        super().setUp()
+        # O rollback entre os testes não dispara sinais
+        invalidate_search_index()
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(result['kind'], result['name']) for result in response.json()['results']]
+
+    def test_ranking(self):
+        # Nome exato, depois prefixos, depois nomes parecidos
+        self.assertEqual(self.search('charmander')[0], ('pokemon', 'charmander'))
+        self.assertEqual(
+            [name for _, name in self.search('charm')], ['charmander', 'charmeleon', 'charizard']
+        )
+
+    def test_text_and_kind_filter(self):
+        self.assertEqual(self.search('burn'), [('move', 'ember'), ('move', 'flamethrower')])
+        self.assertEqual(self.search('fire', kind='ability'), [('ability', 'blaze')])
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'x', 'kind': 'item'}).status_code, 400)
+
+    def test_fuzzy_and_accents(self):
+        self.assertIn(('pokemon', 'charizard'), self.search('charzard'))
+        self.assertEqual(self.search('flabebe')[0], ('pokemon', 'flabébé'))
+        self.assertEqual(self.search('mr mime')[0], ('pokemon', 'mr-mime'))
+
+    def test_index_follows_model_changes(self):
+        Move.objects.create(name='inferno', effect='Always burns.')
+        self.assertIn(('move', 'inferno'), self.search('inferno'))
+        Pokemon.objects.get(name='mr-mime').delete()
+        self.assertNotIn(('pokemon', 'mr-mime'), self.search('mime'))
+
+    def test_pokemon_ids_with_moves(self):
+        index = get_search_index()
+        names = set(Pokemon.objects.filter(id__in=index.pokemon_ids_with_moves('ember')).values_list('name', flat=True))
+        self.assertEqual(names, {'charmander', 'charmeleon', 'charizard'})
+
+
+class PokemonSummaryTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fire = Type.objects.create(name='fire', color='#F08030')
+        self.flying = Type.objects.create(name='flying', color='#A890F0')
+        self.charizard = Pokemon.objects.create(
+            name='charizard', base_experience=240, height=17, weight=905,
+            hp=78, attack=84, defense=78, special_attack=109, special_defense=85, speed=100,
+            primary_type=self.fire, secondary_type=self.flying,
+            image_url='https://example.com/charizard.svg',
+        )
+
+    def test_summary_follows_pokemon_and_types(self):
+        summary = PokemonSummary.objects.get(pk=self.charizard.pk)
+        self.assertEqual(summary.total_stats, self.charizard.total_stats())
+        self.assertEqual(summary.card_style, self.charizard.card_style)
+        self.assertEqual((summary.primary_type_name, summary.secondary_type_name), ('fire', 'flying'))
+        self.assertEqual(summary.image_url, 'https://example.com/charizard.svg')
+
+        self.charizard.speed = None
+        self.charizard.save()
+        self.assertIsNone(PokemonSummary.objects.get(pk=self.charizard.pk).total_stats)
+
+        self.fire.color = '#FF0000'
+        self.fire.save()
+        self.assertIn('#FF0000', PokemonSummary.objects.get(pk=self.charizard.pk).card_style)
+
+        self.flying.delete()
+        self.assertEqual(PokemonSummary.objects.get(pk=self.charizard.pk).secondary_type_name, '')
+
+        self.charizard.delete()
+        self.assertFalse(PokemonSummary.objects.exists())
+
+    def test_writer_refreshes_summaries(self):
+        pokemon = Pokemon(
+            name='charizard', base_experience=240, height=17, weight=905,
+            hp=80, attack=84, defense=78, special_attack=109, special_defense=85, speed=100,
+            primary_type=self.fire,
+        )
+        writer = PokemonWriter()
+        writer.add(pokemon, [], [])
+        writer.flush()
+        summary = PokemonSummary.objects.get(pk=self.charizard.pk)
+        self.assertEqual((summary.hp, summary.secondary_type_name), (80, ''))
+
+    def test_compare_reads_summaries(self):
+        response = self.client.get(reverse('comparar_pokemons'), {'pokemon1': 'chariz'})
+        self.assertContains(response, 'tipo-flying')
+
+
+class SharedVersionTests(CatalogueTestCase):
+    """A versão do catálogo gravada por outro processo (sync_pokemons, Celery) chega a este."""
+
+    def setUp(self):
+        super().setUp()
+        # Relê a versão a cada consulta, em vez de uma vez por segundo
+        patcher = mock.patch.object(caching, 'VERSION_CHECK_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bump_in_another_process(self):
+        """O que `bump_catalogue_version` faz em outro processo: só a linha do banco muda, nada deste processo."""
+        updated = CatalogueVersion.objects.filter(pk=1).update(value=F('value') + 1, modified_at=time.time())
+        self.assertEqual(updated, 1)
+
+    def test_version_bumped_by_another_process(self):
+        version = catalogue_version()
+        self.bump_in_another_process()
+        self.assertEqual(catalogue_version(), version + 1)
+        # Com a versão deste processo atrasada, o incremento ainda parte do valor do banco
+        bump_catalogue_version()
+        self.assertEqual(catalogue_version(), version + 2)
+
+    def test_version_kept_outside_the_cache(self):
+        version = catalogue_version()
+        cache.clear()
+        caching._version.update(value=None)
+        self.assertEqual(catalogue_version(), version)
+
+    def test_conditional_get_after_sync_in_another_process(self):
+        pokemon = Pokemon.objects.create(name='bulbasaur', base_experience=64, height=7, weight=69, hp=45)
+        url = reverse('detalhe_pokemon', args=[pokemon.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+        # A sincronização grava sem sinais neste processo e só avisa pela versão
+        Pokemon.objects.filter(pk=pokemon.pk).update(hp=145)
+        self.bump_in_another_process()
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, '145')
+
+    def test_snapshot_rebuilt_after_sync_in_another_process(self):
+        pokemon = Pokemon.objects.create(name='bulbasaur', base_experience=64, height=7, weight=69, hp=45)
+        self.assertEqual(get_snapshot().by_id[pokemon.pk].hp, 45)
+
+        PokemonSummary.objects.filter(pk=pokemon.pk).update(hp=145)
+        self.assertEqual(get_snapshot().by_id[pokemon.pk].hp, 45)
+        self.bump_in_another_process()
+        self.assertEqual(get_snapshot().by_id[pokemon.pk].hp, 145)
+        cards = self.client.get(reverse('buscar_pokemons'), {'format': 'json'}).json()['pokemons']
+        self.assertEqual(cards[0]['hp'], 145)
+
+    def test_search_index_rebuilt_after_sync_in_another_process(self):
+        pokemon = Pokemon.objects.create(name='bulbasaur', base_experience=64, height=7, weight=69)
+        self.assertEqual(get_search_index().pokemon_ids('bulbasaur'), {pokemon.pk})
+
+        Pokemon.objects.filter(pk=pokemon.pk).update(name='pikachu')
+        self.assertEqual(get_search_index().pokemon_ids('pikachu'), set())
+        self.bump_in_another_process()
+        self.assertEqual(get_search_index().pokemon_ids('pikachu'), {pokemon.pk})
+
+
+class TypeChartTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.types = {
+            name: Type.objects.create(name=name, color='#000000')
+            for name in ('fire', 'water', 'grass', 'ghost', 'normal')
+        }
+        fire, water, grass = self.types['fire'], self.types['water'], self.types['grass']
+        fire.strong_against.add(grass)
+        fire.weak_against.add(water)
+        self.types['normal'].no_effect_against.add(self.types['ghost'])
+        # Nas duas relações: vale a mais forte, como em Type.damage_multipliers
+        water.weak_against.add(grass)
+        water.strong_against.add(grass)
+
+    def test_multipliers(self):
+        chart = get_type_chart()
+        self.assertEqual(chart.multipliers_for('fire'), {
+            'fire': 1.0, 'water': 0.5, 'grass': 2.0, 'ghost': 1.0, 'normal': 1.0,
+        })
+        self.assertEqual(chart.multipliers_for('normal')['ghost'], 0.0)
+        self.assertEqual(chart.multipliers_for('water')['grass'], 2.0)
+        self.assertEqual(chart.multipliers_for('dragon'), {})
+        self.assertEqual(self.types['fire'].damage_multipliers(), chart.multipliers_for('fire'))
+
+        fire, water, grass = (self.types[name].pk for name in ('fire', 'water', 'grass'))
+        self.assertEqual(chart.effectiveness(fire, grass, water), 1.0)
+        self.assertEqual(chart.effectiveness(fire, grass, grass), 4.0)
+        # Tipos desconhecidos são neutros
+        self.assertEqual(chart.effectiveness(fire, 0), 1.0)
+        self.assertEqual(chart.effectiveness(0, grass), 1.0)
+
+    def test_reloaded_on_change(self):
+        chart = get_type_chart()
+        with self.assertNumQueries(0):
+            self.assertIs(get_type_chart(), chart)
+
+        self.types['fire'].no_effect_against.add(self.types['ghost'])
+        chart = get_type_chart()
+        self.assertEqual(chart.multipliers_for('fire')['ghost'], 0.0)
+
+        Type.objects.create(name='dragon', color='#000000')
+        self.assertIn('dragon', get_type_chart().multipliers_for('fire'))
+
+        # Outro processo mudou os tipos: só a versão do catálogo no banco mudou
+        chart = get_type_chart()
+        CatalogueVersion.objects.filter(pk=1).update(value=F('value') + 1)
+        self.assertIs(get_type_chart(), chart)  # A versão é relida uma vez por intervalo
+        with mock.patch.object(caching, 'VERSION_CHECK_INTERVAL', 0):
+            self.assertIsNot(get_type_chart(), chart)
+            # Depois, só a leitura da versão (relida a cada chamada com o intervalo zerado)
+            with self.assertNumQueries(1):
+                get_type_chart()
+
+
+class DamageMatrixTests(CatalogueTestCase):
+    """/api/damage-matrix/ calculada no banco, sem o catálogo binário."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(POKEDEX_CATALOGUE_FILE=f'{directory}/catalogue.bin')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        discard_catalogue_file()
+
+        fire = Type.objects.create(name='fire', color='#F08030')
+        water = Type.objects.create(name='water', color='#6890F0')
+        grass = Type.objects.create(name='grass', color='#78C850')
+        fire.strong_against.add(grass)
+        fire.weak_against.add(water)
+        ember = Move.objects.create(name='ember', power=40, accuracy=100, type=fire)
+        tackle = Move.objects.create(name='tackle', power=None, accuracy=100)
+        for name, attack, defense, pokemon_type in (
+            ('charmander', 52, 43, fire), ('squirtle', 48, 65, water), ('bulbasaur', 49, None, grass),
+        ):
+            pokemon = Pokemon.objects.create(
+                name=name, base_experience=1, height=1, weight=1,
+                attack=attack, defense=defense, primary_type=pokemon_type,
+            )
+            pokemon.moves.add(tackle, ember)
+        bump_catalogue_version()
+        get_type_chart()
+
+    def get(self, **params):
+        return self.client.get(reverse('damage-matrix'), params)
+
+    def test_matches_battle_damage(self):
+        # Atacante, movimentos e defensores; depois, só o cache
+        with self.assertNumQueries(3):
+            data = self.get(attacker='Charmander').json()
+        self.assertIsNone(get_catalogue_file())
+        charmander = Pokemon.objects.get(name='charmander')
+        self.assertEqual(data['attacker'], {'id': charmander.pk, 'name': 'charmander'})
+        self.assertEqual(data['moves'], ['ember', 'tackle'])
+        self.assertEqual([defender['name'] for defender in data['defenders']], ['charmander', 'squirtle', 'bulbasaur'])
+
+        battle = PokemonBattleView()
+        ember = Move.objects.get(name='ember')
+        expected = [
+            battle.calculate_damage(charmander, defender, ember)
+            for defender in Pokemon.objects.order_by('id')[:2]
+        ]
+        # Sem defesa cadastrada: -1; movimento sem tipo: 0
+        self.assertEqual(data['damage'], [expected + [-1], [0, 0, 0]])
+        self.assertEqual(expected, [2, 1])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(attacker='charmander').json(), data)
+        self.assertEqual(self.get(attacker=str(charmander.pk)).json(), data)
+
+    def test_errors(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(attacker=' ').status_code, 400)
+        response = self.get(attacker='mewtwo')
+        self.assertEqual((response.status_code, response.json()), (404, {'error': 'Pokémon não encontrado'}))
+
+
+class CatalogueFileTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(POKEDEX_CATALOGUE_FILE=f'{directory}/catalogue.bin')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        fire = Type.objects.create(name='fire', color='#F08030')
+        grass = Type.objects.create(name='grass', color='#78C850')
+        fire.strong_against.add(grass)
+        ember = Move.objects.create(name='ember', power=40, accuracy=100, type=fire)
+        tackle = Move.objects.create(name='tackle', power=None, accuracy=100)
+        for name, attack, defense, pokemon_type in (('charmander', 52, 43, fire), ('bulbasaur', 49, None, grass)):
+            pokemon = Pokemon.objects.create(
+                name=name, base_experience=1, height=1, weight=1,
+                attack=attack, defense=defense, primary_type=pokemon_type,
+            )
+            pokemon.moves.add(ember, tackle)
+        bump_catalogue_version()
+
+    def test_damage_matrix_matches_database(self):
+        url = reverse('damage-matrix')
+        from_database = self.client.get(url, {'attacker': 'Charmander'}).json()
+        self.assertEqual(export_catalogue()['edge'], 4)
+        bump_catalogue_version()
+        with self.assertNumQueries(0):
+            from_file = self.client.get(url, {'attacker': 'Charmander'}).json()
+        self.assertEqual(from_file, from_database)
+
+    def test_damage_matrix_not_cached_from_previous_file(self):
+        url = reverse('damage-matrix')
+        export_catalogue()
+        stale = get_catalogue_file()
+        # Outro processo exporta de novo; este ainda usa o mapeamento anterior até a próxima verificação
+        Move.objects.filter(name='ember').update(power=90)
+        export_catalogue()
+        bump_catalogue_version()
+        with mock.patch.dict(catalogue_file._state, {'file': stale, 'checked_at': time.monotonic()}):
+            from_stale = self.client.get(url, {'attacker': 'charmander'}).json()
+        fresh = self.client.get(url, {'attacker': 'charmander'}).json()
+        self.assertNotEqual(fresh['damage'], from_stale['damage'])
+        discard_catalogue_file()
+        self.assertEqual(fresh, damage_matrix_payload('charmander'))
+
+    def test_file_discarded_on_change(self):
+        export_catalogue()
+        catalogue = get_catalogue_file()
+        self.assertEqual(catalogue.names(catalogue.moves_of(catalogue.pokemon_index('charmander'))), ['ember', 'tackle'])
+        Move.objects.filter(name='tackle').update(power=10)
+        Move.objects.get(name='ember').save()
+        self.assertIsNone(get_catalogue_file())
+
+
+class ThumbnailTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        bump_catalogue_version()
+
+        artwork = Image.new('RGBA', (475, 475), (0, 0, 0, 0))
+        artwork.paste((200, 40, 40, 255), (100, 50, 375, 425))
+        buffer = BytesIO()
+        artwork.save(buffer, 'PNG')
+        self.artwork = buffer.getvalue()
+
+    def test_render_thumbnails(self):
+        rendered = render_thumbnails(self.artwork)
+        for size in THUMBNAIL_SIZES:
+            for extension, image_format in (('webp', 'WEBP'), ('png', 'PNG')):
+                with Image.open(BytesIO(rendered[size, extension])) as image:
+                    self.assertEqual((image.format, image.size), (image_format, (size, size)))
+
+    def test_invalid_source(self):
+        self.assertIsNone(save_thumbnails('missingno', b'<svg/>'))
+
+    def test_card_srcset(self):
+        pokemon = Pokemon.objects.create(
+            name='bulbasaur', base_experience=1, height=1, weight=1,
+            thumbnails=save_thumbnails('bulbasaur', self.artwork),
+        )
+        prefix = f'/media/pokemons/thumbs/bulbasaur-{hashlib.sha256(self.artwork).hexdigest()[:16]}'
+        self.assertEqual(
+            pokemon.thumbnail_srcset(),
+            f'{prefix}-50.webp 50w, {prefix}-150.webp 150w, {prefix}-300.webp 300w',
+        )
+        response = self.client.get(reverse('buscar_pokemons'))
+        self.assertContains(response, f'srcset="{prefix}-50.webp 50w')
+        data = self.client.get(reverse('buscar_pokemons'), {'format': 'json'}).json()
+        self.assertEqual(data['pokemons'][0]['image_url'], f'{prefix}-300.png')
+
+    def test_named_after_artwork(self):
+        thumbnails = save_thumbnails('bulbasaur', self.artwork)
+        self.assertEqual(thumbnails, thumbnail_paths('bulbasaur', self.artwork))
+        # A mesma arte não é gerada de novo
+        with mock.patch('core.images.render_thumbnails') as render:
+            self.assertEqual(save_thumbnails('bulbasaur', self.artwork), thumbnails)
+        render.assert_not_called()
+
+        artwork = Image.new('RGBA', (475, 475), (40, 200, 40, 255))
+        buffer = BytesIO()
+        artwork.save(buffer, 'PNG')
+        changed = save_thumbnails('bulbasaur', buffer.getvalue())
+        self.assertNotEqual(changed['png']['50'], thumbnails['png']['50'])
+        # As antigas ficam para cleanup_media: páginas em cache ainda podem usá-las
+        self.assertTrue(default_storage.exists(thumbnails['png']['50']))
+        self.assertTrue(default_storage.exists(changed['png']['50']))
+
+    def test_sprite_atlas(self):
+        for name in ('bulbasaur', 'ivysaur'):
+            Pokemon.objects.create(
+                name=name, base_experience=1, height=1, weight=1,
+                thumbnails=save_thumbnails(name, self.artwork),
+            )
+        self.assertEqual(build_missing_atlases(), 1)
+        self.assertEqual(build_missing_atlases(), 0)
+
+        data = self.client.get(reverse('buscar_pokemons'), {'format': 'json'}).json()
+        sprite = data['pokemons'][1]['sprite']
+        self.assertTrue(sprite['url'].startswith('/media/pokemons/atlas/0-'))
+        self.assertEqual((sprite['x'], sprite['y']), (-180, 0))
+        response = self.client.get(reverse('buscar_pokemons'))
+        self.assertContains(response, 'class="pokemon-sprite pokemon-img ', count=2)
+
+        # Um bloco sem miniaturas perde o atlas
+        Pokemon.objects.update(thumbnails={})
+        self.assertIsNone(build_atlas(0))
+        self.assertIsNone(build_atlas(ATLAS_BLOCK_SIZE))
+
+    def test_atlas_blocks_follow_list_order(self):
+        thumbnails = save_thumbnails('bulbasaur', self.artwork)
+        # IDs com lacunas: os blocos vão pela posição na lista, não pelo ID
+        for position in range(ATLAS_BLOCK_SIZE + 1):
+            Pokemon.objects.create(
+                id=1 + position * 10, name=f'pokemon-{position}', base_experience=1, height=1, weight=1,
+                thumbnails=thumbnails,
+            )
+        self.assertEqual(build_missing_atlases(), 2)
+        first, second = SpriteAtlas.objects.order_by('block')
+        self.assertEqual((first.block, len(first.tiles)), (0, ATLAS_BLOCK_SIZE))
+        self.assertEqual((second.block, second.tiles), (1, {str(1 + ATLAS_BLOCK_SIZE * 10): 0}))
+
+        # Quadros no tamanho em que o card mostra o sprite
+        with default_storage.open(first.image) as file, Image.open(file) as sheet:
+            self.assertEqual(sheet.size, (ATLAS_COLUMNS * CARD_SPRITE_SIZE, first.rows * CARD_SPRITE_SIZE))
+
+        # Uma remoção muda a posição de todos os seguintes: o bloco dela e os próximos são remontados
+        Pokemon.objects.get(id=11).delete()
+        self.assertFalse(SpriteAtlas.objects.exists())
+        self.assertEqual(build_missing_atlases(), 1)
+        self.assertEqual(len(SpriteAtlas.objects.get().tiles), ATLAS_BLOCK_SIZE)
+
+
+class ContentAddressedStorageTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create(self, name, svg):
+        pokemon = Pokemon(name=name, base_experience=1, height=1, weight=1)
+        pokemon.image.save(f'{name}.svg', ContentFile(svg), save=False)
+        pokemon.save()
+        return pokemon
+
+    def test_identical_images_are_stored_once(self):
+        first = self.create('pichu', b'<svg>a</svg>')
+        second = self.create('pikachu', b'<svg>a</svg>')
+        third = self.create('raichu', b'<svg>b</svg>')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        self.assertTrue(first.image.name.startswith('pokemons/'))
+        self.assertEqual(image_name(ContentFile(b'<svg>a</svg>', name='outro.svg')), first.image.name)
+
+    def test_cleanup_media(self):
+        pokemon = self.create('pichu', b'<svg>a</svg>')
+        old_name = pokemon.image.name
+        pokemon.image.save('pichu.svg', ContentFile(b'<svg>b</svg>'))
+        storage = pokemon.image.storage
+        thumbnail = default_storage.save('pokemons/thumbs/pichu-0a-50.png', ContentFile(b'png'))
+        old_thumbnail = default_storage.save('pokemons/thumbs/pichu-0b-50.png', ContentFile(b'png'))
+        Pokemon.objects.filter(pk=pokemon.pk).update(thumbnails={'png': {'50': thumbnail}})
+
+        # Arquivos recentes ficam (podem ser de uma gravação em andamento)
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertTrue(storage.exists(old_name))
+        self.assertTrue(default_storage.exists(old_thumbnail))
+
+        call_command('cleanup_media', grace_period=0, stdout=StringIO())
+        self.assertFalse(storage.exists(old_name))
+        self.assertTrue(storage.exists(pokemon.image.name))
+        self.assertTrue(default_storage.exists(thumbnail))
+        self.assertFalse(default_storage.exists(old_thumbnail))
+
+
+class CheckpointTests(CatalogueTestCase):
+    def select_ids(self, **options):
+        command = SyncCommand(stdout=StringIO())
+        command.checkpoint = Checkpoint()
+        return command.select_ids({'ids': None, 'generation': None, 'resume': False, 'retry_failed': False, **options})
+
+    def test_parse_ids(self):
+        self.assertEqual(parse_ids('1-3,7, 9-10'), [1, 2, 3, 7, 9, 10])
+        for value in ('5-3', '', ',', 'a-b', '1-'):
+            with self.assertRaises(ArgumentTypeError):
+                parse_ids(value)
+        # Um intervalo invertido não pode virar a sincronização do catálogo inteiro
+        with self.assertRaisesMessage(CommandError, 'Intervalo invertido'):
+            call_command('sync_pokemons', '--ids', '5-3', stdout=StringIO())
+
+    def test_select_ids(self):
+        self.assertEqual(len(self.select_ids()), MAX_POKEMON_ID)
+        self.assertEqual(self.select_ids(ids=[5, 3, 5]), [3, 5])
+        self.assertEqual(len(self.select_ids(ids=[1000], generation=[1])), 152)
+        with self.assertRaises(CommandError):
+            self.select_ids(ids=[])
+
+    def test_backoff_resume_and_retry(self):
+        checkpoint = Checkpoint()
+        checkpoint.mark_done([1, 2])
+        checkpoint.mark_failed([3], 'erro')
+        checkpoint.mark_failed([3], 'erro de novo')
+        entry = SyncCheckpoint.objects.get(pokemon_id=3)
+        self.assertEqual((entry.attempts, entry.last_error), (2, 'erro de novo'))
+        self.assertAlmostEqual(
+            entry.next_attempt_at, timezone.now() + 2 * RETRY_BACKOFF_BASE, delta=timedelta(seconds=5)
+        )
+        self.assertEqual(retry_delay(30), RETRY_BACKOFF_MAX)
+
+        # Em espera: --resume pula o 3 e --retry-failed ainda não o tenta
+        self.assertEqual(self.select_ids(ids=[1, 2, 3, 4], resume=True), [4])
+        self.assertEqual(self.select_ids(ids=[1, 2, 3, 4], retry_failed=True), [])
+        SyncCheckpoint.objects.filter(pokemon_id=3).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.select_ids(ids=[1, 2, 3, 4], resume=True), [3, 4])
+        self.assertEqual(self.select_ids(ids=[1, 2, 3, 4], retry_failed=True), [3])
+
+        checkpoint.mark_done([3])
+        self.assertEqual(Checkpoint().failed_ids(), set())
+
+
+FAKE_TYPES = ('fire', 'water', 'grass')
+FAKE_MOVES = 6
+
+
+class FakePokeAPI:
+    """
+    PokéAPI de mentira num servidor HTTP local, com ETag e 304 como a de
+    verdade. `routes` guarda o JSON (ou os bytes, para imagens) de cada
+    caminho (sem /api/v2/ e sem as barras), `failures` quantas respostas 503 saem antes da certa e
+    `requests` quantos pedidos cada caminho recebeu.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.failures = Counter()
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?')[0].removeprefix('/api/v2/').strip('/')
+                with fake.lock:
+                    fake.requests[path] += 1
+                    failing = fake.failures[path] > 0
+                    fake.failures[path] -= failing
+                body = fake.routes.get(path)
+                if failing or body is None:
+                    return self.reply(503 if failing else 404, b'')
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.reply(304, b'', etag)
+                self.reply(200, body, etag)
+
+            def reply(self, status, body, etag=None):
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/api/v2/'
+
+    def url(self, path):
+        return f'{self.base_url}{path}/'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_catalogue(self, count):
+        """Três tipos, FAKE_MOVES movimentos, duas habilidades e os Pokémon 1..count."""
+        self.routes['type'] = {'results': [{'name': name, 'url': self.url(f'type/{name}')} for name in FAKE_TYPES]}
+        for index, name in enumerate(FAKE_TYPES):
+            self.routes[f'type/{name}'] = {'damage_relations': {
+                'double_damage_to': [{'name': FAKE_TYPES[(index + 2) % 3]}],
+                'double_damage_from': [{'name': FAKE_TYPES[(index + 1) % 3]}],
+                'no_damage_to': [],
+            }}
+        for move in range(FAKE_MOVES):
+            self.routes[f'move/{move}'] = {
+                'name': f'move{move}', 'power': 10 * move, 'accuracy': 100,
+                'type': {'name': FAKE_TYPES[move % 3]},
+                'effect_entries': [{'language': {'name': 'en'}, 'effect': f'Effect {move}.'}],
+            }
+        for ability in range(2):
+            self.routes[f'ability/{ability}'] = {
+                'effect_entries': [{'language': {'name': 'en'}, 'effect': f'Ability {ability}.'}],
+            }
+        self.routes['move'] = {'results': [
+            {'name': f'move{move}', 'url': self.url(f'move/{move}')} for move in range(FAKE_MOVES)
+        ]}
+        self.routes['ability'] = {'results': [
+            {'name': f'ability{ability}', 'url': self.url(f'ability/{ability}')} for ability in range(2)
+        ]}
+        for pokemon_id in range(1, count + 1):
+            self.routes[f'pokemon-species/{pokemon_id}'] = {'generation': {'name': 'generation-i'}}
+            self.routes[f'pokemon/{pokemon_id}'] = self.pokemon(pokemon_id)
+
+    def pokemon(self, pokemon_id):
+        # Movimentos fora de ordem de ID, como na PokéAPI
+        moves = [(pokemon_id + 3) % FAKE_MOVES, pokemon_id % FAKE_MOVES, (pokemon_id + 1) % FAKE_MOVES]
+        return {
+            'id': pokemon_id,
+            'name': f'pokemon{pokemon_id}',
+            'base_experience': 50,
+            'height': 10,
+            'weight': 100,
+            'sprites': {'other': {'dream_world': {'front_default': None}, 'official-artwork': {'front_default': None}}},
+            'stats': [
+                {'stat': {'name': stat}, 'base_stat': 40 + pokemon_id}
+                for stat in ('hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed')
+            ],
+            'types': [{'type': {'name': FAKE_TYPES[pokemon_id % 3]}}],
+            'species': {'url': self.url(f'pokemon-species/{pokemon_id}')},
+            'moves': [{'move': {'name': f'move{move}', 'url': self.url(f'move/{move}')}} for move in moves],
+            'abilities': [{'ability': {'name': f'ability{pokemon_id % 2}', 'url': self.url(f'ability/{pokemon_id % 2}')}}],
+        }
+
+
+class SyncTestCase(CatalogueTestCase):
+    """Sincronização contra a `FakePokeAPI`, com cache HTTP, mídia e catálogo binário temporários."""
+
+    pokemon_count = 6
+
+    def setUp(self):
+        super().setUp()
+        self.api = FakePokeAPI()
+        self.addCleanup(self.api.close)
+        self.api.add_catalogue(self.pokemon_count)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(
+            POKEAPI_BASE_URL=self.api.base_url,
+            POKEAPI_CACHE_DIR=f'{directory}/pokeapi',
+            MEDIA_ROOT=f'{directory}/media',
+            POKEDEX_CATALOGUE_FILE=f'{directory}/catalogue.bin',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def sync(self, *args):
+        output = StringIO()
+        call_command('sync_pokemons', *args, stdout=output)
+        return output.getvalue()
+
+    def client_for_test(self, **kwargs):
+        client = PokeAPIClient(**kwargs)
+        self.addCleanup(client.close)
+        return client
+
+
+class PokeAPIClientTests(SyncTestCase):
+    def test_retries_temporary_errors(self):
+        client = self.client_for_test(use_cache=False)
+        self.api.failures['pokemon/1'] = 1
+        self.assertEqual(client.get_json(self.api.url('pokemon/1'))['name'], 'pokemon1')
+        self.assertEqual(self.api.requests['pokemon/1'], 2)
+        self.assertIsNone(client.get_json(self.api.url('pokemon/999')))
+
+    def test_get_many_keeps_order_without_repeats(self):
+        client = self.client_for_test(concurrency=4, use_cache=False)
+        urls = [self.api.url(f'pokemon/{pokemon_id}') for pokemon_id in (3, 1, 3, 2)]
+        results = client.get_json_many(urls)
+        self.assertEqual([data['id'] for data in results.values()], [3, 1, 2])
+        self.assertEqual(self.api.requests['pokemon/3'], 1)
+
+
+class ResponseCacheTests(SyncTestCase):
+    def test_revalidates_with_etag(self):
+        url = self.api.url('pokemon/1')
+        with override_settings(POKEAPI_CACHE_TTL=0):
+            client = self.client_for_test()
+            first = client.get_json(url)
+            # Vencida: revalida com If-None-Match e o servidor responde 304
+            self.assertEqual(client.get_json(url), first)
+            self.assertEqual((client.stats['network'], client.stats['revalidated']), (1, 1))
+
+            self.api.routes['pokemon/1'] = {**first, 'weight': 1}
+            self.assertEqual(client.get_json(url)['weight'], 1)
+            self.assertEqual(client.stats['network'], 2)
+
+        # Dentro do TTL nem chega ao servidor
+        client = self.client_for_test()
+        self.assertEqual(client.get_json(url)['weight'], 1)
+        self.assertEqual((client.stats['cached'], self.api.requests['pokemon/1']), (1, 3))
+
+    def test_evicts_least_recently_used(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = ResponseCache(directory, ttl=60, max_size=25)
+        self.addCleanup(cache.close)
+
+        def store(url):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'x' * 10
+            cache.store(url, response)
+
+        with mock.patch.object(ResponseCache, 'EVICT_EVERY', 1):
+            store('a')
+            store('b')
+            cache.get('a')
+            store('c')  # 30 bytes: sai a menos usada recentemente
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a').body, b'x' * 10)
+        self.assertIsNotNone(cache.get('c'))
+
+
+class EntityRegistryTests(SyncTestCase):
+    def setUp(self):
+        super().setUp()
+        for name in FAKE_TYPES:
+            Type.objects.create(name=name, color='#FFFFFF')
+
+    def registry(self, **kwargs):
+        registry = EntityRegistry(self.client_for_test(use_cache=False), **kwargs)
+        registry.load_types()
+        return registry
+
+    def test_each_move_fetched_once_per_run(self):
+        # Lotes de 2 com movimentos em comum, sem o cache HTTP para contar cada busca
+        self.sync('--ids', '1-6', '--batch-size', '2', '--no-cache')
+        self.assertEqual(Move.objects.count(), FAKE_MOVES)
+        self.assertEqual({self.api.requests[f'move/{move}'] for move in range(FAKE_MOVES)}, {1})
+        self.assertEqual({self.api.requests[f'ability/{ability}'] for ability in range(2)}, {1})
+
+    def test_moves_for_keeps_api_order(self):
+        data = self.api.pokemon(1)
+        data['moves'].append(data['moves'][0])
+        registry = self.registry()
+        with self.assertNumQueries(4):  # Movimentos e habilidades: um upsert e uma leitura cada
+            registry.resolve([data, self.api.pokemon(2)])
+        self.assertEqual([move.name for move in registry.moves_for(data)], ['move4', 'move1', 'move2'])
+        self.assertEqual([ability.name for ability in registry.abilities_for(data)], ['ability1'])
+
+    def test_trust_database(self):
+        Move.objects.create(name='move4', type=Type.objects.get(name='water'))
+        registry = self.registry(trust_database=True)
+        registry.resolve([self.api.pokemon(1)])
+        self.assertEqual(self.api.requests['move/4'], 0)
+        self.assertEqual(self.api.requests['move/1'], 1)
+
+
+class PokemonWriterTests(CatalogueTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fire = Type.objects.create(name='fire', color='#F08030')
+        self.moves = [Move.objects.create(name=f'move{index}', type=self.fire) for index in range(5)]
+
+    def pokemon(self, name, hp=50):
+        return Pokemon(name=name, base_experience=1, height=1, weight=1, hp=hp, primary_type=self.fire)
+
+    def move_names(self, pokemon):
+        return list(pokemon.moves.through.objects.filter(pokemon=pokemon).order_by('id').values_list('move__name', flat=True))
+
+    def test_flush_creates_and_updates_in_batch(self):
+        writer = PokemonWriter()
+        writer.add(self.pokemon('charmander'), self.moves[:2], [])
+        self.assertTrue(writer.flush()[0].created)
+
+        def flush(count):
+            for index in range(count):
+                writer.add(self.pokemon(f'pokemon{index}', hp=60), [self.moves[4], self.moves[1]], [])
+            with CaptureQueriesContext(connection) as queries:
+                written = writer.flush()
+            return written, len(queries)
+
+        # Um Pokémon ou três: as mesmas consultas
+        (_, one), (written, three) = flush(1), flush(3)
+        self.assertEqual(one, three)
+        self.assertEqual([item.created for item in written], [False, True, True])
+        self.assertEqual(Pokemon.objects.get(name='pokemon0').hp, 60)
+        self.assertEqual(self.move_names(written[2].pokemon), ['move4', 'move1'])
+
+    def test_write_relation_keeps_order_and_writes_only_the_difference(self):
+        pokemon = self.pokemon('charmander')
+        pokemon.save()
+        through = Pokemon.moves.through
+        m = [move.pk for move in self.moves]
+        write_relation(through, 'move_id', {pokemon.pk: [m[3], m[0], m[2], m[0]]})
+        self.assertEqual(self.move_names(pokemon), ['move3', 'move0', 'move2'])
+
+        kept = set(through.objects.filter(move_id__in=[m[3], m[2]]).values_list('id', flat=True))
+        with self.assertNumQueries(3):  # Leitura, remoção e inserção
+            write_relation(through, 'move_id', {pokemon.pk: [m[3], m[2], m[4], m[1]]})
+        self.assertEqual(self.move_names(pokemon), ['move3', 'move2', 'move4', 'move1'])
+        self.assertLessEqual(kept, set(through.objects.values_list('id', flat=True)))
+        with self.assertNumQueries(1):
+            write_relation(through, 'move_id', {pokemon.pk: [m[3], m[2], m[4], m[1]]})
+
+
+class SyncPokemonsTests(SyncTestCase):
+    def count_sync_queries(self, ids):
+        """Consultas de uma sincronização completa de `ids`, desfeita ao final."""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                self.sync('--ids', ids)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def test_sync(self):
+        output = self.sync('--ids', '1-6')
+        self.assertIn('6 Pokémon selecionados', output)
+        pokemon = Pokemon.objects.get(name='pokemon3')
+        self.assertEqual((pokemon.hp, pokemon.primary_type.name, pokemon.generation_number), (43, 'fire', 1))
+        self.assertEqual(PokemonSummary.objects.count(), 6)
+        self.assertEqual(Type.objects.get(name='fire').strong_against.get().name, 'grass')
+        # Movimentos na ordem da PokéAPI, não na dos IDs
+        moves = Pokemon.moves.through.objects.filter(pokemon__name='pokemon1').order_by('id')
+        self.assertEqual(list(moves.values_list('move__name', flat=True)), ['move4', 'move1', 'move2'])
+
+    def test_query_budget_per_pokemon(self):
+        # Os Pokémon de um lote são gravados juntos: o número de consultas não cresce com eles
+        self.assertEqual(self.count_sync_queries('1-2'), self.count_sync_queries('1-6'))
+
+    def test_client_closed(self):
+        created = mock.patch.object(PokeAPIClient, '__init__', autospec=True, side_effect=PokeAPIClient.__init__)
+        closed = mock.patch.object(PokeAPIClient, 'close', autospec=True, side_effect=PokeAPIClient.close)
+        with created as init, closed as close:
+            self.sync('--ids', '1-2')
+            self.assertEqual((init.call_count, close.call_count), (1, 1))
+            tasks.sync_pokemon_task(Pokemon.objects.get(name='pokemon1').pk)
+            self.assertEqual((init.call_count, close.call_count), (2, 2))
+
+    def test_failed_ids_retried(self):
+        route = self.api.routes.pop('pokemon/5')
+        output = self.sync('--ids', '1-6')
+        self.assertIn('Checkpoint: 5 IDs concluídos, 1 com falha', output)
+        self.assertIn('IDs com falha: 5', output)
+        self.assertEqual(SyncCheckpoint.objects.get(pokemon_id=5).attempts, 1)
+
+        # Ainda em espera: nada a tentar de novo
+        self.assertIn('0 Pokémon selecionados', self.sync('--ids', '1-6', '--retry-failed'))
+
+        self.api.routes['pokemon/5'] = route
+        SyncCheckpoint.objects.filter(pokemon_id=5).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        output = self.sync('--ids', '1-6', '--retry-failed')
+        self.assertIn('1 Pokémon selecionados', output)
+        self.assertIn('Checkpoint: 1 IDs concluídos, 0 com falha', output)
+        self.assertTrue(Pokemon.objects.filter(name='pokemon5').exists())
+
+    def test_resume_after_previous_full_sync(self):
+        self.sync('--ids', '1-6')
+        self.assertEqual(Checkpoint().done_ids(), set(range(1, 7)))
+
+        # Uma execução nova é interrompida depois do primeiro lote
+        sync_batch = SyncCommand.sync_batch
+        calls = []
+
+        def interrupted(command, pokemons_data):
+            calls.append(pokemons_data)
+            if len(calls) > 1:
+                raise KeyboardInterrupt
+            return sync_batch(command, pokemons_data)
+
+        with mock.patch.object(SyncCommand, 'sync_batch', autospec=True, side_effect=interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.sync('--ids', '1-6', '--batch-size', '2')
+        self.assertEqual(Checkpoint().done_ids(), {1, 2})
+
+        # Os concluídos na sincronização anterior não contam para esta
+        output = self.sync('--ids', '1-6', '--resume')
+        self.assertIn('4 Pokémon selecionados', output)
+        self.assertEqual(Checkpoint().done_ids(), set(range(1, 7)))
+
+    def test_thumbnails_follow_artwork(self):
+        def artwork(color):
+            buffer = BytesIO()
+            Image.new('RGBA', (100, 100), color).save(buffer, 'PNG')
+            return buffer.getvalue()
+
+        self.api.routes['artwork/1'] = artwork((200, 40, 40, 255))
+        self.api.routes['pokemon/1']['sprites']['other']['official-artwork']['front_default'] = self.api.url('artwork/1')
+        self.sync('--ids', '1')
+        thumbnails = Pokemon.objects.get(name='pokemon1').thumbnails
+        self.assertEqual(thumbnails, thumbnail_paths('pokemon1', self.api.routes['artwork/1']))
+
+        # Mesma arte (304): nada é gerado de novo
+        with override_settings(POKEAPI_CACHE_TTL=0), mock.patch('core.images.render_thumbnails') as render:
+            self.sync('--ids', '1')
+        render.assert_not_called()
+        self.assertEqual(Pokemon.objects.get(name='pokemon1').thumbnails, thumbnails)
+
+        # Arte nova na mesma URL: miniaturas novas, com ou sem --incremental
+        for options, color in (((), (40, 200, 40, 255)), (('--incremental',), (40, 40, 200, 255))):
+            self.api.routes['artwork/1'] = artwork(color)
+            with override_settings(POKEAPI_CACHE_TTL=0):
+                self.sync('--ids', '1', *options)
+            pokemon = Pokemon.objects.get(name='pokemon1')
+            self.assertEqual(pokemon.thumbnails, thumbnail_paths('pokemon1', self.api.routes['artwork/1']))
+            summary = PokemonSummary.objects.get(pk=pokemon.pk)
+            self.assertEqual(summary.image_url, default_storage.url(pokemon.thumbnails['png']['300']))
+
+
+class IncrementalSyncTests(SyncTestCase):
+    def test_fingerprint_store(self):
+        url = self.api.url('pokemon/1')
+        data = self.api.pokemon(1)
+        store = FingerprintStore(skip_unchanged=True)
+        self.assertFalse(store.unchanged('pokemon', url, data))
+        store.clear()
+        store.save()
+        self.assertFalse(ResourceFingerprint.objects.exists())
+        self.assertFalse(store.unchanged('pokemon', url, data))
+        store.save()
+
+        store = FingerprintStore(skip_unchanged=True)
+        self.assertTrue(store.unchanged('pokemon', url, data))
+        self.assertFalse(store.unchanged('pokemon', url, data, force=True))
+        self.assertFalse(store.unchanged('pokemon', url, {**data, 'weight': 1}))
+        self.assertEqual(dict(store.counts['pokemon']), {'unchanged': 1, 'changed': 2})
+        # Fora do modo incremental os hashes são registrados, mas nada é pulado
+        self.assertFalse(FingerprintStore().unchanged('pokemon', url, data))
+
+    def test_incremental_rerun(self):
+        self.sync('--ids', '1-6')
+        version = catalogue_version()
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            output = self.sync('--ids', '1-6', '--incremental')
+        self.assertIn('Pokémon: 0 alterados, 6 inalterados', output)
+        self.assertIn('Requisições: 0 pela rede', output)
+        # A espécie não decide nada no modo incremental, então o hash dela não é guardado
+        self.assertNotIn('Espécies:', output)
+        self.assertFalse(ResourceFingerprint.objects.filter(url__contains='pokemon-species').exists())
+        self.assertNotIn('Atualizado:', output)
+        written = {
+            re.match(r'(?:INSERT INTO|UPDATE|DELETE FROM) "(\w+)"', query['sql']).group(1)
+            for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        }
+        # Só o upsert (sem mudança) dos tipos e o checkpoint
+        self.assertEqual(written, {'core_type', 'core_synccheckpoint'})
+        # Nada mudou: ETags, retrato e caches continuam valendo
+        self.assertEqual(catalogue_version(), version)
+
+        self.api.routes['pokemon/2']['stats'][0]['base_stat'] = 99
+        with override_settings(POKEAPI_CACHE_TTL=0), self.captureOnCommitCallbacks(execute=True):
+            output = self.sync('--ids', '1-6', '--incremental')
+        self.assertIn('Pokémon: 1 alterados, 5 inalterados', output)
+        self.assertIn('Atualizado: pokemon2 (HP: 99', output)
+        self.assertNotEqual(catalogue_version(), version)
+
+
+class CelerySyncTests(SyncTestCase):
+    """As tarefas do chord de `start_sync_run`, chamadas na ordem em que o worker as executaria."""
+
+    def run_chord(self, ids, chunk_size=2):
+        chunks = tasks.chunked(ids, chunk_size)
+        run = SyncRun.objects.create(total=len(ids), chunks=len(chunks))
+        tasks.sync_types_task()
+        tasks.finish_sync_run_task([tasks.sync_chunk_task(run.pk, chunk) for chunk in chunks], run.pk)
+        run.refresh_from_db()
+        return run
+
+    def test_run_done(self):
+        run = self.run_chord(list(range(1, 7)))
+        self.assertEqual(run.status, SyncRun.STATUS_DONE)
+        self.assertEqual((run.completed, run.failed, run.chunks_done), (6, 0, 3))
+        self.assertEqual(run.stats['failed_chunks'], [])
+        self.assertEqual(Pokemon.objects.count(), 6)
+
+    def test_failed_chunk_marks_run_failed(self):
+        sync_pokemons = SyncCommand.sync_pokemons
+
+        def broken(command, batch_size, ids):
+            if 3 in ids:
+                raise RuntimeError('PokéAPI fora do ar')
+            return sync_pokemons(command, batch_size=batch_size, ids=ids)
+
+        with mock.patch.object(SyncCommand, 'sync_pokemons', autospec=True, side_effect=broken):
+            run = self.run_chord(list(range(1, 7)))
+        # Os outros lotes terminam e o chord fecha a execução mesmo assim
+        self.assertEqual(run.status, SyncRun.STATUS_FAILED)
+        self.assertEqual((run.completed, run.failed, run.chunks_done), (4, 2, 3))
+        self.assertEqual(run.stats['failed'], 2)
+        [chunk] = run.stats['failed_chunks']
+        self.assertEqual((chunk['first'], chunk['last']), (3, 4))
+        self.assertIn('PokéAPI fora do ar', chunk['message'])
+
+    def test_failed_id_marks_run_failed(self):
+        del self.api.routes['pokemon/5']
+        run = self.run_chord(list(range(1, 7)))
+        self.assertEqual(run.status, SyncRun.STATUS_FAILED)
+        self.assertEqual((run.completed, run.failed), (5, 1))
+        self.assertEqual(run.stats['failed_chunks'], [])
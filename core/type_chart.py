@@ -0,0 +1,108 @@
+"""
+Tabela de efetividade entre tipos, compartilhada pelo processo.
+
+A tabela é carregada do banco uma única vez e guardada como uma matriz
+N×N (atacante × defensor) em um `array` contíguo, pela versão do catálogo
+(core/caching.py): toda mudança de tipos ou relações a incrementa, neste e
+nos demais processos, e ela é relida no máximo uma vez por segundo. Os
+sinais de `Type` (veja `core/signals.py`) ainda descartam a tabela deste
+processo na hora.
+"""
+import threading
+from array import array
+
+from django.db.models import IntegerField, Value
+
+from core.caching import catalogue_version
+from core.models import Type
+
+# Ordem de aplicação: a última relação vence, como em Type.damage_multipliers
+RELATIONS = (
+    ("no_effect_against", 0.0),
+    ("weak_against", 0.5),
+    ("strong_against", 2.0),
+)
+
+
+class TypeChart:
+    """Matriz de multiplicadores de dano: `values[atacante * size + defensor]`."""
+
+    def __init__(self, types, values, version=None):
+        self.ids = [type_id for type_id, _ in types]
+        self.names = [name for _, name in types]
+        self.size = len(types)
+        self.index_by_id = {type_id: i for i, type_id in enumerate(self.ids)}
+        self.index_by_name = {name: i for i, name in enumerate(self.names)}
+        self.values = values
+        self.version = version
+        # Linhas da matriz já no formato da API de tipos: montadas uma vez por versão
+        self.multipliers = {
+            name: dict(zip(self.names, values[i * self.size:(i + 1) * self.size]))
+            for i, name in enumerate(self.names)
+        }
+
+    @classmethod
+    def load(cls, version=None):
+        """Monta a tabela com uma consulta para os tipos e outra para as três relações."""
+        types = list(Type.objects.order_by("id").values_list("id", "name"))
+        index = {type_id: i for i, (type_id, _) in enumerate(types)}
+        size = len(types)
+        values = array("d", [1.0]) * (size * size)
+
+        querysets = [
+            getattr(Type, field).through.objects
+            .annotate(relation=Value(position, output_field=IntegerField()))
+            .values_list("from_type_id", "to_type_id", "relation")
+            for position, (field, _) in enumerate(RELATIONS)
+        ]
+        rows = sorted(querysets[0].union(*querysets[1:], all=True), key=lambda row: row[2])
+        for attacker_id, defender_id, position in rows:
+            if attacker_id in index and defender_id in index:
+                values[index[attacker_id] * size + index[defender_id]] = RELATIONS[position][1]
+        return cls(types, values, version)
+
+    def multiplier(self, attacker, defender):
+        """Multiplicador entre dois índices da matriz."""
+        return self.values[attacker * self.size + defender]
+
+    def effectiveness(self, attacking_type_id, *defending_type_ids):
+        """Multiplicador total de um golpe contra um defensor de um ou dois tipos (por ID)."""
+        attacker = self.index_by_id.get(attacking_type_id)
+        if attacker is None:
+            return 1.0
+        result = 1.0
+        for type_id in defending_type_ids:
+            defender = self.index_by_id.get(type_id)
+            if defender is not None:
+                result *= self.values[attacker * self.size + defender]
+        return result
+
+    def multipliers_for(self, type_name):
+        """
+        {nome do tipo defensor: multiplicador}, no formato de Type.damage_multipliers.
+        O dicionário é compartilhado pelo processo: não deve ser alterado.
+        """
+        return self.multipliers.get(type_name, {})
+
+
+_chart = None
+_lock = threading.Lock()
+
+
+def get_type_chart():
+    """Retorna a tabela atual, recarregando-a se foi invalidada."""
+    global _chart
+    version = catalogue_version()
+    chart = _chart
+    if chart is not None and chart.version == version:
+        return chart
+    with _lock:
+        if _chart is None or _chart.version != version:
+            _chart = TypeChart.load(version)
+        return _chart
+
+
+def invalidate_type_chart():
+    """Descarta a tabela deste processo; os demais a remontam quando a versão do catálogo muda."""
+    global _chart
+    _chart = None
@@ -10,6 +10,13 @@ from .views import (
     TypeListView,
     PokemonBattleView,
     pokemon_moves,
+    pokemon_batch,
+    catalogue_export,
+    damage_matrix,
+    pokemon_index,
+    pokemon_search,
+    search,
+    cache_metrics,
     landing_page,
 )
 
@@ -22,7 +29,15 @@ urlpatterns = [
     path('comparar/', PokemonCompareView.as_view(), name='comparar_pokemons'),
     path('api/types/', TypeListView.as_view(), name='type-list'),
     path('battle/', PokemonBattleView.as_view(), name='pokemon-battle'),
+    path('api/pokemon/batch/', pokemon_batch, name='pokemon-batch'),
     path('api/pokemon/<str:pokemon_name>/moves/', pokemon_moves, name='pokemon-moves'),
+    path('api/export.ndjson', catalogue_export, {'export_format': 'ndjson'}, name='export-ndjson'),
+    path('api/export.csv', catalogue_export, {'export_format': 'csv'}, name='export-csv'),
+    path('api/damage-matrix/', damage_matrix, name='damage-matrix'),
+    path('api/pokemons/index/', pokemon_index, name='pokemon-index'),
+    path('api/pokemons/search/', pokemon_search, name='pokemon-search'),
+    path('api/search/', search, name='search'),
+    path('api/cache/stats/', cache_metrics, name='cache-stats'),
 ]
 
 if settings.DEBUG:  # Apenas para desenvolvimento
@@ -1,10 +1,26 @@
-from django.shortcuts import get_object_or_404
-from .models import Pokemon, Type, Move
-from django.views.generic import ListView, DetailView
+from django.db.models import Prefetch
+from .models import Ability, Pokemon, PokemonSummary, Type, Move
+from django.views.generic import ListView, DetailView, TemplateView
+from django.views.decorators.http import etag
+from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from .serializers import TypeSerializer
-from django.http import JsonResponse
+from .type_chart import get_type_chart
+from .pokemon_index import get_index_version, get_pokemon_index, search_pokemon_index
+from .search import KINDS, get_search_index
+from .caching import cache_stats, catalogue_conditional, detail_cache, json_cache
+from .damage import catalogue_damage_table, damage_table, load_defenders
+from .catalogue_file import get_catalogue_file
+from .atlas import sprite_for
+from .batch import BatchError, load_batch, parse_ids, parse_list
+from .snapshot import after, get_snapshot
+from .serialization import FastJsonResponse, Fragment, dumps
+from .export import export_csv, export_ndjson
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.contrib.admin.views.decorators import staff_member_required
 
 TYPE_COLORS = {
     'normal': '#A8A878',
@@ -27,17 +43,190 @@ TYPE_COLORS = {
     'fairy': '#EE99AC',
 }
 
+def pokemon_card_data(summary):
+    """Dados de um card no feed JSON da lista, a partir do resumo (ou do registro do retrato)."""
+    return {
+        'id': summary.id,
+        'name': summary.name,
+        'hp': summary.hp,
+        'image_url': summary.image_url,
+        'srcset': summary.srcset,
+        'png_srcset': summary.png_srcset,
+        'sprite': sprite_for(summary.id),
+        'primary_type': summary.primary_type_name or None,
+        'secondary_type': summary.secondary_type_name or None,
+        'attack': summary.attack,
+        'defense': summary.defense,
+        'speed': summary.speed,
+        'total_stats': summary.total_stats,
+        'card_style': summary.card_style,
+    }
+
+
+def card_fragment(snapshot, pokemon):
+    """JSON do card, codificado uma vez por versão do catálogo (guardado no retrato)."""
+    fragment = snapshot.card_json.get(pokemon.id)
+    if fragment is None:
+        fragment = snapshot.card_json[pokemon.id] = Fragment(dumps(pokemon_card_data(pokemon)))
+    return fragment
+
+
+@catalogue_conditional
 def pokemon_moves(request, pokemon_name):
+    snapshot = get_snapshot()
+    pokemon = snapshot.by_name.get(pokemon_name.lower())
+    if pokemon is None:
+        return JsonResponse({"error": "Pokémon não encontrado"}, status=404)
+    return FastJsonResponse([{"name": move.name} for move in snapshot.moves_of(pokemon)])
+
+@catalogue_conditional
+def pokemon_batch(request):
+    """
+    Vários Pokémon (`ids` e/ou `names`) com só os campos de `fields`, inclusive
+    dos movimentos e habilidades, numa resposta só (veja core/batch.py).
+    """
     try:
-        pokemon = Pokemon.objects.get(name__iexact=pokemon_name)
-        moves = pokemon.moves.all()  # Supondo que o modelo Pokemon tem uma relação ManyToMany com Move
-        moves_data = [{"name": move.name} for move in moves]
-        return JsonResponse(moves_data, safe=False)
-    except Pokemon.DoesNotExist:
+        pokemons, missing = load_batch(
+            parse_ids(request.GET.get("ids")), parse_list(request.GET.get("names")), request.GET.get("fields")
+        )
+    except BatchError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    return FastJsonResponse({"pokemons": pokemons, "missing": missing})
+
+
+EXPORTS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv; charset=utf-8"),
+}
+
+
+@gzip_page
+@catalogue_conditional
+def catalogue_export(request, export_format):
+    """
+    Catálogo inteiro em NDJSON ou CSV, gerado aos blocos enquanto é enviado
+    (veja core/export.py); com `Accept-Encoding: gzip`, comprimido no caminho.
+    """
+    rows, content_type = EXPORTS[export_format]
+    response = StreamingHttpResponse(rows(), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="pokedex.{export_format}"'
+    return response
+
+
+@etag(lambda request: str(get_index_version()))
+def pokemon_index(request):
+    """
+    Índice [[id, nome], ...] de todos os Pokémon para os campos de seleção.
+
+    Pedido com `?v=<versão atual>`, pode ficar no cache do navegador para
+    sempre: uma versão nova muda a URL.
+    """
+    version, index = get_pokemon_index()
+    response = JsonResponse({"version": version, "pokemons": index})
+    if request.GET.get("v") == str(version):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def pokemon_search(request):
+    """Sugestões de Pokémon (ID e nome) para o termo `q`."""
+    results = search_pokemon_index(request.GET.get("q", ""))
+    return JsonResponse({"results": [{"id": pokemon_id, "name": name} for pokemon_id, name in results]})
+
+
+def search(request):
+    """
+    Busca em Pokémon, movimentos e habilidades, ordenada por relevância.
+    `kind` limita os tipos (ex.: `?q=fire&kind=move,ability`).
+    """
+    kinds = [kind for kind in request.GET.get("kind", "").split(",") if kind]
+    if any(kind not in KINDS for kind in kinds):
+        return JsonResponse({"error": f"Tipos válidos: {', '.join(KINDS)}"}, status=400)
+    results = get_search_index().search(request.GET.get("q", ""), kinds=kinds or None)
+    return JsonResponse({"results": [result._asdict() for result in results]})
+
+
+def damage_matrix(request):
+    """Tabela de dano de cada movimento do atacante contra cada Pokémon da Pokédex."""
+    attacker_query = request.GET.get('attacker', '').strip()
+    if not attacker_query:
+        return JsonResponse({"error": "Informe o parâmetro attacker"}, status=400)
+
+    # O arquivo novo é procurado só uma vez por segundo, e a versão do catálogo pode mudar antes:
+    # a chave leva o arquivo usado, para um resultado do mapeamento antigo não valer na versão nova
+    catalogue = get_catalogue_file()
+    source = f"file-{catalogue.exported_at!r}" if catalogue is not None else "db"
+
+    def load():
+        payload = damage_matrix_payload(attacker_query, catalogue)
+        return None if payload is None else dumps(payload)  # Guardado já codificado
+
+    content = json_cache.get_or_set(f"damage-matrix:{source}:{attacker_query.lower()}", load)
+    if content is None:
         return JsonResponse({"error": "Pokémon não encontrado"}, status=404)
+    return FastJsonResponse(Fragment(content))
+
+
+def damage_matrix_payload(attacker_query, catalogue=None):
+    """Tabela de dano do atacante: do catálogo binário `catalogue`, se houver, senão do banco."""
+    if catalogue is not None:
+        return catalogue_damage_payload(catalogue, attacker_query)
+
+    lookup = {'id': attacker_query} if attacker_query.isdigit() else {'name__iexact': attacker_query}
+    attacker = Pokemon.objects.filter(**lookup).first()
+    if attacker is None:
+        return None
+
+    moves = list(attacker.moves.order_by('name').values_list('name', 'power', 'type_id'))
+    defenders = load_defenders()
+    table = damage_table(attacker.attack, [(power, type_id) for _, power, type_id in moves], defenders)
+
+    return {
+        "attacker": {"id": attacker.id, "name": attacker.name},
+        "moves": [name for name, _, _ in moves],
+        "defenders": [
+            {"id": pokemon_id, "name": name}
+            for pokemon_id, name in zip(defenders["ids"], defenders["names"])
+        ],
+        "damage": table.tolist(),  # damage[movimento][defensor]
+    }
+
+
+def catalogue_damage_payload(catalogue, attacker_query):
+    """A mesma resposta de `damage_matrix_payload`, calculada sobre o catálogo binário, sem consultas."""
+    attacker = catalogue.pokemon_index(attacker_query)
+    if attacker is None:
+        return None
+
+    moves = catalogue.moves_of(attacker)
+    move_names = catalogue.names(moves)
+    order = sorted(range(len(moves)), key=move_names.__getitem__)
+    moves = moves[order]
+    table = catalogue_damage_table(catalogue, attacker, moves)
+
+    pokemons = catalogue.pokemons
+    return {
+        "attacker": {"id": int(pokemons["id"][attacker]), "name": catalogue.text(pokemons[attacker])},
+        "moves": [move_names[index] for index in order],
+        "defenders": [
+            {"id": pokemon_id, "name": name}
+            for pokemon_id, name in zip(pokemons["id"].tolist(), catalogue.names(pokemons))
+        ],
+        "damage": table.tolist(),
+    }
+
 
+@staff_member_required
+def cache_metrics(request):
+    """Acertos e falhas dos caches de fragmentos e respostas deste processo."""
+    return JsonResponse(cache_stats())
+
+@method_decorator(catalogue_conditional, name='dispatch')
 class PokemonListView(ListView):
-    model = Pokemon
+    # Os cards vêm do retrato em memória do catálogo (core/snapshot.py), sem ir ao banco
+    model = PokemonSummary
     template_name = 'pokedex/lista.html'
     context_object_name = 'pokemons'
     paginate_by = 21  # Número de Pokémon por página
@@ -45,142 +234,133 @@ class PokemonListView(ListView):
     def get_queryset(self):
         query = self.request.GET.get('query', '').strip()
         type_name = self.request.GET.get('type', '').strip()
+        snapshot = self.snapshot = get_snapshot()
         if type_name:
-            pokemon_type = get_object_or_404(Type, name=type_name)
-            pokemon_type1 = Pokemon.objects.filter(primary_type=pokemon_type)
-            pokemon_type2 = Pokemon.objects.filter(secondary_type=pokemon_type)
-            if pokemon_type1.exists() and pokemon_type2.exists():
-                return pokemon_type1 | pokemon_type2
-            elif pokemon_type1.exists():
-                return pokemon_type1
-            elif pokemon_type2.exists():
-                return pokemon_type2
-            else:
-                return Pokemon.objects.none()
+            pokemons = snapshot.of_type(type_name)
+            if pokemons is None:
+                raise Http404("Tipo não encontrado")
+            return pokemons
         if query:
             if query.isdigit():
-                return Pokemon.objects.filter(id=query)
-            return Pokemon.objects.filter(name__icontains=query)
-        return Pokemon.objects.all()
+                pokemon = snapshot.by_id.get(int(query))
+                return [pokemon] if pokemon else []
+            ids = get_search_index().pokemon_ids(query)
+            return [pokemon for pokemon in snapshot.pokemons if pokemon.id in ids]
+        return snapshot.pokemons
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json' and 'cursor' in request.GET:
+            return self.render_cursor_page(request.GET['cursor'].strip())
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['type_colors'] = TYPE_COLORS
+        # Ponto de partida do feed JSON (rolagem infinita) depois desta página
+        page = context.get('page_obj')
+        context['next_cursor'] = list(context['pokemons'])[-1].id if page and page.has_next() else ''
         return context
 
+    def render_cursor_page(self, cursor):
+        """
+        Página do feed JSON a partir do último ID já exibido (`cursor`).
+
+        Não faz COUNT nem OFFSET: o custo é o mesmo em qualquer profundidade,
+        e Pokémon inseridos durante a rolagem não duplicam nem pulam cards.
+        """
+        pokemons = self.get_queryset()
+        if cursor:
+            if not cursor.isdigit():
+                return JsonResponse({"error": "Cursor inválido"}, status=400)
+            pokemons = after(pokemons, int(cursor))
+
+        pokemons = list(pokemons[:self.paginate_by + 1])
+        has_next = len(pokemons) > self.paginate_by
+        pokemons = pokemons[:self.paginate_by]
+        return FastJsonResponse({
+            'pokemons': [card_fragment(self.snapshot, pokemon) for pokemon in pokemons],
+            'has_next': has_next,
+            'next_cursor': pokemons[-1].id if has_next else None,
+        })
+
     def render_to_response(self, context, **response_kwargs):
         if self.request.GET.get('format') == 'json':
-            pokemons = context['pokemons']
             data = {
-                'pokemons': [
-                    {
-                        'id': pokemon.id,
-                        'name': pokemon.name,
-                        'hp': pokemon.hp,
-                        'image_url': pokemon.image.url if pokemon.image else pokemon.image_url,
-                        'primary_type': pokemon.primary_type.name if pokemon.primary_type else None,
-                        'secondary_type': pokemon.secondary_type.name if pokemon.secondary_type else None,
-                        'attack': pokemon.attack,
-                        'defense': pokemon.defense,
-                        'speed': pokemon.speed,
-                        'card_style': pokemon.card_style,
-                    }
-                    for pokemon in pokemons
-                ],
-                'has_next': context['page_obj'].has_next()
+                'pokemons': [card_fragment(self.snapshot, pokemon) for pokemon in context['pokemons']],
+                'has_next': context['page_obj'].has_next(),
+                'next_cursor': context['next_cursor'] or None,
             }
-            return JsonResponse(data)
+            return FastJsonResponse(data)
         return super().render_to_response(context, **response_kwargs)
 
 
 class PokemonCarouselView(PokemonListView):
+    """
+    Renderiza só a primeira janela de slides; as seguintes vêm sob demanda do
+    feed JSON por cursor (`?format=json&cursor=<id>`), como na lista.
+    """
     template_name = 'pokedex/carrossel.html'
     context_object_name = 'pokemons'
-    paginate_by = 10  # Número de Pokémon por página
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        paginator = context['paginator']  # Obtém o paginator do contexto
-        context['pages'] = [
-            paginator.page(page_num).object_list for page_num in paginator.page_range
-        ]  # Lista de objetos por página
-        return context  # Limita a 10 Pokémon para o carrossel
+    paginate_by = 10  # Slides por janela
 
 
+@method_decorator(catalogue_conditional, name='dispatch')
 class PokemonDetailView(DetailView):
     model = Pokemon
     template_name = 'pokedex/detalhe.html'
     context_object_name = 'pokemon'
 
+    def get_queryset(self):
+        return Pokemon.objects.select_related('primary_type', 'secondary_type').prefetch_related(
+            Prefetch('abilities', queryset=Ability.objects.only('id', 'name')),
+            Prefetch('moves', queryset=Move.objects.only('id', 'name')),
+        )
+
+    def get(self, request, *args, **kwargs):
+        # A página só muda com o catálogo; com parâmetros na URL (que o cabeçalho usa), não é guardada
+        if request.GET:
+            return super().get(request, *args, **kwargs)
+        content = detail_cache.get_or_set(
+            kwargs['pk'], lambda: super(PokemonDetailView, self).get(request, *args, **kwargs).render().content
+        )
+        return HttpResponse(content)
 
-class PokemonCompareView(ListView):
-    model = Pokemon
+
+class PokemonCompareView(TemplateView):
+    # As opções dos campos vêm do índice em /api/pokemons/index/, carregado pelo navegador
     template_name = 'pokedex/comparar.html'
-    context_object_name = 'all_pokemons'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        pokemon1_query = self.request.GET.get('pokemon1')
-        pokemon2_query = self.request.GET.get('pokemon2')
-
         default_image_url = '/static/pokedex/images/default.jpg'
-        
-        if pokemon1_query:
-            if pokemon1_query.isdigit():
-                context['pokemon1'] = Pokemon.objects.filter(id=pokemon1_query).first()
-            else:
-                context['pokemon1'] = Pokemon.objects.filter(name__icontains=pokemon1_query).first()
-        else:
-            context['pokemon1'] = None
-        
-        
-        if pokemon2_query:
-            if pokemon2_query.isdigit():
-                context['pokemon2'] = Pokemon.objects.filter(id=pokemon2_query).first()
-            else:
-                context['pokemon2'] = Pokemon.objects.filter(name__icontains=pokemon2_query).first()
-        else:
-            context['pokemon2'] = None
-            
+
+        snapshot = get_snapshot()
+        context['pokemon1'] = snapshot.find(self.request.GET.get('pokemon1'))
+        context['pokemon2'] = snapshot.find(self.request.GET.get('pokemon2'))
         context['default_image_url'] = default_image_url
+        context['pokemon_index_version'] = get_index_version()
         return context   
 
-class PokemonBattleView(ListView):
-    model = Pokemon
+class PokemonBattleView(TemplateView):
+    # As opções dos campos vêm do índice em /api/pokemons/index/, carregado pelo navegador
     template_name = 'pokedex/battle.html'
-    context_object_name = 'all_pokemons'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        pokemon1_query = self.request.GET.get('pokemon1')
-        pokemon2_query = self.request.GET.get('pokemon2')
         move1_query = self.request.GET.get('move1')
         move2_query = self.request.GET.get('move2')
 
         default_image_url = '/static/pokedex/images/default.jpg'
-        
-        if pokemon1_query:
-            if pokemon1_query.isdigit():
-                context['pokemon1'] = Pokemon.objects.filter(id=pokemon1_query).first()
-            else:
-                context['pokemon1'] = Pokemon.objects.filter(name__icontains=pokemon1_query).first()
-        else:
-            context['pokemon1'] = None
-        
-        
-        if pokemon2_query:
-            if pokemon2_query.isdigit():
-                context['pokemon2'] = Pokemon.objects.filter(id=pokemon2_query).first()
-            else:
-                context['pokemon2'] = Pokemon.objects.filter(name__icontains=pokemon2_query).first()
-        else:
-            context['pokemon2'] = None
 
-        context['move1'] = Move.objects.filter(name__icontains=move1_query).first() if move1_query else None
-        context['move2'] = Move.objects.filter(name__icontains=move2_query).first() if move2_query else None
+        snapshot = get_snapshot()
+        context['pokemon1'] = snapshot.find(self.request.GET.get('pokemon1'))
+        context['pokemon2'] = snapshot.find(self.request.GET.get('pokemon2'))
+
+        context['move1'] = snapshot.find_move(move1_query)
+        context['move2'] = snapshot.find_move(move2_query)
         
-        context['moves1'] = context['pokemon1'].moves.all() if context['pokemon1'] else None
-        context['moves2'] = context['pokemon2'].moves.all() if context['pokemon2'] else None
+        context['moves1'] = snapshot.moves_of(context['pokemon1']) if context['pokemon1'] else None
+        context['moves2'] = snapshot.moves_of(context['pokemon2']) if context['pokemon2'] else None
         
         if context['pokemon1'] and context['pokemon2'] and context['move1'] and context['move2']:
             context['damage_to_pokemon2'] = self.calculate_damage(context['pokemon1'], context['pokemon2'], context['move1'])
@@ -190,36 +370,47 @@ class PokemonBattleView(ListView):
             context['damage_to_pokemon1'] = None
 
         context['default_image_url'] = default_image_url
+        context['pokemon_index_version'] = get_index_version()
         return context
     
     def calculate_damage(self, attacker, defender, move):
-        if not move or not move.type:
+        if not move or not move.type_id:
             return 0
         
         base_damage = move.power or 50
         attack_stat = attacker.attack
         defense_stat = defender.defense
         
-        type_multiplier = 1.0
-        move_type = move.type
-        
-        damage_multiplier = move_type.damage_multipliers()
-        
-        if defender.primary_type:
-            type_multiplier *= damage_multiplier.get(defender.primary_type.name, 1.0)
-        if defender.secondary_type:
-            type_multiplier *= damage_multiplier.get(defender.secondary_type.name, 1.0)
+        # Consulta direta na tabela de efetividade (sem acessar o banco)
+        defending_types = [t for t in (defender.primary_type_id, defender.secondary_type_id) if t]
+        type_multiplier = get_type_chart().effectiveness(move.type_id, *defending_types)
         
         # Fórmula de dano
         damage = ( base_damage * (attack_stat / defense_stat) / 50 + 2) * type_multiplier
         
         return max(1, int(damage))
 
+@method_decorator(catalogue_conditional, name='dispatch')
 class TypeListView(ListAPIView):
     serializer_class = TypeSerializer
 
     def get_queryset(self):
-        return Type.objects.all()
+        return Type.objects.order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        # A API navegável continua no serializer do DRF; o JSON sai de `.values()` já codificado
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return FastJsonResponse(Fragment(json_cache.get_or_set('types', type_list_content)))
+
+
+def type_list_content():
+    """Corpo de /api/types/ (o mesmo do TypeSerializer), com os multiplicadores da tabela de efetividade."""
+    chart = get_type_chart()
+    types = list(Type.objects.order_by('id').values('id', 'name', 'color'))
+    for row in types:
+        row['damage_multipliers'] = chart.multipliers_for(row['name'])
+    return dumps(types)
 
 
 from django.shortcuts import render
@@ -150,3 +150,36 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+
+# PokéAPI (pode apontar para um espelho local durante a sincronização)
+POKEAPI_BASE_URL = os.environ.get('POKEAPI_BASE_URL', 'https://pokeapi.co/api/v2/')
+
+# Cache em disco das respostas da PokéAPI (None desativa)
+POKEAPI_CACHE_DIR = os.environ.get('POKEAPI_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'pokeapi'))
+POKEAPI_CACHE_TTL = 60 * 60 * 24  # Depois disso, revalida com ETag/Last-Modified
+POKEAPI_CACHE_MAX_SIZE = 512 * 1024 * 1024  # Bytes; descarta as entradas menos usadas
+
+# Necessário para o chord que agrega os lotes da sincronização distribuída
+CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'
+
+# Cache compartilhado entre processos (fragmentos, páginas e JSON; veja core/caching.py).
+# Sem REDIS_CACHE_URL, usa arquivos em POKEDEX_CACHE_DIR: o que um worker web monta serve aos
+# demais. A versão do catálogo, que decide o que ainda vale, fica no banco (CatalogueVersion).
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL')
+POKEDEX_CACHE_DIR = os.environ.get('POKEDEX_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'django'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    } if REDIS_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': POKEDEX_CACHE_DIR,
+        # O padrão (300) não comporta os cards e páginas de um catálogo inteiro
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+POKEDEX_CACHE_ALIAS = 'default'
+
+# Catálogo binário (atributos, tipos, movimentos) lido com mmap por todos os processos;
+# regravado ao final do sync_pokemons (veja core/catalogue_file.py)
+POKEDEX_CATALOGUE_FILE = os.environ.get('POKEDEX_CATALOGUE_FILE', os.path.join(BASE_DIR, '.cache', 'catalogue.bin'))
@@ -0,0 +1,88 @@
+// pokemonPicture() vem de picture.js, carregado antes deste arquivo
+document.addEventListener('DOMContentLoaded', function () {
+    const carousel = document.getElementById('pokemonCarousel');
+    const indicators = carousel.querySelector('.carousel-indicators');
+    const inner = carousel.querySelector('.carousel-inner');
+    // Cursor = ID do último slide carregado; vazio quando não há mais Pokémon
+    let cursor = carousel.dataset.nextCursor;
+    let loading = false;
+    let hasNext = Boolean(cursor);
+    const PRELOAD = 3;  // Busca a próxima janela quando faltam poucos slides
+
+    function slideCard(pokemon) {
+        return `
+            <div class="d-flex justify-content-center">
+                <div class="card shadow rounded-4 text-center card-background" style="${pokemon.card_style}">
+                    <div class="position-relative mb-5">
+                        <span class="badge bg-light text-dark position-absolute top-0 end-0 m-2">${pokemon.hp} HP</span>
+                    </div>
+                    ${pokemonPicture(pokemon)}
+                    <div class="card-body">
+                        <h5 class="pokemon-name text-capitalize m-3">${pokemon.name}</h5>
+                        ${pokemon.primary_type ? `<span class="pokemon-type badge rounded-pill px-3 py-2 tipo-${pokemon.primary_type}">${pokemon.primary_type}</span>` : ''}
+                        ${pokemon.secondary_type ? `<span class="pokemon-type badge rounded-pill px-3 py-2 tipo-${pokemon.secondary_type}">${pokemon.secondary_type}</span>` : ''}
+                        <div class="stats d-flex justify-content-around mt-4">
+                            <div class="text-center bg-white rounded-4 shadow-sm px-3 py-2 shadow-sm">
+                              <div class="fw-bold text-uppercase small text-muted">ATK</div>
+                              <div class="fs-5 fw-semibold text-dark">${pokemon.attack || '--'}</div>
+                            </div>
+                            <div class="text-center bg-white rounded-4 shadow-sm px-3 py-2 shadow-sm">
+                              <div class="fw-bold text-uppercase small text-muted">DEF</div>
+                              <div class="fs-5 fw-semibold text-dark">${pokemon.defense || '--'}</div>
+                            </div>
+                            <div class="text-center bg-white rounded-4 shadow-sm px-3 py-2 shadow-sm">
+                              <div class="fw-bold text-uppercase small text-muted">SPD</div>
+                              <div class="fs-5 fw-semibold text-dark">${pokemon.speed || '--'}</div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        `;
+    }
+
+    function appendSlide(pokemon) {
+        const index = inner.children.length;
+
+        const item = document.createElement('div');
+        item.className = 'carousel-item';
+        item.innerHTML = slideCard(pokemon);
+        inner.appendChild(item);
+
+        const indicator = document.createElement('button');
+        indicator.type = 'button';
+        indicator.dataset.bsTarget = '#pokemonCarousel';
+        indicator.dataset.bsSlideTo = index;
+        indicator.setAttribute('aria-label', `Slide ${index + 1}`);
+        indicators.appendChild(indicator);
+    }
+
+    function loadMoreSlides() {
+        if (loading || !hasNext) return;
+        loading = true;
+
+        // Mantém os filtros da página (query, type), como em lista.js
+        const params = new URLSearchParams(window.location.search);
+        params.delete('page');
+        params.set('cursor', cursor);
+        params.set('format', 'json');
+        fetch(`?${params.toString()}`)
+            .then(response => response.json())
+            .then(data => {
+                data.pokemons.forEach(appendSlide);
+                hasNext = data.has_next;
+                cursor = data.next_cursor;
+                loading = false;
+            })
+            .catch(error => {
+                console.error('Error loading more pokemons:', error);
+                loading = false;
+            });
+    }
+
+    carousel.addEventListener('slid.bs.carousel', event => {
+        if (event.to >= inner.children.length - PRELOAD) {
+            loadMoreSlides();
+        }
+    });
+});
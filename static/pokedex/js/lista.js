@@ -1,23 +1,26 @@
+// pokemonPicture() vem de picture.js, carregado antes deste arquivo
 document.addEventListener('DOMContentLoaded', function () {
-    let page = 1;
+    const pokemonContainer = document.querySelector('.row.row-cols-1.row-cols-sm-2.row-cols-md-3.g-4');
+    // Cursor = ID do último Pokémon exibido; vazio quando não há mais páginas
+    let cursor = pokemonContainer.dataset.nextCursor;
     let loading = false;
-    let hasNext = true;
+    let hasNext = Boolean(cursor);
 
     function loadMorePokemons() {
         if (loading || !hasNext) return;
         loading = true;
 
         const params = new URLSearchParams(window.location.search);
-        params.set('page', page + 1);
+        params.delete('page');
+        params.set('cursor', cursor);
         params.set('format', 'json');
         const url = `?${params.toString()}`;
 
         fetch(url)
             .then(response => response.json())
             .then(data => {
-                page++;
                 hasNext = data.has_next;
-                const pokemonContainer = document.querySelector('.row.row-cols-1.row-cols-sm-2.row-cols-md-3.g-4');
+                cursor = data.next_cursor;
                 data.pokemons.forEach(pokemon => {
                     const pokemonCard = `
                         <a href="/pokemons/${pokemon.id}/" class="col d-flex justify-content-center text-decoration-none text-dark">
@@ -27,7 +30,7 @@ document.addEventListener('DOMContentLoaded', function () {
                                     <span class="badge bg-light text-dark position-absolute top-0 end-0 m-2">${pokemon.hp} HP</span>
                                 </div>
                 
-                                <img src="${pokemon.image_url}" class="pokemon-img mx-auto d-block mt-3" alt="${pokemon.name}">
+                                ${pokemonPicture(pokemon)}
                                 
                                 <div class="card-body">
                                     <h5 class="pokemon-name text-capitalize m-3">${pokemon.name}</h5>
@@ -0,0 +1,16 @@
+// Mesma marcação de templates/pokedex/_picture.html: recorte do atlas de sprites,
+// senão miniaturas WebP com PNG de reserva
+function pokemonPicture(pokemon) {
+    const sprite = pokemon.sprite;
+    if (sprite) {
+        return `<div role="img" aria-label="${pokemon.name}" class="pokemon-sprite pokemon-img mx-auto d-block mt-3" style="background-image: url('${sprite.url}'); background-size: ${sprite.width}px ${sprite.height}px; background-position: ${sprite.x}px ${sprite.y}px;"></div>`;
+    }
+    if (!pokemon.srcset) {
+        return `<img src="${pokemon.image_url}" class="pokemon-img mx-auto d-block mt-3" alt="${pokemon.name}" loading="lazy">`;
+    }
+    return `
+        <picture>
+            <source type="image/webp" srcset="${pokemon.srcset}" sizes="200px">
+            <img src="${pokemon.image_url}" srcset="${pokemon.png_srcset}" sizes="200px" width="200" height="200" class="pokemon-img mx-auto d-block mt-3" alt="${pokemon.name}" loading="lazy" decoding="async">
+        </picture>`;
+}
@@ -0,0 +1,42 @@
+// Preenche o datalist #pokemon-list com o índice de nomes, guardado no
+// localStorage pela versão: só é baixado de novo quando o catálogo muda.
+document.addEventListener('DOMContentLoaded', function () {
+    const datalist = document.getElementById('pokemon-list');
+    if (!datalist) return;
+
+    const STORAGE_KEY = 'pokedex:pokemon-index';
+    const version = Number(datalist.dataset.indexVersion);
+
+    function fill(pokemons) {
+        const fragment = document.createDocumentFragment();
+        pokemons.forEach(([id, name]) => {
+            const option = document.createElement('option');
+            option.value = name;
+            fragment.appendChild(option);
+        });
+        datalist.replaceChildren(fragment);
+    }
+
+    let stored = null;
+    try {
+        stored = JSON.parse(localStorage.getItem(STORAGE_KEY));
+    } catch (error) {
+        stored = null;
+    }
+    if (stored && stored.version === version) {
+        fill(stored.pokemons);
+        return;
+    }
+
+    fetch(datalist.dataset.indexUrl)
+        .then(response => response.json())
+        .then(data => {
+            fill(data.pokemons);
+            try {
+                localStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+            } catch (error) {
+                // Sem espaço no localStorage: o cache HTTP da URL versionada ainda vale
+            }
+        })
+        .catch(error => console.error('Erro ao carregar a lista de Pokémon:', error));
+});